@@ -1,18 +1,26 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
 import os
 import logging
-from docx import Document
-from docx.shared import Inches
 import re
+import functools
+import json
+import hashlib
+import threading
+import time
+import warnings
 from io import BytesIO
+import itertools
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from casovani import casovat, pocitej, usek
+from mezipamet import Mezipamet, hash_souboru
+from indexy import index_podle, najdi_radek, odvozeny_vysledek, sdilej_indexy, serazeno_podle
+from nacitani import ZDROJ_SLOUPEC, nacti_data, nacti_vice_souboru
+from percentily import otisk_rozdeleni, percentilova_poradi, rozdeleni_z_dat
+from trendy import casova_rada, spocitej_trendy
+from upravy import aplikuj_zmeny, verze_zmen
 
 # Konfigurace loggeru
 logging.basicConfig(level=logging.INFO)
@@ -26,19 +34,51 @@ def sanitize_name(name: str) -> str:
     """Odstraní nepovolené znaky z textu, aby bylo možné bezpečně vytvářet názvy souborů."""
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
-def load_data(file_path):
-    logger.info(f"Načítám data ze souboru: {file_path}")
-    excel_file = pd.ExcelFile(file_path)
-    sheet_names = excel_file.sheet_names
-    if "data" in sheet_names:
-        df = pd.read_excel(file_path, sheet_name="data")
-    else:
-        df = pd.read_excel(file_path, sheet_name=sheet_names[0])
-    for col in ["Jmeno", "Prijmeni", "Narozen"]:
-        if col not in df.columns:
-            raise KeyError(f"Chybí sloupec '{col}' v datech.")
-    df["Identifikace"] = df["Jmeno"].astype(str) + " " + df["Prijmeni"].astype(str) + ", " + df["Narozen"].astype(str)
-    return df
+# Mezipaměť načtených datových sad podle hashe obsahu souboru
+DATA_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_data_cache = Mezipamet(DATA_CACHE_MAX_BYTES, velikost=lambda df: int(df.memory_usage(deep=True).sum()))
+
+def _hash_zdroje(file_path):
+    if isinstance(file_path, (list, tuple)):
+        return tuple(hash_souboru(p) for p in file_path)
+    return hash_souboru(file_path)
+
+def zdroj_dat(file_path, vsechny_listy=False):
+    """Klíč zdroje dat v deníku úprav (upravy): hash obsahu souborů a způsob načtení listů."""
+    hashe = _hash_zdroje(file_path)
+    return ("+".join(hashe) if isinstance(hashe, tuple) else hashe) + (":listy" if vsechny_listy else "")
+
+def load_data(file_path, vsechny_listy=False):
+    """
+    Načte data z jednoho souboru nebo ze seznamu souborů (sloučená data se sloupcem Zdroj).
+
+    S vsechny_listy se načtou a sloučí všechny listy sešitů místo jediného listu.
+    Na načtená data se aplikují změny uložené z editoru záznamů.
+    """
+    with usek("nacteni_dat") as pocty:
+        zdroj = zdroj_dat(file_path, vsechny_listy)
+        verze = verze_zmen(zdroj)
+        klic = (_hash_zdroje(file_path), vsechny_listy, verze)
+        df = _data_cache.get(klic)
+        pocty["z_mezipameti"] = df is not None
+        if df is None:
+            # Data ze souborů bez úprav zůstávají v mezipaměti, nová verze úprav je nečte znovu
+            zaklad = _data_cache.get(klic[:2] + (0,))
+            if zaklad is None:
+                if isinstance(file_path, (list, tuple)) or vsechny_listy:
+                    soubory = list(file_path) if isinstance(file_path, (list, tuple)) else [file_path]
+                    zaklad = nacti_vice_souboru(soubory, vsechny_listy)
+                else:
+                    zaklad = nacti_data(file_path)
+                if verze:
+                    _data_cache.put(klic[:2] + (0,), zaklad)
+            df = aplikuj_zmeny(zaklad.copy(), zdroj) if verze else zaklad
+            index_podle(df)
+            if "Vek" in df.columns:
+                serazeno_podle(df, "Vek")
+            _data_cache.put(klic, df)
+        pocty["radky"] = len(df)
+        return sdilej_indexy(df, df.copy())
 
 def format_val(val):
     if isinstance(val, pd.Timedelta):
@@ -48,16 +88,131 @@ def format_val(val):
     except (ValueError, TypeError):
         return str(val)
 
+def normalizuj_sloupce(df):
+    df.columns = df.columns.str.strip().str.replace("\\s+", " ", regex=True)
+    return df
+
+def vypln_chybejici(df, hodnota=0):
+    """Doplní chybějící hodnoty na místě; kategorické sloupce (jména) ponechá beze změny."""
+    sloupce = [c for c in df.columns if not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    df[sloupce] = df[sloupce].fillna(hodnota)
+    return df
+
+def pridej_pomery_ir_er(df):
+    if "Vnitrni rotace koncentricka (210°/s)" in df.columns and "Vnejsi rotace koncentricka (210°/s)" in df.columns:
+        df["IR/ER (210°/s)"] = df["Vnitrni rotace koncentricka (210°/s)"] / df["Vnejsi rotace koncentricka (210°/s)"]
+    if "Vnitrni rotace koncentricka (300°/s)" in df.columns and "Vnejsi rotace koncentricka (300°/s)" in df.columns:
+        df["IR/ER (300°/s)"] = df["Vnitrni rotace koncentricka (300°/s)"] / df["Vnejsi rotace koncentricka (300°/s)"]
+    return df
+
+def spocitej_statistiky_skupiny(df):
+    """
+    Spočítá jedním průchodem popisné statistiky všech numerických sloupců.
+
+    Vrací DataFrame indexovaný názvem sloupce se sloupci
+    prumer, median, min, max, ci_spodni (2,5 %) a ci_horni (97,5 %).
+    """
+    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    values = df[numeric_cols].to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        percentily = np.nanpercentile(values, [2.5, 50, 97.5], axis=0)
+        stats = pd.DataFrame({
+            "prumer": np.nanmean(values, axis=0),
+            "median": percentily[1],
+            "min": np.nanmin(values, axis=0) if len(values) else np.nan,
+            "max": np.nanmax(values, axis=0) if len(values) else np.nan,
+            "ci_spodni": percentily[0],
+            "ci_horni": percentily[2],
+        }, index=numeric_cols)
+    return stats
+
+VEKOVE_PASMO_LET = 1
+
+def _statistiky_pasem(df, sloupce):
+    """Počet, průměr, M2, min a max každého parametru po věkových pásmech (data seřazená podle věku)."""
+    vek, poradi = serazeno_podle(df, "Vek")
+    platne = np.isfinite(vek)
+    vek, poradi = vek[platne], poradi[platne]
+    pasma = np.floor(vek / VEKOVE_PASMO_LET) * VEKOVE_PASMO_LET
+    starty = np.flatnonzero(np.r_[True, pasma[1:] != pasma[:-1]]) if len(pasma) else np.empty(0, dtype=int)
+    hodnoty = df[list(sloupce)].to_numpy(dtype=float)[poradi]
+    if not len(starty):
+        prazdne = np.empty((0, len(sloupce)))
+        return {"pasma": np.empty(0), "n": prazdne, "prumer": prazdne, "m2": prazdne, "min": prazdne, "max": prazdne}
+    platne_hodnoty = np.isfinite(hodnoty)
+    n = np.add.reduceat(platne_hodnoty, starty, axis=0).astype(float)
+    soucet = np.add.reduceat(np.where(platne_hodnoty, hodnoty, 0.0), starty, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prumer = soucet / n
+    delky = np.diff(np.r_[starty, len(hodnoty)])
+    odchylky = np.where(platne_hodnoty, hodnoty - np.repeat(prumer, delky, axis=0), 0.0)
+    return {
+        "pasma": pasma[starty],
+        "n": n,
+        "prumer": prumer,
+        "m2": np.add.reduceat(odchylky ** 2, starty, axis=0),
+        "min": np.minimum.reduceat(np.where(platne_hodnoty, hodnoty, np.inf), starty, axis=0),
+        "max": np.maximum.reduceat(np.where(platne_hodnoty, hodnoty, -np.inf), starty, axis=0),
+    }
+
+def statistiky_veku(df, vek_rozsah, sloupce=None):
+    """
+    Vrátí statistiky parametrů pro probandy ve věkovém intervalu (včetně krajních hodnot).
+
+    Statistiky po věkových pásmech se pro DataFrame spočítají jednou; dotaz na interval pak
+    jen půlením najde pásma a sloučí je. Výsledek je indexovaný parametrem se sloupci
+    n, prumer, smerodatna_odchylka, min a max.
+    """
+    if sloupce is None:
+        sloupce = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    sloupce = tuple(sloupce)
+    pasma = odvozeny_vysledek(df, ("statistiky_pasem", VEKOVE_PASMO_LET, sloupce),
+                              lambda d: _statistiky_pasem(d, sloupce))
+    od = np.floor(vek_rozsah[0] / VEKOVE_PASMO_LET) * VEKOVE_PASMO_LET
+    zacatek = np.searchsorted(pasma["pasma"], od, side="left")
+    konec = np.searchsorted(pasma["pasma"], vek_rozsah[1], side="right")
+    vyber = slice(zacatek, konec)
+    n_pasem, prumer_pasem = pasma["n"][vyber], pasma["prumer"][vyber]
+    n = n_pasem.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prumer = np.nansum(n_pasem * prumer_pasem, axis=0) / n
+        m2 = pasma["m2"][vyber].sum(axis=0) + np.nansum(n_pasem * (prumer_pasem - prumer) ** 2, axis=0)
+        minimum = pasma["min"][vyber].min(axis=0, initial=np.inf)
+        maximum = pasma["max"][vyber].max(axis=0, initial=-np.inf)
+        return pd.DataFrame({
+            "n": n.astype(int),
+            "prumer": prumer,
+            "smerodatna_odchylka": np.sqrt(m2 / n),
+            "min": np.where(n > 0, minimum, np.nan),
+            "max": np.where(n > 0, maximum, np.nan),
+        }, index=list(sloupce))
+
 # Registrace fontů
+# matplotlib, reportlab a python-docx se importují až při prvním vykreslení,
+# aby načtení modulu (a start aplikace) zůstalo rychlé.
 base_dir = os.path.dirname(os.path.abspath(__file__))
 times_font_path = os.path.join(base_dir, "times.ttf")
 times_bold_font_path = os.path.join(base_dir, "timesbd.ttf")
-pdfmetrics.registerFont(TTFont('TimesNewRoman', times_font_path))
-pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', times_bold_font_path))
 
-styles = getSampleStyleSheet()
-styles.add(ParagraphStyle(name="Custom-Regular", fontName="TimesNewRoman", fontSize=12))
-styles.add(ParagraphStyle(name="Custom-Bold", fontName="TimesNewRoman-Bold", fontSize=14, spaceAfter=10, leading=16))
+@functools.lru_cache(maxsize=None)
+def registruj_fonty():
+    """Zaregistruje fonty Times New Roman pro ReportLab, v rámci procesu jen jednou."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    if os.path.exists(times_font_path) and os.path.exists(times_bold_font_path):
+        pdfmetrics.registerFont(TTFont('TimesNewRoman', times_font_path))
+        pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', times_bold_font_path))
+    return set(pdfmetrics.getRegisteredFontNames())
+
+@functools.lru_cache(maxsize=None)
+def _pdf_styly():
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    registruj_fonty()
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="Custom-Regular", fontName="TimesNewRoman", fontSize=12))
+    styles.add(ParagraphStyle(name="Custom-Bold", fontName="TimesNewRoman-Bold", fontSize=14, spaceAfter=10, leading=16))
+    return styles
 
 # Předdefinované skupiny grafů a popisky proměnných
 GRAPH_GROUPS = [
@@ -90,10 +245,158 @@ variable_legends = {
     "Vnejsi rotace excentricka (300°/s)": "Izokinetická síla při vnější rotaci ramene, 300°/s."
 }
 
-def generate_graph(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar", 
+# Mezipaměť vykreslených grafů (PNG) v paměti a na disku podle hashe vstupů
+CHART_CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, "grafy_cache")
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CHART_CACHE_DISK_MAX_BYTES = 512 * 1024 * 1024
+_chart_cache = Mezipamet(CHART_CACHE_MAX_BYTES, velikost=len)
+# Velikost složky na disku se odhaduje průběžně ze zapsaných grafů; složka se prochází jen
+# po překročení limitu nebo jednou za interval (grafy mohou zapisovat i jiné procesy).
+# Úklid maže nejstarší grafy až pod cílový podíl limitu, aby se neopakoval po každém zápisu.
+CHART_CACHE_UKLID_INTERVAL_S = 300
+CHART_CACHE_DISK_CIL_PODIL = 0.8
+_chart_disk_lock = threading.Lock()
+_chart_disk_bajtu = None
+_chart_disk_uklid = 0.0
+
+def _hodnota_pro_klic(val):
+    if isinstance(val, pd.Timedelta):
+        return val.total_seconds()
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return str(val)
+
+def _klic_grafu(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type, label_current, label_reference):
+    data = [nazev, [_hodnota_pro_klic(v) for v in hodnoty_proband], [_hodnota_pro_klic(v) for v in hodnoty_avg],
+            [str(p) for p in popisky], graph_type, label_current, label_reference]
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _uloz_graf_na_disk(klic, png):
+    os.makedirs(CHART_CACHE_FOLDER, exist_ok=True)
+    cesta = os.path.join(CHART_CACHE_FOLDER, f"{klic}.png")
+    tmp_cesta = f"{cesta}.{os.getpid()}.tmp"
+    with open(tmp_cesta, "wb") as f:
+        f.write(png)
+    os.replace(tmp_cesta, cesta)
+    global _chart_disk_bajtu
+    with _chart_disk_lock:
+        if _chart_disk_bajtu is not None:
+            _chart_disk_bajtu += len(png)
+
+def _uklid_chart_cache():
+    global _chart_disk_bajtu, _chart_disk_uklid
+    with _chart_disk_lock:
+        if (_chart_disk_bajtu is not None and _chart_disk_bajtu <= CHART_CACHE_DISK_MAX_BYTES
+                and time.monotonic() - _chart_disk_uklid < CHART_CACHE_UKLID_INTERVAL_S):
+            return
+        _chart_disk_uklid = time.monotonic()
+    soubory = []
+    for entry in os.scandir(CHART_CACHE_FOLDER):
+        if entry.name.endswith(".png"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            soubory.append((stat.st_mtime, stat.st_size, entry.path))
+    celkem = sum(size for _, size, _ in soubory)
+    cil = CHART_CACHE_DISK_MAX_BYTES if celkem <= CHART_CACHE_DISK_MAX_BYTES else CHART_CACHE_DISK_MAX_BYTES * CHART_CACHE_DISK_CIL_PODIL
+    for _, size, path in sorted(soubory):
+        if celkem <= cil:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        celkem -= size
+    with _chart_disk_lock:
+        _chart_disk_bajtu = celkem
+
+def _nacti_graf_z_disku(klic):
+    cesta = os.path.join(CHART_CACHE_FOLDER, f"{klic}.png")
+    try:
+        with open(cesta, "rb") as f:
+            png = f.read()
+        os.utime(cesta)
+    except FileNotFoundError:
+        return None
+    return png
+
+# Pool procesů pro paralelní vykreslování grafů; vytváří se líně a znovu po forku procesu.
+_graf_pool = None
+_graf_pool_pid = None
+_graf_pool_lock = threading.Lock()
+_paralelni_grafy = True
+
+def _ziskej_graf_pool():
+    global _graf_pool, _graf_pool_pid
+    # Reporty se mohou vykreslovat souběžně z více vláken (fronta úloh), pool vznikne jen jednou
+    with _graf_pool_lock:
+        if _graf_pool is None or _graf_pool_pid != os.getpid():
+            _graf_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            _graf_pool_pid = os.getpid()
+        return _graf_pool
+
+def _vykresli_png(graph_spec):
+    return _vykresli_graf(**graph_spec).getvalue()
+
+def _vykresli_chybejici(specifikace):
+    global _graf_pool
+    if len(specifikace) < 2 or not _paralelni_grafy or (os.cpu_count() or 1) < 2:
+        return [_vykresli_png(spec) for spec in specifikace]
+    try:
+        return list(_ziskej_graf_pool().map(_vykresli_png, specifikace))
+    except BrokenProcessPool:
+        logger.warning("Pool pro vykreslování grafů selhal, vykresluji sériově.")
+        _graf_pool = None
+        return [_vykresli_png(spec) for spec in specifikace]
+
+@casovat("grafy")
+def vykresli_grafy(specifikace):
+    """
+    Vrátí PNG grafů (BytesIO) ve stejném pořadí jako seznam specifikací.
+
+    Každá specifikace je slovník argumentů generate_graph. Grafy, které nejsou
+    v mezipaměti, se vykreslí najednou paralelně v procesech.
+    """
+    klice = [_klic_grafu(**spec) for spec in specifikace]
+    png = {}
+    chybejici = {}
+    for klic, spec in zip(klice, specifikace):
+        if klic in png or klic in chybejici:
+            continue
+        data = _chart_cache.get(klic)
+        if data is None:
+            data = _nacti_graf_z_disku(klic)
+        if data is None:
+            chybejici[klic] = spec
+        else:
+            _chart_cache.put(klic, data)
+            png[klic] = data
+    if chybejici:
+        logger.info(f"Vykresluji {len(chybejici)} grafů, {len(png)} z mezipaměti")
+        for klic, data in zip(chybejici, _vykresli_chybejici(list(chybejici.values()))):
+            _uloz_graf_na_disk(klic, data)
+            _chart_cache.put(klic, data)
+            png[klic] = data
+        _uklid_chart_cache()
+    pocitej(grafy=len(klice), vykresleno=len(chybejici))
+    return [BytesIO(png[klic]) for klic in klice]
+
+def generate_graph(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar",
+                   label_current="Aktuální měření", label_reference="Historické měření"):
+    return vykresli_grafy([dict(nazev=nazev, hodnoty_proband=hodnoty_proband, hodnoty_avg=hodnoty_avg,
+                                popisky=popisky, graph_type=graph_type, label_current=label_current,
+                                label_reference=label_reference)])[0]
+
+def _vykresli_graf(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar",
                    label_current="Aktuální měření", label_reference="Historické měření"):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
     logger.info(f"Generuji graf: {nazev}, typ: {graph_type}")
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
     if graph_type == "bar":
         x = np.arange(len(popisky))
         bar_width = 0.4
@@ -127,194 +430,448 @@ def generate_graph(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar
         ax.set_xticklabels(popisky, rotation=20, ha="right", fontsize=12)
         ax.legend(fontsize=12)
         ax.yaxis.grid(True, linestyle="--", alpha=0.7)
+    elif graph_type == "trend":
+        # Časová řada jednoho parametru: popisky jsou data měření, hodnoty_avg proložená přímka
+        datumy = pd.to_datetime(popisky)
+        ax.plot(datumy, hodnoty_proband, marker="o", markersize=4 if len(popisky) > 30 else 6,
+                label=label_current, color="#1F4E79")
+        ax.plot(datumy, hodnoty_avg, linestyle="--", label=label_reference, color="#A0A0A0")
+        if len(popisky) <= 12:
+            for x, y in zip(datumy, hodnoty_proband):
+                ax.text(x, y, f"{y:.2f}", ha="center", va="bottom", fontsize=10, fontweight="bold")
+        ax.set_title(nazev, fontsize=16, fontweight="bold", pad=20)
+        fig.autofmt_xdate()
+        ax.legend(fontsize=12)
+        ax.yaxis.grid(True, linestyle="--", alpha=0.7)
     else:
         logger.warning(f"Neznámý typ grafu: {graph_type}, používám 'bar'.")
-        return generate_graph(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar",
+        return _vykresli_graf(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar",
                               label_current=label_current, label_reference=label_reference)
     
     buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches="tight")
-    plt.close()
+    fig.savefig(buf, format='png', bbox_inches="tight")
     buf.seek(0)
     return buf
 
-def interpretuj_graf(nazev, hodnoty_proband, hodnoty_avg, popisky):
-    desired_direction = {
-        "Vnitrni rotace koncentricka (210°/s)": "higher",
-        "Vnejsi rotace koncentricka (210°/s)": "higher",
-        "Vnitrni rotace excentricka (210°/s)": "higher",
-        "Vnejsi rotace excentricka (210°/s)": "higher",
-        "Vnitrni rotace koncentricka (300°/s)": "higher",
-        "Vnejsi rotace koncentricka (300°/s)": "higher",
-        "Vnitrni rotace excentricka (300°/s)": "higher",
-        "Vnejsi rotace excentricka (300°/s)": "higher",
-        "Rychlost podani": "higher",
-        "Sila uchopu": "higher",
-        "Dominantni paze": "higher",
-        "Dominantni noha": "higher",
-        "Trupova hmotnost": "optimal",
-        "Telesny tuk": "lower",
-        "Dominantni paze - beztukova": "higher",
-        "Dominantni noha - beztukova": "higher",
-        "Trup - betukovy": "optimal",
-        "Beztukova hmota": "higher",
-        "IR/ER (210°/s)": "optimal",
-        "IR/ER (300°/s)": "optimal"
-    }
-    
+# Žádoucí směr změny jednotlivých proměnných; neuvedené proměnné se hodnotí jako "higher".
+desired_direction = {
+    "Vnitrni rotace koncentricka (210°/s)": "higher",
+    "Vnejsi rotace koncentricka (210°/s)": "higher",
+    "Vnitrni rotace excentricka (210°/s)": "higher",
+    "Vnejsi rotace excentricka (210°/s)": "higher",
+    "Vnitrni rotace koncentricka (300°/s)": "higher",
+    "Vnejsi rotace koncentricka (300°/s)": "higher",
+    "Vnitrni rotace excentricka (300°/s)": "higher",
+    "Vnejsi rotace excentricka (300°/s)": "higher",
+    "Rychlost podani": "higher",
+    "Sila uchopu": "higher",
+    "Dominantni paze": "higher",
+    "Dominantni noha": "higher",
+    "Trupova hmotnost": "optimal",
+    "Telesny tuk": "lower",
+    "Dominantni paze - beztukova": "higher",
+    "Dominantni noha - beztukova": "higher",
+    "Trup - betukovy": "optimal",
+    "Beztukova hmota": "higher",
+    "IR/ER (210°/s)": "optimal",
+    "IR/ER (300°/s)": "optimal"
+}
+
+# Kategorie hodnocení vracené funkcí klasifikuj_hodnoty
+SROVNATELNE, ZLEPSENI, ZHORSENI, ODLISNE = 0, 1, 2, 3
+KATEGORIE_HODNOCENI = {SROVNATELNE: "srovnatelné", ZLEPSENI: "zlepšení", ZHORSENI: "zhoršení", ODLISNE: "odlišné"}
+PRAH_SROVNATELNOSTI = 0.1
+# Měsíční změna (v % průměru), pod kterou se trend považuje za stabilní
+PRAH_STABILNIHO_TRENDU_PCT = 0.5
+
+def klasifikuj_hodnoty(hodnoty, reference, popisky):
+    """
+    Vyhodnotí hodnoty probanda (vektor) nebo celé skupiny (matice proband × proměnná)
+    vůči referenci jedním vektorovým průchodem.
+
+    Vrací slovník s poli "rozdil" a "kategorie" (tvar jako hodnoty), "smer" (pro každou
+    proměnnou) a seznamem "popisky".
+    """
+    hodnoty = np.asarray(hodnoty, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    smer = np.array([desired_direction.get(p, "higher") for p in popisky])
+    rozdil = hodnoty - reference
+    higher = smer == "higher"
+    lower = smer == "lower"
+    kategorie = np.full(rozdil.shape, ODLISNE, dtype=np.int8)
+    kategorie = np.where(higher, np.where(rozdil > 0, ZLEPSENI, ZHORSENI), kategorie)
+    kategorie = np.where(lower, np.where(rozdil < 0, ZLEPSENI, ZHORSENI), kategorie)
+    kategorie = np.where(np.abs(rozdil) < PRAH_SROVNATELNOSTI, SROVNATELNE, kategorie).astype(np.int8)
+    return {"popisky": list(popisky), "rozdil": rozdil, "kategorie": kategorie, "smer": smer}
+
+def klasifikuj_kohortu(df, sloupce, reference=None):
+    """
+    Vyhodnotí všechny probandy a proměnné najednou vůči referenci (výchozí je průměr skupiny).
+
+    Vrací DataFrame s názvy kategorií (řádky jako df, sloupce podle sloupce).
+    """
+    hodnoty = df[sloupce].to_numpy(dtype=float)
+    if reference is None:
+        reference = np.nanmean(hodnoty, axis=0)
+    vysledek = klasifikuj_hodnoty(hodnoty, reference, sloupce)
+    nazvy = np.array([KATEGORIE_HODNOCENI[k] for k in sorted(KATEGORIE_HODNOCENI)])
+    return pd.DataFrame(nazvy[vysledek["kategorie"]], index=df.index, columns=sloupce)
+
+def popis_hodnoceni(vysledek):
+    """Převede výsledek klasifikuj_hodnoty pro jednoho probanda na text vyhodnocení grafu."""
     interpretations = []
-    for i, label in enumerate(popisky):
-        diff = hodnoty_proband[i] - hodnoty_avg[i]
-        direction = desired_direction.get(label, "higher")
-        if abs(diff) < 0.1:
+    for label, diff, kategorie, direction in zip(vysledek["popisky"], vysledek["rozdil"], vysledek["kategorie"], vysledek["smer"]):
+        if kategorie == SROVNATELNE:
             interpretations.append(f"U '{label}' je hodnota aktuálního měření srovnatelná s referenční hodnotou.")
+        elif kategorie == ODLISNE:
+            interpretations.append(f"U '{label}' je aktuální měření o {abs(diff):.2f} odlišné od referenční hodnoty.")
         else:
-            if direction == "higher":
-                if diff > 0:
-                    interpretations.append(f"U '{label}' je aktuální měření o {diff:.2f} vyšší, což značí zlepšení.")
-                else:
-                    interpretations.append(f"U '{label}' je aktuální měření o {abs(diff):.2f} nižší, což může naznačovat potřebu zlepšení.")
-            elif direction == "lower":
-                if diff < 0:
-                    interpretations.append(f"U '{label}' je aktuální měření o {abs(diff):.2f} nižší, což značí zlepšení.")
-                else:
-                    interpretations.append(f"U '{label}' je aktuální měření o {diff:.2f} vyšší, což může být nežádoucí.")
+            vyssi = (kategorie == ZLEPSENI) == (direction == "higher")
+            if kategorie == ZLEPSENI:
+                dopad = "což značí zlepšení"
+            elif direction == "higher":
+                dopad = "což může naznačovat potřebu zlepšení"
             else:
-                interpretations.append(f"U '{label}' je aktuální měření o {abs(diff):.2f} odlišné od referenční hodnoty.")
+                dopad = "což může být nežádoucí"
+            interpretations.append(f"U '{label}' je aktuální měření o {abs(diff):.2f} {'vyšší' if vyssi else 'nižší'}, {dopad}.")
     return " ".join(interpretations)
 
-def generuj_analyzu(proband_id, file_path, zaverecne_hodnoceni=None,
-                     selected_columns=None, selected_graphs=None,
-                     selected_graph_type="bar", data_df=None, comparison_data=None,
-                     advanced_stats=False, group_label=None, selected_graph_vars=None):
-    logger.info(f"Generuji analýzu pro probanda: {proband_id}")
+def interpretuj_graf(nazev, hodnoty_proband, hodnoty_avg, popisky):
+    return popis_hodnoceni(klasifikuj_hodnoty(hodnoty_proband, hodnoty_avg, popisky))
+
+# ---- Model reportu -----------------------------------------------------------
+
+DEFAULT_COLUMNS = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", ZDROJ_SLOUPEC]
+
+# Mezipaměť základu modelu (tabulky a statistiky) podle dat, probanda a reference;
+# limit je počet uložených modelů.
+MODEL_CACHE_MAX_POLOZEK = 256
+_model_cache = Mezipamet(MODEL_CACHE_MAX_POLOZEK, velikost=lambda _: 1)
+
+def _hodnota_ir_er(comparison_data, col):
+    val = comparison_data.get(col, None)
+    if val is None and col == "IR/ER (210°/s)":
+        if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
+            val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
+    if val is None and col == "IR/ER (300°/s)":
+        if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
+            val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
+    return val
+
+def _klic_dat(file_path, data_df):
+    if data_df is None:
+        return ("soubor", _hash_zdroje(file_path), verze_zmen(zdroj_dat(file_path)))
+    # Obsah DataFrame se hashuje jen jednou pro daný objekt (registr indexů podle id)
+    return odvozeny_vysledek(data_df, "klic_dat", lambda df: (
+        "df", tuple(df.columns), len(df), int(pd.util.hash_pandas_object(df, index=False).sum())))
+
+def _zaklad_modelu(proband_id, file_path, selected_columns, data_df, comparison_data, group_stats, rozdeleni=None):
+    klic = (_klic_dat(file_path, data_df), proband_id,
+            tuple(selected_columns) if selected_columns is not None else None,
+            json.dumps(comparison_data, sort_keys=True, default=str) if comparison_data is not None else None,
+            int(pd.util.hash_pandas_object(group_stats).sum()) if group_stats is not None else None,
+            otisk_rozdeleni(rozdeleni) if rozdeleni is not None else None)
+    zaklad = _model_cache.get(klic)
+    pocitej(z_mezipameti=zaklad is not None)
+    if zaklad is not None:
+        return zaklad
+
     if data_df is not None:
-        df = data_df.copy()
+        df = sdilej_indexy(data_df, data_df.copy())
     else:
         df = load_data(file_path)
-    df.columns = df.columns.str.strip().str.replace("\\s+", " ", regex=True)
-    
-    default_columns = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost"]
+    normalizuj_sloupce(df)
     if selected_columns is None:
-        selected_columns = [col for col in df.columns if col not in default_columns]
-    
+        selected_columns = [col for col in df.columns if col not in DEFAULT_COLUMNS]
     selected_columns = [c for c in selected_columns if c in df.columns]
-    
-    if "Vnitrni rotace koncentricka (210°/s)" in df.columns and "Vnejsi rotace koncentricka (210°/s)" in df.columns:
-        df["IR/ER (210°/s)"] = df["Vnitrni rotace koncentricka (210°/s)"] / df["Vnejsi rotace koncentricka (210°/s)"]
-        if "IR/ER (210°/s)" not in selected_columns:
-            selected_columns.append("IR/ER (210°/s)")
-    if "Vnitrni rotace koncentricka (300°/s)" in df.columns and "Vnejsi rotace koncentricka (300°/s)" in df.columns:
-        df["IR/ER (300°/s)"] = df["Vnitrni rotace koncentricka (300°/s)"] / df["Vnejsi rotace koncentricka (300°/s)"]
-        if "IR/ER (300°/s)" not in selected_columns:
-            selected_columns.append("IR/ER (300°/s)")
-    
-    df.fillna(0, inplace=True)
-    proband_data = df[df["Identifikace"] == proband_id].iloc[0]
-    
-    pdf_path = os.path.join(OUTPUT_FOLDER, f"analyza_{sanitize_name(proband_id)}.pdf")
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    elements = []
-    
-    elements.append(Paragraph("Univerzita Karlova, Fakulta tělesné výchovy a sportu", styles["Custom-Bold"]))
-    elements.append(Spacer(1, 12))
-    
-    elements.append(Paragraph(f"Analýza probanda {proband_id}", styles["Custom-Bold"]))
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph(f"Věk: {proband_data['Vek']} let", styles["Custom-Regular"]))
-    elements.append(Paragraph(f"Výška: {proband_data['Vyska']} cm", styles["Custom-Regular"]))
-    elements.append(Paragraph(f"Hmotnost: {proband_data['Hmotnost']} kg", styles["Custom-Regular"]))
-    elements.append(Spacer(1, 12))
-    
+    pridej_pomery_ir_er(df)
+    for ratio in ("IR/ER (210°/s)", "IR/ER (300°/s)"):
+        if ratio in df.columns and ratio not in selected_columns:
+            selected_columns.append(ratio)
+
+    # Statistiky, rozdělení i percentil probanda se počítají z dat před doplněním nul,
+    # chybějící hodnoty se tak do nich nezapočítají
+    if group_stats is None:
+        with usek("statistiky", radky=len(df)):
+            group_stats = spocitej_statistiky_skupiny(df)
+            if rozdeleni is None:
+                rozdeleni = rozdeleni_z_dat(df)
+    nevyplnena_data = najdi_radek(df, proband_id)
+    vypln_chybejici(df)
+    prumery = group_stats["prumer"]
+    proband_data = najdi_radek(df, proband_id)
+
+    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    if comparison_data is None:
+        reference = {col: prumery[col] for col in numeric_cols if col in prumery.index}
+    else:
+        reference = {col: _hodnota_ir_er(comparison_data, col) for col in numeric_cols}
+
+    radky = []
+    for col in df.columns:
+        if col not in DEFAULT_COLUMNS and col in selected_columns and col in reference:
+            if reference[col] is not None:
+                radky.append((col, proband_data[col], reference[col], proband_data[col] - reference[col]))
+
+    # Percentilové pořadí probanda v referenční populaci (jen při srovnání se skupinou)
+    percentily = {}
+    if comparison_data is None and rozdeleni:
+        percentily = percentilova_poradi({col: nevyplnena_data[col] for col, *_ in radky}, rozdeleni)
+
+    rozsirene = []
+    for col in selected_columns:
+        if col in numeric_cols and col in group_stats.index:
+            median_val, best_val, worst_val, ci_lower, ci_upper = group_stats.loc[col, ["median", "max", "min", "ci_spodni", "ci_horni"]]
+            rozsirene.append((col, median_val, best_val, worst_val, ci_lower, ci_upper))
+
+    zaklad = {
+        "proband_id": proband_id,
+        "vek": proband_data["Vek"],
+        "vyska": proband_data["Vyska"],
+        "hmotnost": proband_data["Hmotnost"],
+        "datum": proband_data.get("DatumMereni", "N/A"),
+        "datum_historie": comparison_data.get("DatumMereni", "N/A") if comparison_data is not None else None,
+        "srovnani_s_historii": comparison_data is not None,
+        "selected_columns": selected_columns,
+        "hodnoty": {col: proband_data[col] for col in numeric_cols},
+        "reference": reference,
+        "radky": radky,
+        "percentily": percentily,
+        "rozsirene_statistiky": rozsirene,
+    }
+    _model_cache.put(klic, zaklad)
+    return zaklad
+
+@casovat("model")
+def sestav_model_reportu(proband_id, file_path, selected_columns=None, data_df=None, comparison_data=None,
+                         group_stats=None, group_label=None, selected_graphs=None, selected_graph_vars=None,
+                         selected_graph_type="bar", advanced_stats=False, zaverecne_hodnoceni=None, rozdeleni=None,
+                         historie_mereni=None):
+    """
+    Sestaví model reportu nezávislý na výstupním formátu.
+
+    Model obsahuje údaje o probandovi, řádky tabulky výsledků, rozšířené statistiky,
+    specifikace grafů s legendou a strukturovaným hodnocením a závěrečné hodnocení. Z modelu
+    vykreslují výstup funkce vykresli_pdf, vykresli_docx a vykresli_podklad. Jsou-li zadána
+    historie_mereni (všechna měření probanda se sloupcem DatumMereni), model obsahuje i vývoj
+    parametrů v čase s trendovými grafy.
+    """
+    zaklad = _zaklad_modelu(proband_id, file_path, selected_columns, data_df, comparison_data, group_stats, rozdeleni)
+    model = dict(zaklad)
+    hodnoty = zaklad["hodnoty"]
+    reference = zaklad["reference"]
+    selected_columns = zaklad["selected_columns"]
+    date_value = zaklad["datum"]
+
     if comparison_data is None:
-        date_value = proband_data.get("DatumMereni", "N/A")
         if group_label is not None:
             if group_label == "Aktuální skupina":
-                elements.append(Paragraph(f"Porovnání probanda s průměrnou hodnotou aktuální skupiny – datum: {date_value}", styles["Custom-Regular"]))
+                model["popis_srovnani"] = f"Porovnání probanda s průměrnou hodnotou aktuální skupiny – datum: {date_value}"
             else:
-                elements.append(Paragraph(f"Porovnání probanda s průměrnou hodnotou vybrané populace – datum: {date_value}", styles["Custom-Regular"]))
+                model["popis_srovnani"] = f"Porovnání probanda s průměrnou hodnotou vybrané populace – datum: {date_value}"
+            model["shrnuti_srovnani"] = f"• Porovnání: Proband vs. {group_label}."
         else:
-            elements.append(Paragraph(f"Porovnání probanda s průměrným výsledkem skupiny – datum: {date_value}", styles["Custom-Regular"]))
+            model["popis_srovnani"] = f"Porovnání probanda s průměrným výsledkem skupiny – datum: {date_value}"
+            model["shrnuti_srovnani"] = "• Porovnání: Proband vs. průměr skupiny."
+        current_label = "Proband"
+        reference_label = group_label if group_label is not None else "Průměr skupiny"
     else:
-        current_date = proband_data.get("DatumMereni", "N/A")
-        historical_date = comparison_data.get("DatumMereni", "N/A")
-        elements.append(Paragraph(f"Datum aktuálního měření: {current_date}    Datum vybraného historického měření: {historical_date}", styles["Custom-Regular"]))
+        model["popis_srovnani"] = f"Datum aktuálního měření: {date_value}    Datum vybraného historického měření: {zaklad['datum_historie']}"
+        model["shrnuti_srovnani"] = "• Porovnání: Aktuální měření vs. historické měření."
+        current_label = "Aktuální měření"
+        reference_label = "Historické měření"
+
+    grafy = []
+    for nazev, popisky, _ in GRAPH_GROUPS:
+        if selected_graphs is not None and nazev not in selected_graphs:
+            continue
+        filtered_popisky = [p for p in popisky if p in selected_columns and p in reference]
+        if not filtered_popisky:
+            continue
+        comp_values = [reference[p] for p in filtered_popisky]
+        legend_text = "Legenda:\n"
+        for var in filtered_popisky:
+            if var in variable_legends:
+                legend_text += f"{var}: {variable_legends[var]}\n"
+        grafy.append({
+            "nadpis": nazev,
+            "graf": dict(nazev=nazev,
+                         hodnoty_proband=[hodnoty[p] for p in filtered_popisky],
+                         hodnoty_avg=comp_values,
+                         popisky=filtered_popisky,
+                         graph_type=selected_graph_type,
+                         label_current=current_label,
+                         label_reference=reference_label),
+            "legenda": legend_text,
+            "hodnoceni": klasifikuj_hodnoty([hodnoty[p] for p in filtered_popisky], comp_values, filtered_popisky),
+        })
+
+    if selected_graph_vars is not None:
+        for var in selected_graph_vars:
+            avg_val = reference.get(var) if reference.get(var) is not None else 0
+            grafy.append({
+                "nadpis": var,
+                "graf": dict(nazev=var,
+                             hodnoty_proband=[hodnoty[var]],
+                             hodnoty_avg=[avg_val],
+                             popisky=[var],
+                             graph_type=selected_graph_type,
+                             label_current=current_label,
+                             label_reference=reference_label),
+                "legenda": f"Legenda: Graf proměnné {var} zobrazuje hodnotu probanda (viz {current_label}) a průměr skupiny/historické měření (viz {reference_label}).",
+                "hodnoceni": klasifikuj_hodnoty([hodnoty[var]], [avg_val], [var]),
+            })
+
+    model["grafy"] = grafy
+    model["advanced_stats"] = advanced_stats
+    model["zaverecne_hodnoceni"] = zaverecne_hodnoceni.strip() if zaverecne_hodnoceni and zaverecne_hodnoceni.strip() else None
+    model["trend"] = _sestav_trend(proband_id, historie_mereni, selected_columns) if historie_mereni is not None else None
+    pocitej(parametry=len(selected_columns), grafy=len(grafy))
+    return model
+
+def _hodnoceni_trendu(parametr, relativni_zmena_pct):
+    if not np.isfinite(relativni_zmena_pct) or abs(relativni_zmena_pct) < PRAH_STABILNIHO_TRENDU_PCT:
+        return "stabilní"
+    roste = relativni_zmena_pct > 0
+    smer = desired_direction.get(parametr, "higher")
+    if smer == "optimal":
+        # U parametrů s optimální hodnotou není růst ani pokles sám o sobě zlepšením
+        return "roste" if roste else "klesá"
+    return "zlepšování" if roste == (smer == "higher") else "zhoršování"
+
+@casovat("trend")
+def _sestav_trend(proband_id, historie_mereni, selected_columns):
+    """Vývoj vybraných parametrů ze všech měření probanda: tabulka trendů a specifikace grafů."""
+    if "DatumMereni" not in historie_mereni.columns or historie_mereni.empty:
+        return None
+    df = pridej_pomery_ir_er(historie_mereni.copy())
+    df["Identifikace"] = proband_id
+    sloupce = [c for c in selected_columns if c in df.columns and pd.api.types.is_numeric_dtype(df[c])]
+    trendy = spocitej_trendy(df, sloupce, desired_direction)
+    if trendy.empty:
+        return None
+    trendy = trendy.loc[proband_id]
+    casy = pd.to_datetime(df["DatumMereni"], errors="coerce").dropna()
+
+    radky, grafy = [], []
+    for col, t in trendy.iterrows():
+        hodnoceni = _hodnoceni_trendu(col, t["relativni_zmena_pct"])
+        radky.append({"parametr": col, "n": int(t["n"]), "zmena_za_mesic": t["zmena_za_mesic"],
+                      "celkova_zmena": t["celkova_zmena"], "nejlepsi": t["nejlepsi"], "datum_nejlepsi": t["datum_nejlepsi"],
+                      "nejhorsi": t["nejhorsi"], "datum_nejhorsi": t["datum_nejhorsi"],
+                      "hodnoceni": hodnoceni})
+        if t["n"] < 2:
+            continue
+        rada_casu, hodnoty = casova_rada(df, col)
+        if np.ptp(hodnoty) == 0:
+            continue
+        dny = (rada_casu - rada_casu[0]) / np.timedelta64(1, "D")
+        prolozeni = hodnoty.mean() + np.nan_to_num(t["sklon_za_den"]) * (dny - dny.mean())
+        grafy.append({
+            "nadpis": f"Vývoj v čase: {col}",
+            "graf": dict(nazev=f"Vývoj v čase: {col} ({hodnoceni})",
+                         hodnoty_proband=hodnoty.tolist(),
+                         hodnoty_avg=prolozeni.tolist(),
+                         popisky=[pd.Timestamp(c).strftime("%Y-%m-%d %H:%M") for c in rada_casu],
+                         graph_type="trend",
+                         label_current=col,
+                         label_reference="Lineární trend"),
+        })
+    pocitej(mereni=len(df), grafy=len(grafy))
+    return {"pocet_mereni": int(casy.nunique()), "od": casy.min(), "do": casy.max(), "radky": radky, "grafy": grafy}
+
+# ---- Vykreslení modelu do PDF, DOCX a textu -----------------------------------
+
+def _tabulka_vysledku(model):
+    """Řádky tabulky výsledků včetně záhlaví; sloupec Percentil jen při srovnání s populací."""
+    header = ["Parametr", "Aktuální", "Historické" if model["srovnani_s_historii"] else "Průměr", "Rozdíl"]
+    percentily = model.get("percentily") or {}
+    if percentily:
+        header.append("Percentil")
+    tabulka = [header]
+    for col, akt, ref, rozdil in model["radky"]:
+        radek = [col, format_val(akt), format_val(ref), format_val(rozdil)]
+        if percentily:
+            radek.append(f"{percentily[col]:.0f}" if col in percentily else "–")
+        tabulka.append(radek)
+    return tabulka
+
+def _format_datum(datum):
+    return pd.Timestamp(datum).strftime("%d.%m.%Y") if pd.notna(datum) else "–"
+
+def _popis_trendu(model):
+    trend = model["trend"]
+    return (f"Vývoj v čase: {trend['pocet_mereni']} měření "
+            f"({_format_datum(trend['od'])} – {_format_datum(trend['do'])})")
+
+def _extrem_trendu(hodnota, datum):
+    # Parametry s optimální hodnotou nemají nejlepší ani nejhorší měření
+    return f"{format_val(hodnota)} ({_format_datum(datum)})" if pd.notna(hodnota) else "–"
+
+def _tabulka_trendu(model):
+    """Řádky tabulky vývoje v čase včetně záhlaví."""
+    tabulka = [["Parametr", "Měření", "Změna/měsíc", "Celková změna", "Nejlepší", "Nejhorší", "Trend"]]
+    for r in model["trend"]["radky"]:
+        tabulka.append([r["parametr"], str(r["n"]), format_val(r["zmena_za_mesic"]) if r["n"] > 1 else "–",
+                        format_val(r["celkova_zmena"]),
+                        _extrem_trendu(r["nejlepsi"], r["datum_nejlepsi"]),
+                        _extrem_trendu(r["nejhorsi"], r["datum_nejhorsi"]),
+                        r["hodnoceni"]])
+    return tabulka
+
+# PDF kreslí grafy vektorově přímo v ReportLabu (grafy_pdf); False vrací PNG z matplotlibu
+VEKTOROVE_GRAFY_PDF = True
+
+def _grafy_pdf(specifikace, vektorove):
+    """Flowables grafů pro PDF ve stejném pořadí jako specifikace."""
+    from reportlab.platypus import Image
+    if not vektorove:
+        return [Image(png, width=450, height=300) for png in vykresli_grafy(specifikace)]
+    from grafy_pdf import vektorovy_graf
+    with usek("grafy", grafy=len(specifikace), vektorove=True):
+        return [vektorovy_graf(**spec) for spec in specifikace]
+
+def prvky_pdf(model, vektorove_grafy=None):
+    """Flowables ReportLabu s obsahem reportu jednoho probanda (pro vykresli_pdf i sestavu týmu)."""
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, PageBreak
+    from reportlab.lib import colors
+    styles = _pdf_styly()
+    elements = []
     
+    elements.append(Paragraph("Univerzita Karlova, Fakulta tělesné výchovy a sportu", styles["Custom-Bold"]))
     elements.append(Spacer(1, 12))
     
-    elements.append(Paragraph("Výsledky měření", styles["Custom-Bold"]))
-    if comparison_data is None:
-        data_table = []
-        header = ["Parametr", "Aktuální", "Průměr", "Rozdíl"]
-        data_table.append(header)
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                prumer = df[col].mean()
-                rozdil = proband_data[col] - prumer
-                data_table.append([col, format_val(proband_data[col]), format_val(prumer), format_val(rozdil)])
-        table = Table(data_table, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.grey),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,0), (-1,0), 'TimesNewRoman-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 12),
-            ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-            ('GRID', (0,0), (-1,-1), 1, colors.black)
-        ]))
-        elements.append(table)
-    else:
-        data_table = []
-        header = ["Parametr", "Aktuální", "Historické", "Rozdíl"]
-        data_table.append(header)
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                current_val = proband_data[col]
-                hist_val = comparison_data.get(col, None)
-                if hist_val is None and col == "IR/ER (210°/s)":
-                    if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
-                if hist_val is None and col == "IR/ER (300°/s)":
-                    if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
-                if hist_val is not None:
-                    diff_val = current_val - hist_val
-                    data_table.append([col, format_val(current_val), format_val(hist_val), format_val(diff_val)])
-        table = Table(data_table, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.grey),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,0), (-1,0), 'TimesNewRoman-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 12),
-            ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-            ('GRID', (0,0), (-1,-1), 1, colors.black)
-        ]))
-        elements.append(table)
-    
+    elements.append(Paragraph(f"Analýza probanda {model['proband_id']}", styles["Custom-Bold"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Věk: {model['vek']} let", styles["Custom-Regular"]))
+    elements.append(Paragraph(f"Výška: {model['vyska']} cm", styles["Custom-Regular"]))
+    elements.append(Paragraph(f"Hmotnost: {model['hmotnost']} kg", styles["Custom-Regular"]))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(model["popis_srovnani"], styles["Custom-Regular"]))
     elements.append(Spacer(1, 12))
     
-    if comparison_data is not None:
-        elements.append(Paragraph("• Porovnání: Aktuální měření vs. historické měření.", styles["Custom-Regular"]))
-    else:
-        if group_label is not None:
-            elements.append(Paragraph(f"• Porovnání: Proband vs. {group_label}.", styles["Custom-Regular"]))
-        else:
-            elements.append(Paragraph("• Porovnání: Proband vs. průměr skupiny.", styles["Custom-Regular"]))
+    elements.append(Paragraph("Výsledky měření", styles["Custom-Bold"]))
+    data_table = _tabulka_vysledku(model)
+    table = Table(data_table, hAlign='LEFT')
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.grey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('FONTNAME', (0,0), (-1,0), 'TimesNewRoman-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+        ('GRID', (0,0), (-1,-1), 1, colors.black)
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(model["shrnuti_srovnani"], styles["Custom-Regular"]))
     elements.append(Spacer(1, 12))
     
-    if advanced_stats:
+    if model["advanced_stats"]:
         elements.append(Paragraph("Rozšířené statistiky (vypočteno z aktuálních měření)", styles["Custom-Bold"]))
-        numeric_cols = [c for c in selected_columns if c in df.columns and pd.api.types.is_numeric_dtype(df[c])]
         table_data = [["Parametr", "Medián", "Nejlepší", "Nejhorší", "CI (spodní)", "CI (horní)"]]
-        for col in numeric_cols:
-            data = df[col].values
-            median_val = np.median(data)
-            best_val = np.max(data)
-            worst_val = np.min(data)
-            ci_lower = np.percentile(data, 2.5)
-            ci_upper = np.percentile(data, 97.5)
-            table_data.append([col, format_val(median_val), format_val(best_val), format_val(worst_val), format_val(ci_lower), format_val(ci_upper)])
+        for col, *hodnoty in model["rozsirene_statistiky"]:
+            table_data.append([col] + [format_val(v) for v in hodnoty])
         table2 = Table(table_data, hAlign='LEFT')
         table2.setStyle(TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
@@ -324,319 +881,160 @@ def generuj_analyzu(proband_id, file_path, zaverecne_hodnoceni=None,
         elements.append(table2)
         elements.append(Spacer(1, 12))
     
-    from analyza import generate_graph, interpretuj_graf
-    for nazev, popisky, _ in GRAPH_GROUPS:
-        if selected_graphs is not None and nazev not in selected_graphs:
-            continue
-        filtered_popisky = [p for p in popisky if p in selected_columns]
-        if not filtered_popisky:
-            continue
-        if comparison_data is None:
-            comp_values = [df[p].mean() for p in filtered_popisky]
-            if group_label is not None:
-                current_label = "Proband"
-                reference_label = group_label
-            else:
-                current_label = "Proband"
-                reference_label = "Průměr skupiny"
-        else:
-            comp_values = []
-            current_label = "Aktuální měření"
-            reference_label = "Historické měření"
-            for p in filtered_popisky:
-                val = comparison_data.get(p, None)
-                if val is None and p == "IR/ER (210°/s)":
-                    if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
-                        val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
-                if val is None and p == "IR/ER (300°/s)":
-                    if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
-                        val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
-                comp_values.append(val)
-        graph_img = generate_graph(nazev,
-                    [proband_data[p] for p in filtered_popisky],
-                    comp_values,
-                    filtered_popisky,
-                    graph_type=selected_graph_type,
-                    label_current=current_label,
-                    label_reference=reference_label)
+    trend_grafy = model["trend"]["grafy"] if model.get("trend") else []
+    if vektorove_grafy is None:
+        vektorove_grafy = VEKTOROVE_GRAFY_PDF
+    obrazky = _grafy_pdf([graf["graf"] for graf in model["grafy"] + trend_grafy], vektorove_grafy)
+    for graf, graph_img in zip(model["grafy"], obrazky):
         elements.append(PageBreak())
-        elements.append(Paragraph(nazev, styles["Custom-Bold"]))
-        elements.append(Image(graph_img, width=450, height=300))
-        legend_text = "Legenda:\n"
-        for var in filtered_popisky:
-            if var in variable_legends:
-                legend_text += f"{var}: {variable_legends[var]}\n"
+        elements.append(Paragraph(graf["nadpis"], styles["Custom-Bold"]))
+        elements.append(graph_img)
         elements.append(Spacer(1, 12))
-        elements.append(Paragraph(legend_text, styles["Custom-Regular"]))
-        interpretation_text = interpretuj_graf(nazev,
-                                                 [proband_data[p] for p in filtered_popisky],
-                                                 comp_values,
-                                                 filtered_popisky)
+        elements.append(Paragraph(graf["legenda"], styles["Custom-Regular"]))
         elements.append(Spacer(1, 12))
         elements.append(Paragraph("Vyhodnocení grafu:", styles["Custom-Bold"]))
-        elements.append(Paragraph(interpretation_text, styles["Custom-Regular"]))
-    
-    if selected_graph_vars is not None:
-        for var in selected_graph_vars:
-            if comparison_data is None:
-                avg_val = df[var].mean()
-                label_ref = "Průměr skupiny" if group_label is None else group_label
-                current_label = "Proband"
-            else:
-                avg_val = comparison_data.get(var, 0)
-                label_ref = "Historické měření"
-                current_label = "Aktuální měření"
-            graph_img = generate_graph(var,
-                        [proband_data[var]],
-                        [avg_val],
-                        [var],
-                        graph_type=selected_graph_type,
-                        label_current=current_label,
-                        label_reference=label_ref)
+        elements.append(Paragraph(popis_hodnoceni(graf["hodnoceni"]), styles["Custom-Regular"]))
+
+    if model.get("trend"):
+        elements.append(PageBreak())
+        elements.append(Paragraph(_popis_trendu(model), styles["Custom-Bold"]))
+        elements.append(Spacer(1, 12))
+        table3 = Table(_tabulka_trendu(model), hAlign='LEFT')
+        table3.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+            ('FONTSIZE', (0,0), (-1,-1), 7),
+            ('GRID', (0,0), (-1,-1), 1, colors.black)
+        ]))
+        elements.append(table3)
+        for graf, graph_img in zip(trend_grafy, obrazky[len(model["grafy"]):]):
             elements.append(PageBreak())
-            elements.append(Paragraph(var, styles["Custom-Bold"]))
-            elements.append(Image(graph_img, width=450, height=300))
-            legend_text = f"Legenda: Graf proměnné {var} zobrazuje hodnotu probanda (viz {current_label}) a průměr skupiny/historické měření (viz {label_ref})."
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph(legend_text, styles["Custom-Regular"]))
-            evaluation = interpretuj_graf(var, [proband_data[var]], [avg_val], [var])
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph("Vyhodnocení grafu:", styles["Custom-Bold"]))
-            elements.append(Paragraph(evaluation, styles["Custom-Regular"]))
+            elements.append(Paragraph(graf["nadpis"], styles["Custom-Bold"]))
+            elements.append(graph_img)
     
-    if zaverecne_hodnoceni and zaverecne_hodnoceni.strip():
+    if model["zaverecne_hodnoceni"]:
         elements.append(PageBreak())
         elements.append(Paragraph("Závěrečné doporučení", styles["Custom-Bold"]))
         elements.append(Spacer(1, 12))
-        for para in zaverecne_hodnoceni.strip().split("\n\n"):
+        for para in model["zaverecne_hodnoceni"].split("\n\n"):
             p = Paragraph(para.strip().replace("\n", "<br/>"), styles["Custom-Regular"])
             elements.append(p)
             elements.append(Spacer(1, 12))
-    
-    doc.build(elements)
-    logger.info(f"PDF report vygenerován: {pdf_path}")
-    return pdf_path
+    return elements
 
-def generuj_word_report(proband_id, file_path, zaverecne_hodnoceni=None,
-                        selected_columns=None, selected_graphs=None,
-                        selected_graph_type="bar",  # parametr přidaný
-                        advanced_stats=False, group_label=None, data_df=None, comparison_data=None,
-                        selected_graph_vars=None):
-    if data_df is not None:
-        df = data_df.copy()
+@casovat("pdf")
+def vykresli_pdf(model, pdf_path=None, vektorove_grafy=None):
+    """
+    Vykreslí model do PDF; pdf_path může být cesta nebo souborový objekt (např. BytesIO).
+
+    Grafy jsou vektorové (VEKTOROVE_GRAFY_PDF), s vektorove_grafy=False se vloží PNG z matplotlibu.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    if pdf_path is None:
+        pdf_path = os.path.join(OUTPUT_FOLDER, f"analyza_{sanitize_name(model['proband_id'])}.pdf")
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
+    elements = prvky_pdf(model, vektorove_grafy)
+    with usek("pdf_build", prvky=len(elements)) as pocty:
+        doc.build(elements)
+        pocty["stran"] = doc.page
+    if hasattr(pdf_path, "seek"):
+        pdf_path.seek(0)
+        logger.info("PDF report vygenerován do paměti")
     else:
-        df = load_data(file_path)
-    df.columns = df.columns.str.strip().str.replace("\\s+", " ", regex=True)
-    default_columns = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost"]
-    if selected_columns is None:
-        selected_columns = [col for col in df.columns if col not in default_columns]
-    df.fillna(0, inplace=True)
-    proband_data = df[df["Identifikace"] == proband_id].iloc[0]
-    
+        logger.info(f"PDF report vygenerován: {pdf_path}")
+    return pdf_path
+
+@casovat("docx")
+def vykresli_docx(model, word_path=None):
+    """Vykreslí model do DOCX; word_path může být cesta nebo souborový objekt (např. BytesIO)."""
+    from docx import Document
+    from docx.shared import Inches
     document = Document()
     document.add_heading("Univerzita Karlova, Fakulta tělesné výchovy a sportu", level=1)
-    document.add_heading(f"Analýza probanda {proband_id}", level=2)
-    document.add_paragraph(f"Věk: {proband_data['Vek']} let")
-    document.add_paragraph(f"Výška: {proband_data['Vyska']} cm")
-    document.add_paragraph(f"Hmotnost: {proband_data['Hmotnost']} kg")
-    
-    if comparison_data is None:
-        date_value = proband_data.get("DatumMereni", "N/A")
-        if group_label is not None:
-            if group_label == "Aktuální skupina":
-                document.add_paragraph(f"Porovnání probanda s průměrnou hodnotou aktuální skupiny – datum: {date_value}")
-            else:
-                document.add_paragraph(f"Porovnání probanda s průměrnou hodnotou vybrané populace – datum: {date_value}")
-        else:
-            document.add_paragraph(f"Porovnání probanda s průměrným výsledkem skupiny – datum: {date_value}")
-    else:
-        current_date = proband_data.get("DatumMereni", "N/A")
-        historical_date = comparison_data.get("DatumMereni", "N/A")
-        document.add_paragraph(f"Datum aktuálního měření: {current_date}    Datum vybraného historického měření: {historical_date}")
+    document.add_heading(f"Analýza probanda {model['proband_id']}", level=2)
+    document.add_paragraph(f"Věk: {model['vek']} let")
+    document.add_paragraph(f"Výška: {model['vyska']} cm")
+    document.add_paragraph(f"Hmotnost: {model['hmotnost']} kg")
+    document.add_paragraph(model["popis_srovnani"])
     
     document.add_heading("Výsledky měření", level=3)
-    if comparison_data is None:
-        table_data = [["Parametr", "Aktuální", "Průměr", "Rozdíl"]]
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                prumer = df[col].mean()
-                rozdil = proband_data[col] - prumer
-                table_data.append([col, format_val(proband_data[col]), format_val(prumer), format_val(rozdil)])
-    else:
-        table_data = [["Parametr", "Aktuální", "Historické", "Rozdíl"]]
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                current_val = proband_data[col]
-                hist_val = comparison_data.get(col, None)
-                if hist_val is None and col == "IR/ER (210°/s)":
-                    if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
-                if hist_val is None and col == "IR/ER (300°/s)":
-                    if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
-                if hist_val is not None:
-                    diff_val = current_val - hist_val
-                    table_data.append([col, format_val(current_val), format_val(hist_val), format_val(diff_val)])
+    table_data = _tabulka_vysledku(model)
     table = document.add_table(rows=len(table_data), cols=len(table_data[0]))
     for i, row in enumerate(table_data):
         for j, cell in enumerate(row):
             table.cell(i, j).text = str(cell)
     
-    if advanced_stats:
+    if model["advanced_stats"]:
         document.add_heading("Rozšířené statistiky (aktuální měření)", level=3)
         adv_table_data = [["Parametr", "Medián", "Nejlepší", "Nejhorší", "CI (spodní)", "CI (horní)"]]
-        numeric_cols = [c for c in selected_columns if c in df.columns and pd.api.types.is_numeric_dtype(df[c])]
-        for col in numeric_cols:
-            data = df[col].values
-            median_val = np.median(data)
-            best_val = np.max(data)
-            worst_val = np.min(data)
-            ci_lower = np.percentile(data, 2.5)
-            ci_upper = np.percentile(data, 97.5)
-            adv_table_data.append([col, format_val(median_val), format_val(best_val), format_val(worst_val), format_val(ci_lower), format_val(ci_upper)])
+        for col, *hodnoty in model["rozsirene_statistiky"]:
+            adv_table_data.append([col] + [format_val(v) for v in hodnoty])
         adv_table = document.add_table(rows=len(adv_table_data), cols=len(adv_table_data[0]))
         for i, row in enumerate(adv_table_data):
             for j, cell in enumerate(row):
                 adv_table.cell(i, j).text = str(cell)
     
-    if selected_graphs is not None:
-        for nazev, popisky, _ in GRAPH_GROUPS:
-            if nazev not in selected_graphs:
-                continue
-            filtered_popisky = [p for p in popisky if p in selected_columns]
-            if not filtered_popisky:
-                continue
-            if comparison_data is None:
-                comp_values = [df[p].mean() for p in filtered_popisky]
-                current_label = "Proband"
-                reference_label = "Průměr skupiny"
-            else:
-                comp_values = []
-                current_label = "Aktuální měření"
-                reference_label = "Historické měření"
-                for p in filtered_popisky:
-                    val = comparison_data.get(p, None)
-                    if val is None and p == "IR/ER (210°/s)":
-                        if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
-                            val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
-                    if val is None and p == "IR/ER (300°/s)":
-                        if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
-                            val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
-                    comp_values.append(val)
-            graph_img = generate_graph(nazev,
-                        [proband_data[p] for p in filtered_popisky],
-                        comp_values,
-                        filtered_popisky,
-                        graph_type=selected_graph_type,
-                        label_current=current_label,
-                        label_reference=reference_label)
-            document.add_heading(nazev, level=3)
-            document.add_picture(graph_img, width=Inches(6))
-            legend_text = "Legenda:\n"
-            for var in filtered_popisky:
-                if var in variable_legends:
-                    legend_text += f"{var}: {variable_legends[var]}\n"
-            document.add_paragraph(legend_text)
-            document.add_paragraph("Vyhodnocení grafu:")
-            interpretation_text = interpretuj_graf(nazev,
-                                                     [proband_data[p] for p in filtered_popisky],
-                                                     [df[p].mean() for p in filtered_popisky] if comparison_data is None else [comparison_data.get(p, None) for p in filtered_popisky],
-                                                     filtered_popisky)
-            document.add_paragraph(interpretation_text)
-    
-    if selected_graph_vars is not None:
-        for var in selected_graph_vars:
-            if comparison_data is None:
-                avg_val = df[var].mean()
-                label_ref = "Průměr skupiny" if group_label is None else group_label
-                current_label = "Proband"
-            else:
-                avg_val = comparison_data.get(var, 0)
-                label_ref = "Historické měření"
-                current_label = "Aktuální měření"
-            graph_img = generate_graph(var,
-                        [proband_data[var]],
-                        [avg_val],
-                        [var],
-                        graph_type=selected_graph_type,
-                        label_current=current_label,
-                        label_reference=label_ref)
-            document.add_heading(var, level=3)
+    trend_grafy = model["trend"]["grafy"] if model.get("trend") else []
+    obrazky = vykresli_grafy([graf["graf"] for graf in model["grafy"] + trend_grafy])
+    for graf, graph_img in zip(model["grafy"], obrazky):
+        document.add_heading(graf["nadpis"], level=3)
+        document.add_picture(graph_img, width=Inches(6))
+        document.add_paragraph(graf["legenda"])
+        document.add_paragraph("Vyhodnocení grafu:")
+        document.add_paragraph(popis_hodnoceni(graf["hodnoceni"]))
+
+    if model.get("trend"):
+        document.add_heading(_popis_trendu(model), level=3)
+        trend_data = _tabulka_trendu(model)
+        trend_table = document.add_table(rows=len(trend_data), cols=len(trend_data[0]))
+        for i, row in enumerate(trend_data):
+            for j, cell in enumerate(row):
+                trend_table.cell(i, j).text = str(cell)
+        for graf, graph_img in zip(trend_grafy, obrazky[len(model["grafy"]):]):
+            document.add_heading(graf["nadpis"], level=3)
             document.add_picture(graph_img, width=Inches(6))
-            legend_text = f"Legenda: Graf proměnné {var} zobrazuje hodnotu probanda (viz {current_label}) a průměr skupiny/historické měření (viz {label_ref})."
-            document.add_paragraph(legend_text)
-            evaluation = interpretuj_graf(var, [proband_data[var]], [avg_val], [var])
-            document.add_paragraph("Vyhodnocení grafu:")
-            document.add_paragraph(evaluation)
     
-    if zaverecne_hodnoceni and zaverecne_hodnoceni.strip():
+    if model["zaverecne_hodnoceni"]:
         document.add_heading("Závěrečné doporučení", level=3)
-        for para in zaverecne_hodnoceni.strip().split("\n\n"):
+        for para in model["zaverecne_hodnoceni"].split("\n\n"):
             document.add_paragraph(para.strip())
     
-    word_path = os.path.join(OUTPUT_FOLDER, f"analyza_{sanitize_name(proband_id)}.docx")
-    document.save(word_path)
+    if word_path is None:
+        word_path = os.path.join(OUTPUT_FOLDER, f"analyza_{sanitize_name(model['proband_id'])}.docx")
+    with usek("docx_ulozeni"):
+        document.save(word_path)
+    if hasattr(word_path, "seek"):
+        word_path.seek(0)
     return word_path
 
-def priprav_podklad(proband_id, file_path, selected_columns=None, data_df=None, comparison_data=None):
-    logger.info("Připravuji textový podklad pro GPT.")
-    if data_df is not None:
-        df = data_df.copy()
-    else:
-        df = load_data(file_path)
-    df.columns = df.columns.str.strip().str.replace("\\s+", " ", regex=True)
-    
-    default_columns = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost"]
-    if selected_columns is None:
-        selected_columns = [col for col in df.columns if col not in default_columns]
-    
-    if "Vnitrni rotace koncentricka (210°/s)" in df.columns and "Vnejsi rotace koncentricka (210°/s)" in df.columns:
-        df["IR/ER (210°/s)"] = df["Vnitrni rotace koncentricka (210°/s)"] / df["Vnejsi rotace koncentricka (210°/s)"]
-        if "IR/ER (210°/s)" not in selected_columns:
-            selected_columns.append("IR/ER (210°/s)")
-    if "Vnitrni rotace koncentricka (300°/s)" in df.columns and "Vnejsi rotace koncentricka (300°/s)" in df.columns:
-        df["IR/ER (300°/s)"] = df["Vnitrni rotace koncentricka (300°/s)"] / df["Vnejsi rotace koncentricka (300°/s)"]
-        if "IR/ER (300°/s)" not in selected_columns:
-            selected_columns.append("IR/ER (300°/s)")
-    
-    df.fillna(0, inplace=True)
-    proband_data = df[df["Identifikace"] == proband_id].iloc[0]
-    
+def vykresli_podklad(model):
     podklad = []
-    podklad.append(f"Podklad pro hodnocení probanda {proband_id}")
+    podklad.append(f"Podklad pro hodnocení probanda {model['proband_id']}")
     podklad.append("-" * 50)
-    podklad.append(f"Věk: {proband_data['Vek']} let")
-    podklad.append(f"Výška: {proband_data['Vyska']} cm")
-    podklad.append(f"Hmotnost: {proband_data['Hmotnost']} kg")
+    podklad.append(f"Věk: {model['vek']} let")
+    podklad.append(f"Výška: {model['vyska']} cm")
+    podklad.append(f"Hmotnost: {model['hmotnost']} kg")
     podklad.append("")
     podklad.append("Výsledky měření:")
     
-    if comparison_data is None:
-        header = f"{'Parametr':30} {'Aktuální':>10} {'Průměr':>10} {'Rozdíl':>10}"
-        podklad.append(header)
-        podklad.append("-" * len(header))
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                prumer = df[col].mean()
-                rozdil = proband_data[col] - prumer
-                podklad.append(f"{col:30} {format_val(proband_data[col]):>10} {format_val(prumer):>10} {format_val(rozdil):>10}")
-    else:
-        header = f"{'Parametr':30} {'Aktuální':>10} {'Historické':>10} {'Rozdíl':>10}"
-        podklad.append(header)
-        podklad.append("-" * len(header))
-        for col in df.columns:
-            if col not in default_columns and col in selected_columns and pd.api.types.is_numeric_dtype(df[col]):
-                current_val = proband_data[col]
-                hist_val = comparison_data.get(col, None)
-                if hist_val is None and col == "IR/ER (210°/s)":
-                    if ("Vnitrni rotace koncentricka (210°/s)" in comparison_data and "Vnejsi rotace koncentricka (210°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (210°/s)"] / comparison_data["Vnejsi rotace koncentricka (210°/s)"]
-                if hist_val is None and col == "IR/ER (300°/s)":
-                    if ("Vnitrni rotace koncentricka (300°/s)" in comparison_data and "Vnejsi rotace koncentricka (300°/s)" in comparison_data):
-                        hist_val = comparison_data["Vnitrni rotace koncentricka (300°/s)"] / comparison_data["Vnejsi rotace koncentricka (300°/s)"]
-                if hist_val is not None:
-                    diff_val = current_val - hist_val
-                    podklad.append(f"{col:30} {format_val(current_val):>10} {format_val(hist_val):>10} {format_val(diff_val):>10}")
+    header, *radky = _tabulka_vysledku(model)
+    header = f"{header[0]:30} " + " ".join(f"{h:>10}" for h in header[1:])
+    podklad.append(header)
+    podklad.append("-" * len(header))
+    for col, *hodnoty in radky:
+        podklad.append(f"{col:30} " + " ".join(f"{h:>10}" for h in hodnoty))
+    if model.get("percentily"):
+        podklad.append("Percentil = pořadí probanda v referenční populaci (0–100, 50 = medián).")
+
+    if model.get("trend"):
+        podklad.append("")
+        podklad.append(_popis_trendu(model) + ":")
+        sirky = [30, 7, 12, 14, 22, 22, 11]
+        for i, radek in enumerate(_tabulka_trendu(model)):
+            podklad.append(f"{radek[0]:{sirky[0]}} " + " ".join(f"{h:>{s}}" for h, s in zip(radek[1:], sirky[1:])))
+            if i == 0:
+                podklad.append("-" * len(podklad[-1]))
     
     podklad.append("")
     podklad.append("Instrukce:")
@@ -648,3 +1046,226 @@ def priprav_podklad(proband_id, file_path, selected_columns=None, data_df=None,
     podklad.append("- Komentář založený na vědeckých článcích o tenise")
     
     return "\n".join(podklad)
+
+# ---- Veřejné funkce pro generování reportů -----------------------------------
+
+@casovat()
+def generuj_analyzu(proband_id, file_path, zaverecne_hodnoceni=None,
+                     selected_columns=None, selected_graphs=None,
+                     selected_graph_type="bar", data_df=None, comparison_data=None,
+                     advanced_stats=False, group_label=None, selected_graph_vars=None,
+                     group_stats=None, do_pameti=False, rozdeleni=None, historie_mereni=None):
+    logger.info(f"Generuji analýzu pro probanda: {proband_id}")
+    model = sestav_model_reportu(proband_id, file_path, selected_columns, data_df, comparison_data,
+                                 group_stats, group_label, selected_graphs, selected_graph_vars,
+                                 selected_graph_type, advanced_stats, zaverecne_hodnoceni, rozdeleni,
+                                 historie_mereni)
+    # do_pameti=True vrátí BytesIO místo cesty k souboru v OUTPUT_FOLDER
+    return vykresli_pdf(model, BytesIO() if do_pameti else None)
+
+@casovat()
+def generuj_word_report(proband_id, file_path, zaverecne_hodnoceni=None,
+                        selected_columns=None, selected_graphs=None,
+                        selected_graph_type="bar",  # parametr přidaný
+                        advanced_stats=False, group_label=None, data_df=None, comparison_data=None,
+                        selected_graph_vars=None, group_stats=None, do_pameti=False, rozdeleni=None,
+                        historie_mereni=None):
+    model = sestav_model_reportu(proband_id, file_path, selected_columns, data_df, comparison_data,
+                                 group_stats, group_label, selected_graphs, selected_graph_vars,
+                                 selected_graph_type, advanced_stats, zaverecne_hodnoceni, rozdeleni,
+                                 historie_mereni)
+    return vykresli_docx(model, BytesIO() if do_pameti else None)
+
+@casovat()
+def priprav_podklad(proband_id, file_path, selected_columns=None, data_df=None, comparison_data=None,
+                    group_stats=None, rozdeleni=None, historie_mereni=None):
+    logger.info("Připravuji textový podklad pro GPT.")
+    model = sestav_model_reportu(proband_id, file_path, selected_columns, data_df, comparison_data, group_stats,
+                                 rozdeleni=rozdeleni, historie_mereni=historie_mereni)
+    return vykresli_podklad(model)
+
+@casovat()
+def generuj_reporty(proband_id, file_path, formaty=("pdf",), **report_kwargs):
+    """Sestaví model reportu jednou a vykreslí z něj všechny požadované formáty ("pdf", "docx", "txt")."""
+    model = sestav_model_reportu(proband_id, file_path, **report_kwargs)
+    vysledky = {}
+    if "pdf" in formaty:
+        vysledky["pdf"] = vykresli_pdf(model)
+    if "docx" in formaty:
+        vysledky["docx"] = vykresli_docx(model)
+    if "txt" in formaty:
+        txt_path = os.path.join(OUTPUT_FOLDER, f"podklad_pro_{sanitize_name(proband_id)}.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(vykresli_podklad(model))
+        vysledky["txt"] = txt_path
+    return vysledky
+
+# ---- Hromadné generování reportů ---------------------------------------------
+
+# Data sdílená s procesy workerů; nastaví je _inicializuj_davku jednou na proces.
+_davka_df = None
+_davka_file_path = None
+_davka_stats = None
+_davka_rozdeleni = None
+
+def _inicializuj_davku(data_df, file_path, group_stats, rozdeleni=None):
+    global _davka_df, _davka_file_path, _davka_stats, _davka_rozdeleni, _paralelni_grafy
+    # Paralelizuje se přes probandy, grafy uvnitř jednoho reportu se ve workeru kreslí sériově.
+    _paralelni_grafy = False
+    _davka_df = data_df
+    _davka_file_path = file_path
+    _davka_stats = group_stats
+    _davka_rozdeleni = rozdeleni
+
+def _generuj_reporty_probanda(proband_id, formaty, report_kwargs):
+    return generuj_reporty(proband_id, _davka_file_path, formaty, data_df=_davka_df,
+                           group_stats=_davka_stats, rozdeleni=_davka_rozdeleni, **report_kwargs)
+
+def _reporty_probanda_do_pameti(proband_id, formaty, report_kwargs):
+    """Vykreslí reporty probanda do paměti; vrací seznam (název souboru, obsah v bajtech)."""
+    model = sestav_model_reportu(proband_id, _davka_file_path, data_df=_davka_df, group_stats=_davka_stats,
+                                 rozdeleni=_davka_rozdeleni, **report_kwargs)
+    jmeno = sanitize_name(proband_id)
+    soubory = []
+    if "pdf" in formaty:
+        soubory.append((f"analyza_{jmeno}.pdf", vykresli_pdf(model, BytesIO()).getvalue()))
+    if "docx" in formaty:
+        soubory.append((f"analyza_{jmeno}.docx", vykresli_docx(model, BytesIO()).getvalue()))
+    if "txt" in formaty:
+        soubory.append((f"podklad_pro_{jmeno}.txt", vykresli_podklad(model).encode("utf-8")))
+    return soubory
+
+def _prubeh_davky(proband_ids, file_path, data_df, max_workers, uloha, argumenty):
+    """
+    Spustí uloha(proband_id, *argumenty) pro všechny probandy v procesech a vrací trojice
+    (proband_id, výsledek, výjimka) v pořadí dokončení.
+
+    Data i statistiky skupiny se připraví jednou a předají se workerům při jejich startu.
+    Zadáno je nejvýše 2 × max_workers úloh najednou, takže se hotové výsledky nehromadí,
+    dokud je volající nezpracuje.
+    """
+    df = data_df.copy() if data_df is not None else load_data(file_path)
+    pridej_pomery_ir_er(normalizuj_sloupce(df))
+    # Nuly za chybějící hodnoty doplní až model reportu, statistiky je nezapočítají
+    group_stats = spocitej_statistiky_skupiny(df)
+    rozdeleni = rozdeleni_z_dat(df)
+    if max_workers is None:
+        max_workers = min(len(proband_ids), os.cpu_count() or 1) or 1
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_inicializuj_davku,
+                             initargs=(df, file_path, group_stats, rozdeleni)) as executor:
+        cekajici = iter(proband_ids)
+        bezici = {}
+        try:
+            while True:
+                for pid in itertools.islice(cekajici, 2 * max_workers - len(bezici)):
+                    bezici[executor.submit(uloha, pid, *argumenty)] = pid
+                if not bezici:
+                    break
+                hotove, _ = wait(bezici, return_when=FIRST_COMPLETED)
+                for future in hotove:
+                    pid = bezici.pop(future)
+                    try:
+                        vysledek, chyba = future.result(), None
+                    except Exception as e:
+                        vysledek, chyba = None, e
+                        logger.error(f"Report pro probanda {pid} selhal: {e}")
+                    yield pid, vysledek, chyba
+        except GeneratorExit:
+            # Volající skončil předčasně (např. zrušená úloha): nezahájené reporty se už nespustí
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+def generuj_reporty_davkove(proband_ids, file_path, formaty=("pdf",), data_df=None,
+                            max_workers=None, on_progress=None, **report_kwargs):
+    """
+    Vygeneruje reporty pro všechny zadané probandy paralelně v procesech.
+
+    Data i statistiky skupiny se připraví jednou a předají se workerům při jejich startu. Funkce
+    on_progress(hotovo, celkem, proband_id) se volá po dokončení každého probanda.
+    Vrací dvojici (vysledky, chyby): {proband_id: {format: cesta}} a {proband_id: text chyby}.
+    """
+    proband_ids = list(dict.fromkeys(proband_ids))
+    logger.info(f"Hromadně generuji reporty pro {len(proband_ids)} probandů, formáty: {', '.join(formaty)}")
+    vysledky, chyby = {}, {}
+    prubeh = _prubeh_davky(proband_ids, file_path, data_df, max_workers,
+                           _generuj_reporty_probanda, (tuple(formaty), report_kwargs))
+    for hotovo, (pid, vysledek, chyba) in enumerate(prubeh, start=1):
+        if chyba is None:
+            vysledky[pid] = vysledek
+        else:
+            chyby[pid] = f"{type(chyba).__name__}: {chyba}"
+        if on_progress is not None:
+            on_progress(hotovo, len(proband_ids), pid)
+    logger.info(f"Hromadné generování dokončeno: {len(vysledky)} úspěšně, {len(chyby)} chyb")
+    return vysledky, chyby
+
+class _ProudovyVystup:
+    """Nepřevinutelný výstup pro zipfile, který jen hromadí zapsané bajty do vyzvednutí."""
+
+    def __init__(self):
+        self._casti = []
+
+    def write(self, data):
+        self._casti.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vyzvedni(self):
+        data = b"".join(self._casti)
+        self._casti = []
+        return data
+
+def proud_zip_reportu(proband_ids, file_path, formaty=("pdf",), data_df=None,
+                      max_workers=None, on_progress=None, **report_kwargs):
+    """
+    Generuje reporty probandů paralelně a vrací postupně bajty ZIP archivu s nimi.
+
+    Každý report se do archivu zapíše, jakmile je hotový, a jeho část archivu se hned
+    vydá volajícímu (např. do souboru nebo HTTP odpovědi), takže se reporty neukládají do
+    OUTPUT_FOLDER a paměť ani disk nerostou s počtem probandů. Selhání se zapíšou do
+    souboru chyby.txt na konci archivu. on_progress jako u generuj_reporty_davkove.
+    """
+    proband_ids = list(dict.fromkeys(proband_ids))
+    logger.info(f"Generuji ZIP reportů pro {len(proband_ids)} probandů, formáty: {', '.join(formaty)}")
+    vystup = _ProudovyVystup()
+    chyby = {}
+    with zipfile.ZipFile(vystup, "w", compression=zipfile.ZIP_DEFLATED) as archiv:
+        prubeh = _prubeh_davky(proband_ids, file_path, data_df, max_workers,
+                               _reporty_probanda_do_pameti, (tuple(formaty), report_kwargs))
+        for hotovo, (pid, soubory, chyba) in enumerate(prubeh, start=1):
+            if chyba is None:
+                for nazev, obsah in soubory:
+                    archiv.writestr(nazev, obsah)
+            else:
+                chyby[pid] = f"{type(chyba).__name__}: {chyba}"
+            soubory = None  # obsah reportů se uvolní ještě před předáním části archivu
+            if on_progress is not None:
+                on_progress(hotovo, len(proband_ids), pid)
+            yield vystup.vyzvedni()
+        if chyby:
+            archiv.writestr("chyby.txt", "\n".join(f"{pid}: {text}" for pid, text in chyby.items()))
+    pocitej(probandu=len(proband_ids), chyb=len(chyby))
+    logger.info(f"ZIP reportů dokončen: {len(proband_ids) - len(chyby)} úspěšně, {len(chyby)} chyb")
+    yield vystup.vyzvedni()
+
+@casovat("zip_reportu")
+def uloz_zip_reportu(zip_path, proband_ids, file_path, formaty=("pdf",), **kwargs):
+    """Zapíše ZIP archiv z proud_zip_reportu průběžně do souboru zip_path (cesta nebo souborový objekt)."""
+    if hasattr(zip_path, "write"):
+        for cast in proud_zip_reportu(proband_ids, file_path, formaty, **kwargs):
+            zip_path.write(cast)
+        return zip_path
+    tmp_cesta = f"{zip_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_cesta, "wb") as f:
+            for cast in proud_zip_reportu(proband_ids, file_path, formaty, **kwargs):
+                f.write(cast)
+    except BaseException:
+        # Přerušený zápis (chyba nebo zrušená úloha) nezanechá rozepsaný soubor
+        os.remove(tmp_cesta)
+        raise
+    os.replace(tmp_cesta, zip_path)
+    return zip_path
@@ -1,43 +1,23 @@
-import subprocess
-import sys
 import os
 
-# Definice mapování: klíč = název modulu, hodnota = název balíčku pro pip
-required_packages = {
-    "pandas": "pandas",
-    "numpy": "numpy",
-    "matplotlib": "matplotlib",
-    "reportlab": "reportlab",
-    "docx": "python-docx",
-    "streamlit": "streamlit",
-    "altair": "altair",
-    "st_aggrid": "streamlit-aggrid",
-    "openpyxl": "openpyxl",
-}
-
-# Kontrola a instalace chybějících balíčků
-for module_name, package_name in required_packages.items():
-    try:
-        __import__(module_name)
-    except ImportError:
-        print(f"Balíček {package_name} nebyl nalezen. Instalace...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-
+# Závislosti se instalují z requirements.txt; těžké moduly (matplotlib, reportlab,
+# python-docx, st_aggrid) se načítají až při prvním použití.
 import streamlit as st
 import pandas as pd
 import altair as alt
 import base64
+import hashlib
+import importlib.util
 import logging
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from analyza import generuj_analyzu, generuj_word_report, priprav_podklad, load_data
-
-# Nové importy pro generování PDF reportu genetické analýzy
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import uuid
+from io import BytesIO
+from casovani import JSONL_PROMENNA, nastav_jsonl, posledni_behy, rozpis_behu, usek
+from analyza import generuj_analyzu, generuj_word_report, priprav_podklad, load_data, generuj_reporty_davkove, statistiky_veku, uloz_zip_reportu, zdroj_dat
+from indexy import index_podle, najdi_radek, pozice_v_rozsahu, radky_probanda
+from upravy import exportuj_upravena_data, hodnota_pro_sloupec, klic_radku, verze_zmen, zapis_zmeny, zhutni_na_pozadi
+from ulohy import CEKA, CHYBA, HOTOVO, nastav_prubeh, odeber_ulohu, ulohy_vlastnika, vysledek_ulohy, zadej_ulohu
+from histogramy import histogram_dat
+from historie import histogram_historie, historie_existuje, nacti_agregaty, nacti_historii, nacti_rozdeleni, pridej_do_historie, rozsah_veku_historie, exportuj_do_excelu
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -52,14 +32,6 @@ os.makedirs(HISTORICAL_FOLDER, exist_ok=True)
 
 st.set_page_config(page_title="Automatizovaná analýza dat", layout="wide")
 
-# Registrace Times New Roman fontů pro podporu diakritiky
-base_dir = os.path.dirname(os.path.abspath(__file__))
-times_font_path = os.path.join(base_dir, "times.ttf")
-times_bold_font_path = os.path.join(base_dir, "timesbd.ttf")
-if os.path.exists(times_font_path) and os.path.exists(times_bold_font_path):
-    pdfmetrics.registerFont(TTFont('TimesNewRoman', times_font_path))
-    pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', times_bold_font_path))
-
 theme_choice = st.sidebar.radio("Vyberte režim zobrazení", ["Tmavý", "Světlý"])
 if theme_choice == "Tmavý":
     st.markdown(
@@ -102,88 +74,156 @@ st.markdown(
 
 # ---- Pomocné funkce ---------------------------------------------------------
 
-def show_pdf(file_path):
-    with open(file_path, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
+# Větší PDF se bez komponenty streamlit-pdf nevkládají jako base64 data-URI
+PDF_PREVIEW_BASE64_MAX_BYTES = 5 * 1024 * 1024
+
+def show_pdf(pdf):
+    """Zobrazí náhled PDF zadaného cestou nebo jako bytes."""
+    if isinstance(pdf, (bytes, bytearray)):
+        pdf_bytes = bytes(pdf)
+    else:
+        with open(pdf, "rb") as f:
+            pdf_bytes = f.read()
+    if hasattr(st, "pdf") and importlib.util.find_spec("streamlit_pdf") is not None:
+        # st.pdf servíruje soubor přes media endpoint Streamlitu, bez base64
+        st.pdf(pdf_bytes, height=900)
+        return
+    if len(pdf_bytes) > PDF_PREVIEW_BASE64_MAX_BYTES:
+        st.info("PDF je pro náhled příliš velké, stáhněte jej tlačítkem výše.")
+        return
+    base64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
     pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="700" height="900" type="application/pdf"></iframe>'
     st.markdown(pdf_display, unsafe_allow_html=True)
 
-def generuj_geneticky_pdf_report(proband_gen, gen_df, genetic_summary):
-    """
-    Vygeneruje PDF report pro genetickou analýzu probanda s použitím Times New Roman.
-    """
-    pdf_path = os.path.join(OUTPUT_FOLDER, f"geneticka_analyza_{proband_gen.replace(' ', '_')}.pdf")
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    custom_bold = ParagraphStyle(name="Custom-Bold", parent=styles["Heading2"],
-                                 fontName="TimesNewRoman-Bold" if 'TimesNewRoman-Bold' in pdfmetrics.getRegisteredFontNames() else "Helvetica-Bold",
-                                 fontSize=14, spaceAfter=10)
-    custom_regular = ParagraphStyle(name="Custom-Regular", parent=styles["BodyText"],
-                                    fontName="TimesNewRoman" if 'TimesNewRoman' in pdfmetrics.getRegisteredFontNames() else "Helvetica",
-                                    fontSize=12)
-
-    elements.append(Paragraph("Genetická analýza", custom_bold))
-    elements.append(Paragraph(f"Proband: {proband_gen}", custom_regular))
-    elements.append(Spacer(1, 12))
-
-    mandatory_cols = ["Jmeno", "Prijmeni", "Narozen", "Identifikace"]
-    table_data = [["Variant", "Hodnota"]]
-    row = gen_df[gen_df["Identifikace"] == proband_gen].iloc[0]
-    for col in gen_df.columns:
-        if col not in mandatory_cols:
-            table_data.append([col, str(row[col])])
-    table = Table(table_data, hAlign="LEFT")
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'TimesNewRoman-Bold' if 'TimesNewRoman-Bold' in pdfmetrics.getRegisteredFontNames() else "Helvetica-Bold"),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-
-    if genetic_summary.strip():
-        elements.append(Paragraph("Shrnutí genetické analýzy:", custom_bold))
-        for para in genetic_summary.strip().split("\n\n"):
-            elements.append(Paragraph(para.strip(), custom_regular))
-            elements.append(Spacer(1, 12))
-
-    doc.build(elements)
-    return pdf_path
+def graf_histogramu(hist, parametr):
+    """Sloupcový graf předem spočítaného histogramu (sloupce od, do, pocet)."""
+    return alt.Chart(hist).mark_bar().encode(
+        x=alt.X("od:Q", title=parametr, bin="binned"),
+        x2="do:Q",
+        y=alt.Y("pocet:Q", title="Počet záznamů"),
+        tooltip=[alt.Tooltip("od:Q", title="Od", format=".2f"), alt.Tooltip("do:Q", title="Do", format=".2f"),
+                 alt.Tooltip("pocet:Q", title="Počet")]
+    )
+
+# ---- Úlohy na pozadí --------------------------------------------------------
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Úlohy se přiřazují relaci prohlížeče; jiná relace je v panelu nevidí
+if "vlastnik_uloh" not in st.session_state:
+    st.session_state["vlastnik_uloh"] = uuid.uuid4().hex
+vlastnik_uloh = st.session_state["vlastnik_uloh"]
+
+def _vystup_ulohy(pripona):
+    """Jedinečná cesta výstupu úlohy v OUTPUT_FOLDER, aby se souběžné úlohy nepřepisovaly."""
+    return os.path.join(OUTPUT_FOLDER, f"uloha_{uuid.uuid4().hex[:12]}{pripona}")
+
+def _prubeh_ulohy(hotovo, celkem, pid):
+    nastav_prubeh(hotovo / celkem, f"Hotovo {hotovo}/{celkem}: {pid}")
+
+def _hromadne_reporty(proband_ids, file_path, **kwargs):
+    """Hromadné reporty jako úloha; výsledkem je přehled vytvořených souborů a chyb v CSV."""
+    vysledky, chyby = generuj_reporty_davkove(proband_ids, file_path, on_progress=_prubeh_ulohy, **kwargs)
+    prehled = pd.DataFrame([{"Identifikace": pid, **cesty} for pid, cesty in vysledky.items()]
+                           + [{"Identifikace": pid, "chyba": chyba} for pid, chyba in chyby.items()])
+    return prehled.to_csv(index=False).encode("utf-8-sig")
+
+def _nacti_soubor(cesta):
+    with open(cesta, "rb") as f:
+        return f.read()
+
+def _export_historie():
+    hist_export = BytesIO()
+    exportuj_do_excelu(hist_export)
+    return hist_export.getvalue()
+
+def _export_upravenych_dat(file_path, vsechny_listy):
+    export = BytesIO()
+    exportuj_upravena_data(load_data(file_path, vsechny_listy=vsechny_listy), export)
+    return export.getvalue()
+
+def _zmena_casovani_jsonl():
+    # Zápis časování je společný pro celý proces, mění se jen při úpravě pole;
+    # prázdné pole vrátí výchozí cestu z proměnné prostředí
+    nastav_jsonl(st.session_state["timing_jsonl"].strip() or os.environ.get(JSONL_PROMENNA) or None)
+
+def _panel_uloh():
+    ulohy = ulohy_vlastnika(vlastnik_uloh)
+    if not ulohy:
+        st.caption("Žádné úlohy. Reporty zadané ke generování se zobrazí zde.")
+        return
+    for uloha in ulohy:
+        st.markdown(f"**{uloha['nazev']}** – {uloha['stav']}")
+        if uloha["stav"] == HOTOVO:
+            vysledek = vysledek_ulohy(uloha["id"])
+            if vysledek is None:
+                st.caption("Výsledek už není k dispozici.")
+            else:
+                # Soubor z disku se načte až při stažení
+                data = (lambda cesta=vysledek: _nacti_soubor(cesta)) if isinstance(vysledek, str) else vysledek
+                st.download_button("Stáhnout", data, file_name=uloha["nazev_souboru"], mime=uloha["mime"],
+                                   key=f"uloha_stahnout_{uloha['id']}", on_click="ignore")
+                # Náhled PDF z výsledku úlohy (bajty z paměti nebo vytvořený soubor)
+                if uloha["mime"] == "application/pdf" and st.toggle("Náhled", key=f"uloha_nahled_{uloha['id']}"):
+                    show_pdf(vysledek)
+        elif uloha["stav"] == CHYBA:
+            st.error(uloha["chyba"])
+        else:
+            st.progress(uloha["podil"], text=uloha["zprava"] or ("Čeká ve frontě…" if uloha["stav"] == CEKA else "Běží…"))
+        if st.button("Odstranit" if uloha["stav"] in (HOTOVO, CHYBA) else "Zrušit", key=f"uloha_odebrat_{uloha['id']}"):
+            odeber_ulohu(uloha["id"])
+            st.rerun(scope="fragment")
 
 # ---- Sidebar: načtení a filtry ---------------------------------------------
 
 st.sidebar.header("Nastavení a konfigurace")
 
 with st.sidebar.expander("Načtení dat"):
-    uploaded_file = st.file_uploader("Nahrajte soubor Excel", type=["xlsx"], key="main_data")
-    if uploaded_file:
-        file_path = os.path.join(UPLOAD_FOLDER, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        df = load_data(file_path)  # Funkce load_data vytvoří sloupec Identifikace
+    uploaded_files = st.file_uploader("Nahrajte soubory s daty (Excel, CSV nebo Parquet)", type=["xlsx", "csv", "parquet"],
+                                      accept_multiple_files=True, key="main_data")
+    vsechny_listy = st.checkbox("Načíst všechny listy sešitů", value=False, key="all_sheets")
+    if uploaded_files:
+        file_paths = []
+        for uploaded_file in uploaded_files:
+            file_paths.append(os.path.join(UPLOAD_FOLDER, uploaded_file.name))
+            with open(file_paths[-1], "wb") as f:
+                f.write(uploaded_file.getbuffer())
+        # Více souborů nebo listů se sloučí do jedné tabulky se sloupcem Zdroj
+        sloucena_data = len(file_paths) > 1 or vsechny_listy
+        file_path = file_paths if len(file_paths) > 1 else file_paths[0]
+        df = load_data(file_path, vsechny_listy=vsechny_listy)  # Funkce load_data vytvoří sloupec Identifikace
+        if sloucena_data:
+            st.caption(f"Sloučeno {df['Zdroj'].nunique()} zdrojů, {len(df)} řádků.")
         df.columns = df.columns.str.strip()
+        df_full = df  # nefiltrovaná data s předpočítaným indexem pro vyhledání probanda
         st.dataframe(df.head())
 
 if 'df' in locals():
     with st.sidebar.expander("Filtry"):
+        vyber_ident = None
         if "Identifikace" in df.columns:
-            ident_list = df["Identifikace"].unique().tolist()
+            ident_list = list(index_podle(df))
             selected_ident = st.multiselect("Vyberte probanda", ident_list, default=ident_list, key="filter_ident")
-            df = df[df["Identifikace"].isin(selected_ident)]
+            if len(selected_ident) < len(ident_list):
+                vyber_ident = df["Identifikace"].isin(selected_ident).to_numpy()
         if "Vek" in df.columns:
-            min_age = int(df["Vek"].min())
-            max_age = int(df["Vek"].max())
+            vek = df["Vek"] if vyber_ident is None else df["Vek"][vyber_ident]
+            min_age = int(vek.min())
+            max_age = int(vek.max())
             age_range = st.slider("Vyberte věkový interval", min_age, max_age, (min_age, max_age), key="filter_age")
-            df = df[(df["Vek"] >= age_range[0]) & (df["Vek"] <= age_range[1])]
+            # Věkový interval se vybírá půlením nad indexem seřazeným při načtení dat
+            pozice = pozice_v_rozsahu(df, age_range[0], age_range[1])
+            df = df.iloc[pozice if vyber_ident is None else pozice[vyber_ident[pozice]]]
+        elif vyber_ident is not None:
+            df = df[vyber_ident]
+    # Otisk zdroje, uložených úprav a vybraných řádků: klíč mezipamětí odvozených z df
+    zdroj = zdroj_dat(file_path, vsechny_listy)
+    otisk_radku = hashlib.sha1(df.index.to_numpy().tobytes()).hexdigest()[:12]
+    klic_df = (zdroj, verze_zmen(zdroj), otisk_radku)
 
     with st.sidebar.expander("Konfigurace reportu"):
         proband_id = st.selectbox("Vyberte probanda pro report", df["Identifikace"].unique(), key="report_proband")
-        default_columns = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost"]
+        default_columns = ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", "Zdroj"]
         available_columns = [col for col in df.columns if col not in default_columns]
         selected_columns = st.multiselect("Vyberte proměnné pro analýzu", available_columns, default=available_columns, key="report_columns")
         graph_options = ["Poměr IR/ER", "Složení těla", "Síla úchopu a rychlost podání",
@@ -205,24 +245,19 @@ if 'df' in locals():
         add_option = st.radio("Přidat data do historické databáze:", ("Jeden proband", "Celá skupina"), key="historical_option")
         if st.button("Přidat aktuální měření do historické databáze", key="add_hist_data"):
             df["DatumMereni"] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
-            HIST_FILE = os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx")
-            if not os.path.exists(HIST_FILE):
-                with pd.ExcelWriter(HIST_FILE, engine='openpyxl') as writer:
-                    if add_option == "Jeden proband":
-                        df[df["Identifikace"] == proband_id].to_excel(writer, index=False)
-                    else:
-                        df.to_excel(writer, index=False)
+            hist_exists = historie_existuje()
+            new_data = df[df["Identifikace"] == proband_id] if add_option == "Jeden proband" else df
+            pridej_do_historie(new_data)
+            if not hist_exists:
                 st.success("Historická databáze vytvořena a data byla přidána.")
             else:
-                hist_df = pd.read_excel(HIST_FILE, engine='openpyxl')
-                if "Identifikace" not in hist_df.columns:
-                    hist_df["Identifikace"] = hist_df["Jmeno"].astype(str) + " " + hist_df["Prijmeni"].astype(str) + ", " + hist_df["Narozen"].astype(str)
-                df["DatumMereni"] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
-                new_data = df[df["Identifikace"] == proband_id] if add_option == "Jeden proband" else df
-                hist_df = pd.concat([hist_df, new_data], ignore_index=True)
-                with pd.ExcelWriter(os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx"), engine='openpyxl', mode='w') as writer:
-                    hist_df.to_excel(writer, index=False)
                 st.success("Data byla přidána do historické databáze.")
+        if historie_existuje():
+            # Sešit se vytvoří až po kliknutí, ne při každém přepočtu stránky
+            st.download_button("Exportovat historickou databázi do Excelu", _export_historie,
+                               file_name="historical_data.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                               key="export_hist_data", on_click="ignore")
 
 # ---- Tabs -------------------------------------------------------------------
 
@@ -234,43 +269,42 @@ with tab_dashboard:
     st.header("Dashboard")
     if 'df' in locals():
         st.subheader("Interaktivní grafy")
-        param_opts = [col for col in df.columns if col not in ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", "DatumMereni"]]
+        param_opts = [col for col in df.columns if col not in ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", "DatumMereni", "Zdroj"]]
         if param_opts:
             parameter = st.selectbox("Vyberte parametr pro zobrazení distribuce", param_opts, key="dashboard_param")
-            base_chart = alt.Chart(df).mark_bar().encode(
-                x=alt.X(f"{parameter}:Q", title=parameter),
-                y=alt.Y("count()", title="Počet záznamů"),
-                tooltip=[alt.Tooltip(f"{parameter}:Q", title=parameter), alt.Tooltip("count()", title="Počet")]
-            )
-            proband_value = df[df["Identifikace"] == proband_id][parameter].iloc[0]
+            # Histogram se počítá na serveru, do grafu jdou jen hranice a počty binů
+            base_chart = graf_histogramu(histogram_dat(klic_df, parameter, lambda: df[parameter]), parameter)
+            proband_value = najdi_radek(df_full, proband_id)[parameter]
             rule = alt.Chart(pd.DataFrame({'x': [proband_value], 'Identifikace': [proband_id]})).mark_rule(color='red', strokeDash=[4,4], size=5).encode(
                 x='x:Q',
                 tooltip=[alt.Tooltip('x:Q', title=parameter), alt.Tooltip('Identifikace:N', title='Proband')]
             )
             chart = alt.layer(base_chart, rule).interactive()
             st.altair_chart(chart, use_container_width=True)
+            if "Vek" in df_full.columns and 'age_range' in locals():
+                stat_param = statistiky_veku(df_full, age_range, [parameter]).loc[parameter]
+                st.caption(f"Všichni probandi ve věku {age_range[0]}–{age_range[1]} let: n = {int(stat_param['n'])}, "
+                           f"průměr {stat_param['prumer']:.2f}, SD {stat_param['smerodatna_odchylka']:.2f}, "
+                           f"rozsah {stat_param['min']:.2f}–{stat_param['max']:.2f}")
         st.dataframe(df)
 
         st.markdown("## Zobrazení Historických dat")
-        HIST_FILE = os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx")
-        if os.path.exists(HIST_FILE):
-            df_hist = pd.read_excel(HIST_FILE, engine='openpyxl')
-            if "Identifikace" not in df_hist.columns:
-                df_hist["Identifikace"] = df_hist["Jmeno"].astype(str) + " " + df_hist["Prijmeni"].astype(str) + ", " + df_hist["Narozen"].astype(str)
-            if "Vek" in df_hist.columns:
-                min_age_hist = int(df_hist["Vek"].min())
-                max_age_hist = int(df_hist["Vek"].max())
+        if historie_existuje():
+            vek_hist = rozsah_veku_historie()
+            if vek_hist is not None and vek_hist[0] is not None:
+                min_age_hist = int(vek_hist[0])
+                max_age_hist = int(vek_hist[1])
                 age_range_hist = st.slider("Vyberte věkový interval historických dat", min_age_hist, max_age_hist, (min_age_hist, max_age_hist), key="hist_slider_dashboard")
-                df_hist = df_hist[(df_hist["Vek"] >= age_range_hist[0]) & (df_hist["Vek"] <= age_range_hist[1])]
-            param_opts_hist = [col for col in df_hist.columns if col not in ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", "DatumMereni"]]
+                df_hist = nacti_historii(vek_rozsah=age_range_hist)
+            else:
+                df_hist = nacti_historii()
+            param_opts_hist = [col for col in df_hist.columns if col not in ["Jmeno", "Prijmeni", "Narozen", "Identifikace", "Vek", "Vyska", "Hmotnost", "DatumMereni", "Zdroj"]]
             if param_opts_hist:
                 parameter_hist = st.selectbox("Vyberte parametr pro zobrazení historických dat", param_opts_hist, key="hist_param")
-                base_chart_hist = alt.Chart(df_hist).mark_bar().encode(
-                    x=alt.X(f"{parameter_hist}:Q", title=parameter_hist),
-                    y=alt.Y("count()", title="Počet záznamů"),
-                    tooltip=[alt.Tooltip(f"{parameter_hist}:Q", title=parameter_hist), alt.Tooltip("count()", title="Počet")]
-                )
-                proband_rows = df_hist[df_hist["Identifikace"] == proband_id]
+                base_chart_hist = graf_histogramu(histogram_historie(
+                    parameter_hist, vek_rozsah=age_range_hist if vek_hist is not None and vek_hist[0] is not None else None
+                ), parameter_hist)
+                proband_rows = radky_probanda(df_hist, proband_id)
                 if not proband_rows.empty:
                     rule_df = proband_rows[[parameter_hist, "DatumMereni", "Identifikace"]].copy().rename(columns={parameter_hist: "x"})
                     rule_hist = alt.Chart(rule_df).mark_rule(color='red', strokeDash=[4,4], size=5).encode(
@@ -283,6 +317,11 @@ with tab_dashboard:
                 else:
                     chart_hist = base_chart_hist.interactive()
                 st.altair_chart(chart_hist, use_container_width=True)
+                stats_hist = nacti_agregaty(vek_rozsah=age_range_hist if vek_hist is not None and vek_hist[0] is not None else None)
+                if stats_hist is not None and parameter_hist in stats_hist.index:
+                    stat_param = stats_hist.loc[parameter_hist]
+                    st.caption(f"Historická populace: n = {int(stat_param['n'])}, průměr {stat_param['prumer']:.2f}, "
+                               f"SD {stat_param['smerodatna_odchylka']:.2f}, medián {stat_param['median']:.2f}")
             st.dataframe(df_hist)
         else:
             st.error("Historická databáze neexistuje.")
@@ -290,18 +329,75 @@ with tab_dashboard:
         st.info("Nejsou načtena data. Nahrajte prosím Excel soubor v levém panelu.")
 
 # --- Editace záznamů ---
+
+# Grid vrací jen změněné buňky (ID řádku = pozice v zobrazených datech), ne celou tabulku;
+# změny se sbírají v objektu API gridu, dokud se grid s novými daty nevytvoří znovu.
+ZMENY_GRIDU_JS = """
+function({streamlitRerunEventTriggerName, eventData}) {
+    const api = eventData.api;
+    api.__zmeny = api.__zmeny || {};
+    if (streamlitRerunEventTriggerName === "cellValueChanged" && eventData.colDef) {
+        api.__zmeny[eventData.node.id + "\u0000" + eventData.colDef.field] = {
+            radek: eventData.node.id, identifikace: eventData.data["Identifikace"],
+            sloupec: eventData.colDef.field, hodnota: eventData.newValue
+        };
+    }
+    return Object.values(api.__zmeny);
+}
+"""
+
+def zmeny_z_gridu(df, df_full, zmeny_gridu):
+    """Převede změny buněk z gridu na záznamy (identifikace, poradi, sloupec, hodnota) proti df_full."""
+    pozice_full = df_full.index.get_indexer(df.index)
+    zmeny = []
+    for zmena in zmeny_gridu or []:
+        pozice, sloupec = int(zmena["radek"]), zmena["sloupec"]
+        if pozice >= len(df) or sloupec not in df.columns or df["Identifikace"].iat[pozice] != zmena["identifikace"]:
+            continue
+        hodnota = hodnota_pro_sloupec(df[sloupec], zmena["hodnota"])
+        puvodni = df[sloupec].iat[pozice]
+        if hodnota == puvodni or (hodnota is None and pd.isna(puvodni)):
+            continue
+        identifikace, poradi = klic_radku(df_full, pozice_full[pozice])
+        zmeny.append((identifikace, poradi, sloupec, hodnota))
+    return zmeny
+
 with tab_edit:
     st.header("Editace záznamů")
-    if 'df' in locals():
+    if 'df' in locals() and "Identifikace" in df.columns:
+        from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, JsCode
+        if st.session_state.get("editor_ulozeno"):
+            st.success(f"Uloženo změn buněk: {st.session_state.pop('editor_ulozeno')}")
         gb = GridOptionsBuilder.from_dataframe(df)
         gb.configure_pagination(paginationAutoPageSize=True)
         gb.configure_default_column(editable=True)
+        gb.configure_column("Identifikace", editable=False)
         grid_options = gb.build()
-        grid_response = AgGrid(df, gridOptions=grid_options, update_mode=GridUpdateMode.VALUE_CHANGED, reload_data=True)
-        edited_df = grid_response["data"]
+        # Klíč gridu se mění jen s verzí uložených změn a výběrem řádků; jinak si grid drží
+        # vlastní stav a data se v něm znovu nenačítají
+        grid_response = AgGrid(df, gridOptions=grid_options, data_return_mode=DataReturnMode.CUSTOM,
+                               custom_jscode_for_grid_return=JsCode(ZMENY_GRIDU_JS), update_on=["cellValueChanged"],
+                               key="editor_" + "_".join(map(str, klic_df)))
+        zmeny = zmeny_z_gridu(df, df_full, grid_response.raw_data)
+        if zmeny:
+            st.caption(f"Neuložené změny buněk: {len(zmeny)}")
         if st.button("Uložit změny v datech", key="save_changes"):
-            edited_df.to_excel(file_path, index=False)
-            st.success("Data byla aktualizována!")
+            if not zmeny:
+                st.info("Žádné změny k uložení.")
+            else:
+                # Ukládají se jen změněné buňky; nahraný soubor zůstává beze změny
+                zapis_zmeny(zdroj, zmeny)
+                zhutni_na_pozadi(zdroj)
+                st.session_state["editor_ulozeno"] = len(zmeny)
+                st.rerun()
+        # Upravený sešit se sestaví až při stažení, jako samostatný soubor
+        nazev_exportu = "sloucena_data" if sloucena_data else os.path.splitext(os.path.basename(file_path))[0]
+        st.download_button("Exportovat upravený sešit", lambda: _export_upravenych_dat(file_path, vsechny_listy),
+                           file_name=f"{nazev_exportu}_upravy.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           key="export_edited_data", on_click="ignore")
+    elif 'df' in locals():
+        st.info("Editace vyžaduje sloupec Identifikace (Jmeno, Prijmeni, Narozen).")
     else:
         st.info("Nejsou načtena data. Nahrajte soubor v levém panelu.")
 
@@ -309,30 +405,32 @@ with tab_edit:
 with tab_reports:
     st.header("Reporty a podklady")
     report_format = st.radio("Vyberte formát reportu", ("PDF", "Word"), key="report_format")
-    report_subtabs = st.tabs(["Proband vs skupina", "Proband vs předchozí měření"])
+    report_subtabs = st.tabs(["Proband vs skupina", "Proband vs předchozí měření", "Hromadné reporty"])
 
     # ---------- Proband vs skupina ----------
     with report_subtabs[0]:
         st.subheader("Porovnání probanda se skupinou")
         if 'df' in locals() and 'proband_id' in locals():
             prumer_source_group = st.radio("Z čeho počítat průměry skupiny?", ("Aktuální data", "Historická data"), key="prumer_source_group")
+            # Proband se vždy hledá v nahraných datech; u historie se porovnává s uloženými agregáty populace
+            data_source = df_full if sloucena_data else None
+            group_stats = rozdeleni = None
             if prumer_source_group == "Aktuální data":
                 group_label = "Aktuální skupina"
-                data_source = None
             else:
                 group_label = "Celá populace"
-                HIST_FILE = os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx")
-                if os.path.exists(HIST_FILE):
-                    data_source = pd.read_excel(HIST_FILE, engine='openpyxl')
-                    if "Identifikace" not in data_source.columns:
-                        data_source["Identifikace"] = data_source["Jmeno"].astype(str) + " " + data_source["Prijmeni"].astype(str) + ", " + data_source["Narozen"].astype(str)
-                    if "Vek" in data_source.columns:
-                        min_age = int(data_source["Vek"].min()); max_age = int(data_source["Vek"].max())
-                        age_range = st.slider("Vyberte věkový interval historických dat", min_age, max_age, (min_age, max_age), key="hist_slider_report")
-                        data_source = data_source[(data_source["Vek"] >= age_range[0]) & (data_source["Vek"] <= age_range[1])]
+                if historie_existuje():
+                    vek_hist = rozsah_veku_historie()
+                    if vek_hist is not None and vek_hist[0] is not None:
+                        min_age = int(vek_hist[0]); max_age = int(vek_hist[1])
+                        vek_rozsah_populace = st.slider("Vyberte věkový interval historických dat", min_age, max_age, (min_age, max_age), key="hist_slider_report")
+                    else:
+                        vek_rozsah_populace = None
+                    with usek("historicka_populace"):
+                        group_stats = nacti_agregaty(vek_rozsah=vek_rozsah_populace)
+                        rozdeleni = nacti_rozdeleni(vek_rozsah=vek_rozsah_populace)
                 else:
                     st.error("Historická databáze neexistuje.")
-                    data_source = None
 
             advanced_stats_group = st.checkbox("Zobrazit rozšířené statistiky ve vygenerovaném hodnocení (Medián, Nejlepší a nejhorší výkon, CI)", value=False, key="advanced_stats_group")
             final_recommendation_group = st.text_area("Zadejte závěrečná doporučení (skupina)", height=150, key="final_recommendation_group_sidebar_2")
@@ -340,34 +438,34 @@ with tab_reports:
                 final_recommendation_group += "\n\n--- Genetická analýza ---\n" + st.session_state["genetic_analysis_text"]
 
             if st.button("Generovat report (skupina)", key="gen_report_group"):
+                # Report se vykreslí na pozadí; stáhnout jej lze v panelu „Moje úlohy“
                 if report_format == "PDF":
-                    report_path = generuj_analyzu(
-                        proband_id, file_path, final_recommendation_group, selected_columns,
+                    zadej_ulohu(
+                        generuj_analyzu, proband_id, file_path, final_recommendation_group, selected_columns,
                         selected_graphs, selected_graph_type_param, data_df=data_source,
                         comparison_data=None, advanced_stats=advanced_stats_group,
-                        group_label=group_label, selected_graph_vars=selected_graph_vars
+                        group_label=group_label, selected_graph_vars=selected_graph_vars, group_stats=group_stats,
+                        rozdeleni=rozdeleni, do_pameti=True,
+                        nazev=f"PDF report {proband_id} (skupina)", vlastnik=vlastnik_uloh,
+                        nazev_souboru=f"analyza_{proband_id}_skupina.pdf", mime="application/pdf"
                     )
-                    with open(report_path, "rb") as f:
-                        st.download_button("Stáhnout PDF", f, file_name=f"analyza_{proband_id}_skupina.pdf", mime="application/pdf", key="download_pdf_group")
-                    st.success("PDF report vygenerován.")
-                    show_pdf(report_path)
                 else:
-                    report_path = generuj_word_report(
-                        proband_id, file_path, final_recommendation_group, selected_columns,
+                    zadej_ulohu(
+                        generuj_word_report, proband_id, file_path, final_recommendation_group, selected_columns,
                         selected_graphs, selected_graph_type=selected_graph_type_param,
                         advanced_stats=advanced_stats_group, group_label=group_label,
-                        data_df=data_source, comparison_data=None, selected_graph_vars=selected_graph_vars
+                        data_df=data_source, comparison_data=None, selected_graph_vars=selected_graph_vars,
+                        group_stats=group_stats, rozdeleni=rozdeleni, do_pameti=True,
+                        nazev=f"Word report {proband_id} (skupina)", vlastnik=vlastnik_uloh,
+                        nazev_souboru=f"analyza_{proband_id}_skupina.docx", mime=DOCX_MIME
                     )
-                    st.download_button("Stáhnout Word report", open(report_path, "rb"),
-                                       file_name=f"analyza_{proband_id}_skupina.docx",
-                                       mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                       key="download_word_group")
-                    st.info("Word report byl vygenerován. Otevřete jej ve Wordu a upravte dle potřeby.")
+                st.info("Report byl zařazen do fronty. Po dokončení jej stáhnete v panelu „Moje úlohy“ vlevo.")
 
             # OPRAVA: Generování podkladu (skupina) → uložit do session_state, download mimo if
             if st.button("Vygenerovat podklady pro model AI (skupina)", key="gen_gpt_group"):
                 st.session_state["podklad_text_group"] = priprav_podklad(
-                    proband_id, file_path, selected_columns, data_df=data_source
+                    proband_id, file_path, selected_columns, data_df=data_source, group_stats=group_stats,
+                    rozdeleni=rozdeleni
                 )
             if st.session_state.get("podklad_text_group"):
                 _txt = st.session_state["podklad_text_group"]
@@ -390,57 +488,54 @@ with tab_reports:
     with report_subtabs[1]:
         st.subheader("Porovnání probanda s předchozím měřením")
         if 'df' in locals() and 'proband_id' in locals():
-            HIST_FILE = os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx")
-            if os.path.exists(HIST_FILE):
-                df_hist = pd.read_excel(HIST_FILE, engine='openpyxl')
-                if "Identifikace" not in df_hist.columns:
-                    df_hist["Identifikace"] = df_hist["Jmeno"].astype(str) + " " + df_hist["Prijmeni"].astype(str) + ", " + df_hist["Narozen"].astype(str)
-                proband_history = df_hist[df_hist["Identifikace"] == proband_id]
+            if historie_existuje():
+                proband_history = nacti_historii(identifikace=proband_id)
                 if proband_history.empty:
                     st.error("Nebyla nalezena žádná historická měření pro tohoto probanda.")
                     comparison_row = None
                 else:
                     dates = proband_history["DatumMereni"].unique()
                     selected_date = st.selectbox("Vyberte historické měření:", dates, key="historical_date")
-                    comparison_row = proband_history[proband_history["DatumMereni"] == selected_date].iloc[0].to_dict()
+                    comparison_row = najdi_radek(proband_history, proband_id, selected_date).to_dict()
             else:
                 st.error("Historická databáze neexistuje.")
                 comparison_row = None
 
             advanced_stats_time = st.checkbox("Zobrazit rozšířené statistiky v časovém srovnání", value=False, key="advanced_stats_time")
+            include_trend = st.checkbox("Přidat vývoj ze všech historických měření (trend a grafy)", value=False, key="include_trend")
+            trend_data = proband_history if include_trend and comparison_row is not None else None
             zaverecne_hodnoceni_time = st.text_area("Zadejte závěrečná doporučení (časové srovnání)", height=150, key="final_recommendation_time")
             final_recommendation_time = zaverecne_hodnoceni_time
 
             if comparison_row is not None:
                 if st.button("Generovat report (čas)", key="gen_report_time"):
                     if report_format == "PDF":
-                        report_path = generuj_analyzu(
-                            proband_id, file_path, final_recommendation_time, selected_columns,
+                        zadej_ulohu(
+                            generuj_analyzu, proband_id, file_path, final_recommendation_time, selected_columns,
                             selected_graphs, selected_graph_type_param,
                             data_df=df, comparison_data=comparison_row,
-                            advanced_stats=advanced_stats_time, selected_graph_vars=selected_graph_vars
+                            advanced_stats=advanced_stats_time, selected_graph_vars=selected_graph_vars,
+                            historie_mereni=trend_data, do_pameti=True,
+                            nazev=f"PDF report {proband_id} (čas)", vlastnik=vlastnik_uloh,
+                            nazev_souboru=f"analyza_{proband_id}_cas.pdf", mime="application/pdf"
                         )
-                        with open(report_path, "rb") as f:
-                            st.download_button("Stáhnout PDF", f, file_name=f"analyza_{proband_id}_cas.pdf", mime="application/pdf", key="download_pdf_time")
-                        st.success("PDF report vygenerován.")
-                        show_pdf(report_path)
                     else:
-                        report_path = generuj_word_report(
-                            proband_id, file_path, final_recommendation_time, selected_columns,
+                        zadej_ulohu(
+                            generuj_word_report, proband_id, file_path, final_recommendation_time, selected_columns,
                             selected_graphs, selected_graph_type=selected_graph_type_param,
                             advanced_stats=advanced_stats_time, data_df=df,
-                            comparison_data=comparison_row, selected_graph_vars=selected_graph_vars
+                            comparison_data=comparison_row, selected_graph_vars=selected_graph_vars,
+                            historie_mereni=trend_data, do_pameti=True,
+                            nazev=f"Word report {proband_id} (čas)", vlastnik=vlastnik_uloh,
+                            nazev_souboru=f"analyza_{proband_id}_cas.docx", mime=DOCX_MIME
                         )
-                        st.download_button("Stáhnout Word report", open(report_path, "rb"),
-                                           file_name=f"analyza_{proband_id}_cas.docx",
-                                           mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                           key="download_word_time")
-                        st.info("Word report byl vygenerován. Otevřete jej ve Wordu a upravte dle potřeby.")
+                    st.info("Report byl zařazen do fronty. Po dokončení jej stáhnete v panelu „Moje úlohy“ vlevo.")
 
                 # OPRAVA: Generování podkladu (čas) → uložit do session_state, download mimo if
                 if st.button("Vygenerovat podklady pro model AI (čas)", key="gen_gpt_time"):
                     podklad_text_time = priprav_podklad(
-                        proband_id, file_path, selected_columns, data_df=df, comparison_data=comparison_row
+                        proband_id, file_path, selected_columns, data_df=df, comparison_data=comparison_row,
+                        historie_mereni=trend_data
                     )
                     podklad_text_time += "\n\nPorovnání v čase: Toto podklad obsahuje hodnoty aktuálního měření a historického měření."
                     st.session_state["podklad_text_time"] = podklad_text_time
@@ -464,6 +559,62 @@ with tab_reports:
         else:
             st.info("Nejsou načtena data nebo není vybrán proband.")
 
+    # ---------- Hromadné reporty ----------
+    with report_subtabs[2]:
+        st.subheader("Hromadné generování reportů (proband vs aktuální skupina)")
+        if 'df' in locals():
+            batch_ids = st.multiselect("Vyberte probandy", df["Identifikace"].unique().tolist(),
+                                       default=df["Identifikace"].unique().tolist(), key="batch_probands")
+            batch_formats = st.multiselect("Výstupní formáty", ["pdf", "docx", "txt"], default=["pdf"], key="batch_formats")
+            advanced_stats_batch = st.checkbox("Zobrazit rozšířené statistiky", value=False, key="advanced_stats_batch")
+            if st.button("Generovat reporty pro vybrané probandy", key="gen_report_batch"):
+                if not batch_ids or not batch_formats:
+                    st.warning("Vyberte alespoň jednoho probanda a jeden formát.")
+                else:
+                    zadej_ulohu(
+                        _hromadne_reporty, batch_ids, file_path, formaty=batch_formats, data_df=df,
+                        zaverecne_hodnoceni=final_recommendation, selected_columns=selected_columns,
+                        selected_graphs=selected_graphs, selected_graph_type=selected_graph_type_param,
+                        advanced_stats=advanced_stats_batch, group_label="Aktuální skupina",
+                        selected_graph_vars=selected_graph_vars,
+                        nazev=f"Hromadné reporty ({len(batch_ids)} probandů)", vlastnik=vlastnik_uloh,
+                        nazev_souboru="prehled_reportu.csv", mime="text/csv"
+                    )
+                    st.info("Reporty byly zařazeny do fronty. Přehled vytvořených souborů stáhnete v panelu „Moje úlohy“ vlevo.")
+            if st.button("Vygenerovat ZIP archiv reportů", key="gen_report_zip"):
+                if not batch_ids or not batch_formats:
+                    st.warning("Vyberte alespoň jednoho probanda a jeden formát.")
+                else:
+                    # Reporty se zapisují rovnou do archivu, jednotlivé soubory v output/ nevznikají
+                    zadej_ulohu(
+                        uloz_zip_reportu, _vystup_ulohy(".zip"), batch_ids, file_path, formaty=batch_formats,
+                        data_df=df, on_progress=_prubeh_ulohy,
+                        zaverecne_hodnoceni=final_recommendation, selected_columns=selected_columns,
+                        selected_graphs=selected_graphs, selected_graph_type=selected_graph_type_param,
+                        advanced_stats=advanced_stats_batch, group_label="Aktuální skupina",
+                        selected_graph_vars=selected_graph_vars,
+                        nazev=f"ZIP archiv reportů ({len(batch_ids)} probandů)", vlastnik=vlastnik_uloh,
+                        nazev_souboru="reporty.zip", mime="application/zip", docasny_soubor=True
+                    )
+                    st.info("Archiv byl zařazen do fronty. Po dokončení jej stáhnete v panelu „Moje úlohy“ vlevo.")
+            if st.button("Vygenerovat sestavu týmu (jedno PDF s obsahem)", key="gen_team_booklet"):
+                if not batch_ids:
+                    st.warning("Vyberte alespoň jednoho probanda.")
+                else:
+                    from sestava import generuj_sestavu_tymu
+                    zadej_ulohu(
+                        generuj_sestavu_tymu, batch_ids, file_path, pdf_path=_vystup_ulohy(".pdf"), data_df=df,
+                        on_progress=_prubeh_ulohy,
+                        zaverecne_hodnoceni=final_recommendation, selected_columns=selected_columns,
+                        selected_graphs=selected_graphs, selected_graph_type=selected_graph_type_param,
+                        advanced_stats=advanced_stats_batch, selected_graph_vars=selected_graph_vars,
+                        nazev=f"Sestava týmu ({len(batch_ids)} probandů)", vlastnik=vlastnik_uloh,
+                        nazev_souboru="sestava_tymu.pdf", mime="application/pdf", docasny_soubor=True
+                    )
+                    st.info("Sestava byla zařazena do fronty. Po dokončení ji stáhnete v panelu „Moje úlohy“ vlevo.")
+        else:
+            st.info("Nejsou načtena data. Nahrajte soubor v levém panelu.")
+
 # --- Genetická analýza ---
 with tab_genetics:
     st.header("Genetická analýza")
@@ -493,7 +644,7 @@ with tab_genetics:
 
             st.markdown("#### 1. Generování promptu pro Custom GPT model")
             if st.button("Vygenerovat prompt pro Custom GPT model", key="gen_prompt"):
-                row = gen_df[gen_df["Identifikace"] == proband_gen].iloc[0]
+                row = najdi_radek(gen_df, proband_gen)
                 prompt = f"Analyzuj genetická data probanda {proband_gen}:\n\n- Genetické varianty:\n"
                 for col in gen_df.columns:
                     if col not in ["Jmeno", "Prijmeni", "Narozen", "Identifikace"]:
@@ -532,7 +683,7 @@ with tab_genetics:
             genetic_summary = st.text_area("Zadejte vlastní shrnutí genetické analýzy (volitelné):", height=150, key="gen_summary")
 
             if st.button("Generovat report genetické analýzy", key="gen_report"):
-                row = gen_df[gen_df["Identifikace"] == proband_gen].iloc[0]
+                row = najdi_radek(gen_df, proband_gen)
                 report_text = f"Genetická analýza probanda {proband_gen}\n" + "-"*50 + "\n\n"
                 report_text += "Genetické varianty:\n"
                 for col in gen_df.columns:
@@ -556,6 +707,7 @@ with tab_genetics:
 
             st.markdown("#### 3. PDF report genetické analýzy")
             if st.button("Generovat PDF report genetické analýzy", key="gen_pdf_report"):
+                from genetika import generuj_geneticky_pdf_report
                 pdf_path = generuj_geneticky_pdf_report(proband_gen, gen_df, genetic_summary)
                 st.success("PDF report genetické analýzy byl vygenerován.")
                 show_pdf(pdf_path)
@@ -581,10 +733,12 @@ with tab_about:
 
 1. **Načtení dat:**  
    - Nahrajte Excel soubor s daty pomocí tlačítka v levém panelu („Načtení dat“).  
+   - Lze nahrát i více souborů najednou (nebo načíst všechny listy sešitu); data se sloučí a sloupec „Zdroj“ určuje, odkud řádek pochází.  
    - Data se zobrazí v tabulce.
 
 2. **Filtrování dat:**  
    - Pomocí filtru (podle unikátní identifikace a věku) vyberte, která data chcete zobrazit.
+   - V záložce „Editace záznamů“ lze hodnoty opravit přímo v tabulce; uloží se jen změněné buňky a aplikace s nimi dál počítá i po novém nahrání stejného souboru. Nahraný soubor se nepřepisuje; upravená data stáhnete tlačítkem „Exportovat upravený sešit“.
 
 3. **Konfigurace reportu:**  
    - V sekci „Konfigurace reportu“ vyberte probanda, jehož report chcete vygenerovat, zvolte proměnné pro analýzu, předdefinované skupiny grafů a individuální grafy.
@@ -597,9 +751,40 @@ with tab_about:
    - Přejděte do záložky „Reporty a podklady“.
    - Vyberte formát reportu (PDF nebo Word) a zdroj dat (aktuální nebo historická).
    - V záložkách **Proband vs skupina** a **Proband vs předchozí měření** jsou tlačítka pro generování reportu a podkladů pro AI model (opravené stahování).
+   - V časovém srovnání lze přidat vývoj ze všech historických měření probanda (trend, nejlepší a nejhorší měření, grafy).  
+   - V záložce **Hromadné reporty** lze vygenerovat reporty pro více probandů najednou (paralelně); přehled vytvořených souborů a chyb se stáhne jako CSV.  
+   - Reporty lze také rovnou stáhnout jako ZIP archiv.  
+   - Tamtéž lze vytvořit sestavu týmu – jedno PDF s obsahem a reporty všech vybraných probandů.
+   - Reporty, ZIP archivy a sestavy se generují na pozadí; průběh, stažení a náhled hotových PDF najdete v levém panelu „Moje úlohy“. Mezitím lze v aplikaci dál pracovat.
 
 6. **Genetická analýza:**  
    - Přejděte do záložky **Genetická analýza**.
    - Nahrajte Excel soubor s genetickými daty a generujte prompt / TXT / PDF reporty.
     """)
 
+# ---- Sidebar: moje úlohy ------------------------------------------------------
+
+with st.sidebar.expander("Moje úlohy", expanded=True):
+    # Dokud některá úloha čeká nebo běží, panel se sám obnovuje bez přepočtu celé stránky
+    aktivni = any(u["stav"] not in (HOTOVO, CHYBA) for u in ulohy_vlastnika(vlastnik_uloh))
+    st.fragment(_panel_uloh, run_every=2 if aktivni else None)()
+
+# ---- Sidebar: ladění – časování etap -----------------------------------------
+
+with st.sidebar.expander("Ladění – časování"):
+    st.text_input("Zapisovat úseky do souboru (JSON lines)", key="timing_jsonl", on_change=_zmena_casovani_jsonl,
+                  placeholder=os.environ.get(JSONL_PROMENNA, ""),
+                  help=f"Nastavení platí pro celou aplikaci. Prázdné pole ponechá výchozí nastavení z proměnné "
+                       f"{JSONL_PROMENNA} (bez ní se nezapisuje); úseky se vždy zapisují do logu.")
+    if st.checkbox("Zobrazit rozpis posledních běhů", value=False, key="show_timing"):
+        behy = posledni_behy()
+        if behy:
+            vybrany = st.selectbox("Běh", range(len(behy)), key="timing_run",
+                                   format_func=lambda i: f"{behy[i]['nazev']} – {behy[i]['trvani_s']:.3f} s "
+                                                         f"({pd.Timestamp.fromtimestamp(behy[i]['zacatek']):%H:%M:%S})")
+            st.dataframe(pd.DataFrame([
+                {"Úsek": "  " * uroven + nazev, "Čas [s]": round(trvani, 3), "Podíl [%]": round(podil, 1), "Počty": pocty}
+                for uroven, nazev, trvani, podil, pocty in rozpis_behu(behy[vybrany])
+            ]), hide_index=True)
+        else:
+            st.caption("Zatím nebyl změřen žádný běh.")
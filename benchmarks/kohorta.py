@@ -0,0 +1,87 @@
+"""
+Generátor syntetických kohort se stejnými sloupci jako reálná data (složení těla, síla
+úchopu, rychlost podání a rotace ramene při 210°/s a 300°/s).
+
+Spuštění z kořene repozitáře:  python benchmarks/kohorta.py POCET_RADKU [cesta.xlsx] [--seed N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Průměr a směrodatná odchylka jednotlivých parametrů (orientačně podle reálných měření)
+PARAMETRY = {
+    "Dominantni paze": (4.2, 0.7),
+    "Dominantni paze - beztukova": (3.8, 0.6),
+    "Dominantni noha": (11.5, 1.6),
+    "Dominantni noha - beztukova": (10.4, 1.4),
+    "Trupova hmotnost": (31.0, 3.5),
+    "Trup - betukovy": (28.0, 3.0),
+    "Beztukova hmota": (60.0, 7.0),
+    "Sila uchopu": (45.0, 8.0),
+    "Rychlost podani": (170.0, 15.0),
+    "Vnitrni rotace koncentricka (210°/s)": (42.0, 8.0),
+    "Vnejsi rotace koncentricka (210°/s)": (32.0, 6.0),
+    "Vnitrni rotace excentricka (210°/s)": (50.0, 9.0),
+    "Vnejsi rotace excentricka (210°/s)": (38.0, 7.0),
+    "Vnitrni rotace koncentricka (300°/s)": (38.0, 7.0),
+    "Vnejsi rotace koncentricka (300°/s)": (29.0, 5.5),
+    "Vnitrni rotace excentricka (300°/s)": (46.0, 8.5),
+    "Vnejsi rotace excentricka (300°/s)": (35.0, 6.5),
+}
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "aplikace_data_benchmark")
+
+def generuj_kohortu(pocet_radku, seed=0, mereni_na_probanda=1):
+    """
+    Vrátí DataFrame se syntetickou kohortou o pocet_radku řádcích.
+
+    Při mereni_na_probanda > 1 má každý proband více měření s rostoucím DatumMereni
+    (vhodné pro historii a trendy); jinak je každý řádek jiný proband.
+    """
+    rng = np.random.default_rng(seed)
+    proband = np.arange(pocet_radku) // mereni_na_probanda
+    sezeni = np.arange(pocet_radku) % mereni_na_probanda
+    narozen = 1990 + proband % 20
+    df = pd.DataFrame({
+        "Jmeno": [f"Jmeno{p}" for p in proband],
+        "Prijmeni": [f"Prijmeni{p}" for p in proband],
+        "Narozen": narozen,
+        "Vek": np.clip(rng.normal(22, 6, pocet_radku).round(), 12, 45).astype(int),
+        "Vyska": rng.normal(178, 9, pocet_radku).round(1),
+        "Hmotnost": rng.normal(74, 10, pocet_radku).round(1),
+    })
+    for nazev, (prumer, sd) in PARAMETRY.items():
+        df[nazev] = np.abs(rng.normal(prumer, sd, pocet_radku)).round(2)
+    if mereni_na_probanda > 1:
+        df["DatumMereni"] = (pd.Timestamp("2020-01-01") + pd.to_timedelta(sezeni * 14, unit="D")).strftime("%Y-%m-%d %H:%M")
+    return df
+
+def sesit_kohorty(pocet_radku, seed=0):
+    """Vrátí cestu k sešitu s kohortou; vygenerované sešity se ukládají a znovu používají."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cesta = os.path.join(CACHE_DIR, f"kohorta_{pocet_radku}_{seed}.xlsx")
+    if not os.path.exists(cesta):
+        tmp_cesta = f"{cesta}.{os.getpid()}.tmp.xlsx"
+        generuj_kohortu(pocet_radku, seed).to_excel(tmp_cesta, sheet_name="data", index=False, engine="openpyxl")
+        os.replace(tmp_cesta, cesta)
+    return cesta
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pocet_radku", type=int)
+    parser.add_argument("cesta", nargs="?")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.cesta:
+        generuj_kohortu(args.pocet_radku, args.seed).to_excel(args.cesta, sheet_name="data", index=False, engine="openpyxl")
+        print(args.cesta)
+    else:
+        print(sesit_kohorty(args.pocet_radku, args.seed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
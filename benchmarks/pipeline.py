@@ -0,0 +1,177 @@
+"""
+Benchmark zpracovatelského řetězce nad syntetickými kohortami (bez přístupu k síti).
+
+Spuštění z kořene repozitáře:
+    python benchmarks/pipeline.py [--rows 10,1000,10000] [--vse] [--repeat 3]
+                                  [--ulozit-baseline] [--tolerance 1.5] [--ignorovat-cpu]
+
+Pro každou velikost kohorty měří načtení sešitu, sestavení modelu reportu, vykreslení
+PDF, DOCX a TXT, celé funkce generuj_analyzu, generuj_word_report a priprav_podklad,
+ZIP archiv a sestavu týmu pro TYM_PROBANDU probandů a zápis a čtení historické databáze. Načtení se měří se studenou mezipamětí; celé funkce
+generuj_* a priprav_podklad s již načtenými daty, ale bez mezipaměti modelů a grafů.
+Výsledky (medián opakování) se porovnají s benchmarks/baseline.json; při zpomalení
+nad toleranci skončí s kódem 1. Baseline naměřená na stroji s jiným počtem CPU se
+neporovnává (paralelní etapy na něm závisí), pokud není zadáno --ignorovat-cpu.
+--vse přidá kohortu se 100 000 řádky.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+VYCHOZI_VELIKOSTI = [10, 1000, 10000]
+VELKA_KOHORTA = 100000
+# Zpomalení se hlásí, jen pokud je poměr i absolutní rozdíl nad limitem (šum u krátkých měření)
+VYCHOZI_TOLERANCE = 1.5
+MIN_ROZDIL_S = 0.05
+
+# Počet probandů v ZIP archivu a sestavě týmu (nezávisle na velikosti kohorty)
+TYM_PROBANDU = 10
+
+ETAPY = ["nacteni", "nacteni_z_mezipameti", "model_reportu", "pdf", "docx", "txt",
+         "generuj_analyzu", "generuj_word_report", "priprav_podklad", "zip_reportu", "sestava_tymu",
+         "historie_pridani", "historie_agregaty"]
+
+def _vyprazdni_mezipameti_reportu(analyza):
+    analyza._model_cache.clear()
+    analyza._chart_cache.clear()
+    shutil.rmtree(analyza.CHART_CACHE_FOLDER, ignore_errors=True)
+
+def _vyprazdni_mezipameti(analyza, historie, mezipamet):
+    _vyprazdni_mezipameti_reportu(analyza)
+    analyza._data_cache.clear()
+    historie._hist_cache.clear()
+    historie._hist_rozdeleni_cache.clear()
+    mezipamet._hash_memo.clear()
+
+def _zmer(funkce):
+    t = time.perf_counter()
+    vysledek = funkce()
+    return time.perf_counter() - t, vysledek
+
+def mer_kohortu(pocet_radku, opakovani):
+    """Vrátí {etapa: medián sekund} pro kohortu o daném počtu řádků."""
+    import analyza
+    import historie
+    import mezipamet
+    from sestava import generuj_sestavu_tymu
+    from kohorta import generuj_kohortu, sesit_kohorty
+
+    sesit = sesit_kohorty(pocet_radku)
+    historie_df = generuj_kohortu(pocet_radku, seed=1, mereni_na_probanda=min(pocet_radku, 10))
+    casy = {etapa: [] for etapa in ETAPY}
+    for _ in range(opakovani):
+        _vyprazdni_mezipameti(analyza, historie, mezipamet)
+        dt, df = _zmer(lambda: analyza.load_data(sesit))
+        casy["nacteni"].append(dt)
+        casy["nacteni_z_mezipameti"].append(_zmer(lambda: analyza.load_data(sesit))[0])
+        proband_id = df["Identifikace"].iloc[0]
+
+        dt, model = _zmer(lambda: analyza.sestav_model_reportu(proband_id, sesit, advanced_stats=True))
+        casy["model_reportu"].append(dt)
+        casy["pdf"].append(_zmer(lambda: analyza.vykresli_pdf(model, BytesIO()))[0])
+        _vyprazdni_mezipameti_reportu(analyza)
+        casy["docx"].append(_zmer(lambda: analyza.vykresli_docx(model, BytesIO()))[0])
+        casy["txt"].append(_zmer(lambda: analyza.vykresli_podklad(model))[0])
+
+        for etapa, funkce in (("generuj_analyzu", analyza.generuj_analyzu),
+                              ("generuj_word_report", analyza.generuj_word_report)):
+            _vyprazdni_mezipameti_reportu(analyza)
+            casy[etapa].append(_zmer(lambda: funkce(proband_id, sesit, advanced_stats=True, do_pameti=True))[0])
+        _vyprazdni_mezipameti_reportu(analyza)
+        casy["priprav_podklad"].append(_zmer(lambda: analyza.priprav_podklad(proband_id, sesit))[0])
+
+        tym = list(dict.fromkeys(df["Identifikace"]))[:TYM_PROBANDU]
+        _vyprazdni_mezipameti_reportu(analyza)
+        casy["zip_reportu"].append(_zmer(lambda: analyza.uloz_zip_reportu(BytesIO(), tym, sesit, data_df=df))[0])
+        _vyprazdni_mezipameti_reportu(analyza)
+        casy["sestava_tymu"].append(_zmer(lambda: generuj_sestavu_tymu(tym, sesit, BytesIO(), data_df=df))[0])
+
+        db_path = os.path.join(tempfile.mkdtemp(dir="."), "historie.sqlite")
+        casy["historie_pridani"].append(_zmer(lambda: historie.pridej_do_historie(historie_df, db_path=db_path))[0])
+        historie._hist_cache.clear()
+        historie._hist_rozdeleni_cache.clear()
+        casy["historie_agregaty"].append(_zmer(lambda: historie.nacti_agregaty(vek_rozsah=(15, 30), db_path=db_path))[0])
+    return {etapa: statistics.median(hodnoty) for etapa, hodnoty in casy.items()}
+
+def porovnej_s_baseline(vysledky, baseline, tolerance):
+    """Vrátí seznam textů o zpomalení oproti baseline."""
+    zpomaleni = []
+    for velikost, etapy in vysledky.items():
+        zaklad = baseline.get("vysledky", {}).get(velikost, {})
+        for etapa, cas in etapy.items():
+            puvodni = zaklad.get(etapa)
+            if puvodni is not None and cas > puvodni * tolerance and cas - puvodni > MIN_ROZDIL_S:
+                zpomaleni.append(f"{etapa} ({velikost} řádků): {cas:.3f} s oproti {puvodni:.3f} s")
+    return zpomaleni
+
+def _tiskni_tabulku(vysledky):
+    velikosti = list(vysledky)
+    print(f"{'Etapa':24}" + "".join(f"{v + ' řádků':>16}" for v in velikosti))
+    for etapa in ETAPY:
+        print(f"{etapa:24}" + "".join(f"{vysledky[v][etapa]:>15.3f}s" for v in velikosti))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default=",".join(str(v) for v in VYCHOZI_VELIKOSTI))
+    parser.add_argument("--vse", action="store_true", help=f"přidat kohortu s {VELKA_KOHORTA} řádky")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ulozit-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=VYCHOZI_TOLERANCE)
+    parser.add_argument("--ignorovat-cpu", action="store_true", help="porovnat i s baseline z jiného počtu CPU")
+    args = parser.parse_args()
+
+    velikosti = [int(v) for v in args.rows.split(",") if v.strip()]
+    if args.vse and VELKA_KOHORTA not in velikosti:
+        velikosti.append(VELKA_KOHORTA)
+
+    sys.path[:0] = [REPO_DIR, BENCH_DIR]
+    import analyza  # nastaví logování, které se pro měření ztiší
+    logging.disable(logging.INFO)
+    vysledky = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Výstupy a mezipaměti reportů (relativní cesty) se zapisují do dočasného adresáře
+        os.chdir(tmp)
+        # Zahřátí: první načtení sešitu platí import čtecího enginu, ten se neměří
+        from kohorta import sesit_kohorty
+        analyza.load_data(sesit_kohorty(min(velikosti)))
+        for velikost in velikosti:
+            print(f"Kohorta {velikost} řádků...", flush=True)
+            vysledky[str(velikost)] = mer_kohortu(velikost, args.repeat)
+        os.chdir(REPO_DIR)
+    _tiskni_tabulku(vysledky)
+
+    if args.ulozit_baseline:
+        baseline = {"python": platform.python_version(), "platforma": platform.platform(),
+                    "cpu": os.cpu_count(), "opakovani": args.repeat, "vysledky": vysledky}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"Baseline uložena do {BASELINE_PATH}")
+        return 0
+    if not os.path.exists(BASELINE_PATH):
+        print("Baseline neexistuje, spusťte s --ulozit-baseline.")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("cpu") != os.cpu_count() and not args.ignorovat_cpu:
+        print(f"Baseline byla naměřena na {baseline.get('cpu')} CPU, tento stroj má {os.cpu_count()} CPU; "
+              "porovnání se přeskakuje (uložte vlastní baseline nebo zadejte --ignorovat-cpu).")
+        return 0
+    zpomaleni = porovnej_s_baseline(vysledky, baseline, args.tolerance)
+    for text in zpomaleni:
+        print(f"ZPOMALENÍ: {text}")
+    return 1 if zpomaleni else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Měření startu aplikace: studený import modulů, první běh app.py a režie jednoho rerunu.
+
+Spuštění z kořene repozitáře:  python benchmarks/startup.py [--reruns N]
+Při překročení rozpočtu importu nebo načtení těžkých modulů skončí s kódem 1.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rozpočet pro studený import (s) a moduly, které se při startu nesmí načíst
+IMPORT_BUDGET_S = 2.0
+LAZY_MODULES = ["matplotlib", "reportlab", "docx", "st_aggrid"]
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+t = time.perf_counter()
+import analyza, historie, indexy, mezipamet
+elapsed = time.perf_counter() - t
+print(json.dumps({"import_s": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+_APP_SCRIPT = """
+import json, statistics, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(%r, default_timeout=300)
+t = time.perf_counter()
+at.run()
+cold = time.perf_counter() - t
+reruns = []
+for _ in range(%d):
+    t = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t)
+print(json.dumps({"cold_start_s": cold, "rerun_median_s": statistics.median(reruns) if reruns else None,
+                  "loaded": [m for m in %r if m in sys.modules],
+                  "exceptions": [str(e.value) for e in at.exception]}))
+"""
+
+def _spust(script, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def mer_start(reruns=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        vysledek = {"import": _spust(_IMPORT_SCRIPT % LAZY_MODULES, tmp)}
+        vysledek["app"] = _spust(_APP_SCRIPT % (os.path.join(REPO_DIR, "app.py"), reruns, LAZY_MODULES), tmp)
+    return vysledek
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    vysledek = mer_start(args.reruns)
+    imp, app = vysledek["import"], vysledek["app"]
+    print(f"Studený import modulů:   {imp['import_s']:.3f} s (rozpočet {IMPORT_BUDGET_S:.1f} s)")
+    print(f"Studený start app.py:    {app['cold_start_s']:.3f} s")
+    if app["rerun_median_s"] is not None:
+        print(f"Rerun app.py (medián):   {app['rerun_median_s']:.3f} s")
+
+    chyby = []
+    if imp["import_s"] > IMPORT_BUDGET_S:
+        chyby.append(f"import trval {imp['import_s']:.3f} s")
+    for nazev, loaded in (("import", imp["loaded"]), ("start aplikace", app["loaded"])):
+        if loaded:
+            chyby.append(f"{nazev} načetl těžké moduly: {', '.join(loaded)}")
+    if app["exceptions"]:
+        chyby.append(f"aplikace vyhodila výjimku: {app['exceptions'][0]}")
+    for chyba in chyby:
+        print(f"CHYBA: {chyba}")
+    return 1 if chyby else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
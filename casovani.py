@@ -0,0 +1,122 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# Měření času jednotlivých etap zpracování (načtení dat, statistiky, grafy, sestavení PDF/DOCX,
+# historická databáze). Úseky se vnořují; vnější úsek je jeden běh, který se zapíše do loggeru
+# s rozpisem a uloží pro ladicí panel. Je-li nastavena cesta k JSONL souboru (proměnná
+# prostředí APLIKACE_CASOVANI_JSONL nebo nastav_jsonl), zapíše se tam každý úsek jako řádek.
+
+logger = logging.getLogger(__name__)
+
+JSONL_PROMENNA = "APLIKACE_CASOVANI_JSONL"
+POSLEDNICH_BEHU = 20
+
+_stav = threading.local()
+_behy = deque(maxlen=POSLEDNICH_BEHU)
+_behy_lock = threading.Lock()
+_jsonl_cesta = os.environ.get(JSONL_PROMENNA) or None
+_jsonl_lock = threading.Lock()
+
+def nastav_jsonl(cesta):
+    """Nastaví (nebo cestou None vypne) zápis úseků do JSON-lines souboru."""
+    global _jsonl_cesta
+    _jsonl_cesta = cesta
+
+def _zasobnik():
+    zasobnik = getattr(_stav, "zasobnik", None)
+    if zasobnik is None:
+        zasobnik = _stav.zasobnik = []
+    return zasobnik
+
+def _zapis_jsonl(zaznam):
+    radek = {"cas": zaznam["zacatek"], "beh": zaznam["beh"], "cesta": zaznam["cesta"], "nazev": zaznam["nazev"],
+             "uroven": zaznam["uroven"], "trvani_s": round(zaznam["trvani_s"], 6), "pocty": zaznam["pocty"],
+             "pid": os.getpid()}
+    if zaznam.get("chyba"):
+        radek["chyba"] = zaznam["chyba"]
+    try:
+        with _jsonl_lock, open(_jsonl_cesta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(radek, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        logger.warning(f"Zápis časování do {_jsonl_cesta} selhal: {e}")
+
+def _popis_poctu(pocty):
+    return ", ".join(f"{k}={v}" for k, v in pocty.items())
+
+@contextmanager
+def usek(nazev, **pocty):
+    """
+    Změří dobu bloku jako pojmenovaný úsek; vrací slovník počtů, do kterého lze
+    během bloku doplnit např. počet řádků nebo grafů.
+    """
+    zasobnik = _zasobnik()
+    rodic = zasobnik[-1] if zasobnik else None
+    zaznam = {
+        "nazev": nazev,
+        "cesta": f"{rodic['cesta']}/{nazev}" if rodic else nazev,
+        "beh": rodic["beh"] if rodic else uuid.uuid4().hex[:12],
+        "uroven": len(zasobnik),
+        "zacatek": time.time(),
+        "pocty": dict(pocty),
+        "useky": [],
+    }
+    zasobnik.append(zaznam)
+    start = time.perf_counter()
+    try:
+        yield zaznam["pocty"]
+    except BaseException as e:
+        zaznam["chyba"] = type(e).__name__
+        raise
+    finally:
+        zaznam["trvani_s"] = time.perf_counter() - start
+        zasobnik.pop()
+        if _jsonl_cesta:
+            _zapis_jsonl(zaznam)
+        if rodic is not None:
+            rodic["useky"].append(zaznam)
+            logger.debug(f"{zaznam['cesta']}: {zaznam['trvani_s']:.3f} s {_popis_poctu(zaznam['pocty'])}")
+        else:
+            rozpis = ", ".join(f"{u['nazev']} {u['trvani_s']:.3f} s" for u in zaznam["useky"])
+            logger.info(f"Časování {nazev}: {zaznam['trvani_s']:.3f} s" + (f" ({rozpis})" if rozpis else ""))
+            with _behy_lock:
+                _behy.append(zaznam)
+
+def pocitej(**pocty):
+    """Doplní počty do právě měřeného (nejvnitřnějšího) úseku; mimo úsek nedělá nic."""
+    zasobnik = _zasobnik()
+    if zasobnik:
+        zasobnik[-1]["pocty"].update(pocty)
+
+def casovat(nazev=None):
+    """Dekorátor, který měří každé volání funkce jako úsek (výchozí název je název funkce)."""
+    def dekorator(funkce):
+        @functools.wraps(funkce)
+        def obal(*args, **kwargs):
+            with usek(nazev or funkce.__name__):
+                return funkce(*args, **kwargs)
+        return obal
+    return dekorator
+
+def posledni_behy():
+    """Vrátí posledních POSLEDNICH_BEHU dokončených běhů (vnějších úseků s vnořenými úseky), nejnovější první."""
+    with _behy_lock:
+        return list(reversed(_behy))
+
+def rozpis_behu(beh):
+    """Zploští běh na seznam řádků (uroven, nazev, trvani_s, podil_pct, pocty) v pořadí vnoření."""
+    radky = []
+    celkem = beh["trvani_s"] or 1e-12
+    def projdi(zaznam):
+        radky.append((zaznam["uroven"], zaznam["nazev"], zaznam["trvani_s"],
+                      100 * zaznam["trvani_s"] / celkem, _popis_poctu(zaznam["pocty"])))
+        for vnoreny in zaznam["useky"]:
+            projdi(vnoreny)
+    projdi(beh)
+    return radky
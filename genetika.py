@@ -0,0 +1,57 @@
+import os
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+from analyza import OUTPUT_FOLDER, registruj_fonty
+from indexy import najdi_radek
+
+def generuj_geneticky_pdf_report(proband_gen, gen_df, genetic_summary):
+    """
+    Vygeneruje PDF report pro genetickou analýzu probanda s použitím Times New Roman.
+    """
+    fonty = registruj_fonty()
+    pdf_path = os.path.join(OUTPUT_FOLDER, f"geneticka_analyza_{proband_gen.replace(' ', '_')}.pdf")
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    custom_bold = ParagraphStyle(name="Custom-Bold", parent=styles["Heading2"],
+                                 fontName="TimesNewRoman-Bold" if 'TimesNewRoman-Bold' in fonty else "Helvetica-Bold",
+                                 fontSize=14, spaceAfter=10)
+    custom_regular = ParagraphStyle(name="Custom-Regular", parent=styles["BodyText"],
+                                    fontName="TimesNewRoman" if 'TimesNewRoman' in fonty else "Helvetica",
+                                    fontSize=12)
+
+    elements.append(Paragraph("Genetická analýza", custom_bold))
+    elements.append(Paragraph(f"Proband: {proband_gen}", custom_regular))
+    elements.append(Spacer(1, 12))
+
+    mandatory_cols = ["Jmeno", "Prijmeni", "Narozen", "Identifikace"]
+    table_data = [["Variant", "Hodnota"]]
+    row = najdi_radek(gen_df, proband_gen)
+    for col in gen_df.columns:
+        if col not in mandatory_cols:
+            table_data.append([col, str(row[col])])
+    table = Table(table_data, hAlign="LEFT")
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.grey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('FONTNAME', (0,0), (-1,0), 'TimesNewRoman-Bold' if 'TimesNewRoman-Bold' in fonty else "Helvetica-Bold"),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 12))
+
+    if genetic_summary.strip():
+        elements.append(Paragraph("Shrnutí genetické analýzy:", custom_bold))
+        for para in genetic_summary.strip().split("\n\n"):
+            elements.append(Paragraph(para.strip(), custom_regular))
+            elements.append(Spacer(1, 12))
+
+    doc.build(elements)
+    return pdf_path
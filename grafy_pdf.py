@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+
+# Vektorové grafy pro PDF z grafiky ReportLabu: stejné typy jako matplotlibové grafy
+# v analyza._vykresli_graf (bar, line, scatter a trend), ale kreslené přímo do PDF jako
+# Drawing, bez rastrování a bez importu matplotlibu.
+
+BARVA_PROBAND = colors.HexColor("#1F4E79")
+BARVA_REFERENCE = colors.HexColor("#A0A0A0")
+BARVA_MRIZKY = colors.HexColor("#D0D0D0")
+FONT = "TimesNewRoman"
+FONT_BOLD = "TimesNewRoman-Bold"
+SIRKA, VYSKA = 450, 300
+# Okraje oblasti grafu: vlevo osa hodnot, dole šikmé popisky, nahoře nadpis a legenda
+OKRAJ_VLEVO, OKRAJ_VPRAVO, OKRAJ_DOLE, OKRAJ_NAHORE = 45, 15, 80, 55
+MAX_POPISKU_HODNOT = 12
+
+def _hodnoty(hodnoty):
+    """Čísla pro graf; chybějící a nečíselné hodnoty jsou None (ReportLab je vynechá)."""
+    vysledek = []
+    for v in hodnoty:
+        try:
+            v = float(v)
+        except (TypeError, ValueError):
+            v = np.nan
+        vysledek.append(v if np.isfinite(v) else None)
+    return vysledek
+
+def _rozsah_osy(*rady, od_nuly=False):
+    platne = [v for rada in rady for v in rada if v is not None]
+    if not platne:
+        return 0.0, 1.0
+    spodni, horni = min(platne), max(platne)
+    if od_nuly:
+        spodni, horni = min(spodni, 0.0), max(horni, 0.0)
+    rezerva = (horni - spodni) * 0.1 or abs(horni) * 0.1 or 1.0
+    return (spodni if od_nuly and spodni == 0 else spodni - rezerva), horni + rezerva
+
+def _nastav_osu_hodnot(osa, rozsah):
+    osa.valueMin, osa.valueMax = rozsah
+    osa.labels.fontName = FONT
+    osa.labels.fontSize = 8
+    osa.labelTextFormat = "%.2f" if rozsah[1] - rozsah[0] < 10 else "%.0f"
+    osa.visibleGrid = True
+    osa.gridStrokeColor = BARVA_MRIZKY
+    osa.gridStrokeDashArray = (2, 2)
+
+def _nastav_kategorie(osa, popisky):
+    osa.categoryNames = [str(p) for p in popisky]
+    osa.labels.fontName = FONT
+    osa.labels.fontSize = 7
+    osa.labels.angle = 20
+    osa.labels.boxAnchor = "ne"
+    osa.labels.dx = 0
+    osa.labels.dy = -4
+
+def _umisti(graf, sirka, vyska):
+    graf.x, graf.y = OKRAJ_VLEVO, OKRAJ_DOLE
+    graf.width = sirka - OKRAJ_VLEVO - OKRAJ_VPRAVO
+    graf.height = vyska - OKRAJ_DOLE - OKRAJ_NAHORE
+
+def _popisky_hodnot(hodnoty_proband, pocet_rad):
+    """Popisky hodnot jen u první řady (proband), ostatní řady bez popisků."""
+    popisky = [[f"{v:.2f}" if v is not None else "" for v in hodnoty_proband]]
+    return popisky + [[""] * len(hodnoty_proband) for _ in range(pocet_rad - 1)]
+
+def _zahlavi(kresba, nazev, label_current, label_reference, sirka, vyska):
+    kresba.add(String(sirka / 2, vyska - 16, nazev, fontName=FONT_BOLD, fontSize=12, textAnchor="middle"))
+    legenda = Legend()
+    legenda.colorNamePairs = [(BARVA_PROBAND, label_current), (BARVA_REFERENCE, label_reference)]
+    legenda.fontName = FONT
+    legenda.fontSize = 8
+    legenda.alignment = "right"
+    legenda.columnMaximum = 1
+    legenda.deltax = 110
+    legenda.boxAnchor = "ne"
+    legenda.x, legenda.y = sirka - OKRAJ_VPRAVO, vyska - 28
+    kresba.add(legenda)
+
+def _sloupcovy(proband, reference, popisky, sirka, vyska):
+    graf = VerticalBarChart()
+    _umisti(graf, sirka, vyska)
+    graf.data = [proband, reference]
+    graf.groupSpacing = 8
+    graf.bars[0].fillColor = BARVA_PROBAND
+    graf.bars[1].fillColor = BARVA_REFERENCE
+    graf.bars.strokeColor = colors.black
+    graf.bars.strokeWidth = 0.5
+    graf.barLabelFormat = "%.2f"
+    graf.barLabels.fontName = FONT_BOLD
+    graf.barLabels.fontSize = 6
+    graf.barLabels.nudge = 6
+    _nastav_kategorie(graf.categoryAxis, popisky)
+    _nastav_osu_hodnot(graf.valueAxis, _rozsah_osy(proband, reference, od_nuly=True))
+    return graf
+
+def _carovy(proband, reference, popisky, sirka, vyska, spojit=True):
+    graf = HorizontalLineChart()
+    _umisti(graf, sirka, vyska)
+    graf.data = [proband, reference]
+    graf.joinedLines = 1 if spojit else 0
+    for i, barva in enumerate((BARVA_PROBAND, BARVA_REFERENCE)):
+        graf.lines[i].strokeColor = barva
+        graf.lines[i].strokeWidth = 1.5
+        graf.lines[i].symbol = makeMarker("FilledCircle", fillColor=barva, strokeColor=barva, size=5)
+    graf.lineLabelFormat = "values"
+    graf.lineLabelArray = _popisky_hodnot(proband, 2)
+    graf.lineLabels.fontName = FONT_BOLD
+    graf.lineLabels.fontSize = 7
+    graf.lineLabels.dy = 6
+    _nastav_kategorie(graf.categoryAxis, popisky)
+    _nastav_osu_hodnot(graf.valueAxis, _rozsah_osy(proband, reference))
+    return graf
+
+def _trendovy(proband, reference, popisky, sirka, vyska):
+    """Časová řada: osa x jsou dny od prvního měření, popisky osy data."""
+    datumy = pd.to_datetime(pd.Series(popisky), errors="coerce")
+    pocatek = datumy.min()
+    dny = ((datumy - pocatek) / pd.Timedelta(days=1)).to_numpy()
+    body = [[(x, y) for x, y in zip(dny, rada) if y is not None and np.isfinite(x)] for rada in (proband, reference)]
+    graf = LinePlot()
+    _umisti(graf, sirka, vyska)
+    graf.data = body
+    graf.lines[0].strokeColor = BARVA_PROBAND
+    graf.lines[0].strokeWidth = 1.5
+    graf.lines[0].symbol = makeMarker("FilledCircle", fillColor=BARVA_PROBAND, strokeColor=BARVA_PROBAND,
+                                      size=3 if len(popisky) > 30 else 5)
+    graf.lines[1].strokeColor = BARVA_REFERENCE
+    graf.lines[1].strokeWidth = 1.5
+    graf.lines[1].strokeDashArray = (4, 3)
+    if len(popisky) <= MAX_POPISKU_HODNOT:
+        graf.lineLabelFormat = "values"
+        graf.lineLabelArray = [[f"{y:.2f}" for _, y in body[0]], [""] * len(body[1])]
+        graf.lineLabels.fontName = FONT_BOLD
+        graf.lineLabels.fontSize = 7
+        graf.lineLabels.dy = 6
+    rozsah_x = max(float(np.nanmax(dny)) if len(dny) else 0.0, 1.0)
+    graf.xValueAxis.valueMin, graf.xValueAxis.valueMax = 0, rozsah_x
+    graf.xValueAxis.labels.fontName = FONT
+    graf.xValueAxis.labels.fontSize = 7
+    graf.xValueAxis.labels.angle = 30
+    graf.xValueAxis.labels.boxAnchor = "ne"
+    zacatek = pocatek.to_pydatetime() if pd.notna(pocatek) else datetime(1970, 1, 1)
+    graf.xValueAxis.labelTextFormat = lambda x: (zacatek + timedelta(days=x)).strftime("%d.%m.%Y")
+    _nastav_osu_hodnot(graf.yValueAxis, _rozsah_osy(proband, reference))
+    return graf
+
+def vektorovy_graf(nazev, hodnoty_proband, hodnoty_avg, popisky, graph_type="bar",
+                   label_current="Aktuální měření", label_reference="Historické měření",
+                   sirka=SIRKA, vyska=VYSKA):
+    """
+    Vrátí graf jako ReportLab Drawing (flowable) o rozměrech sirka × vyska bodů.
+
+    Argumenty jsou stejné jako u analyza.generate_graph; neznámý graph_type se kreslí jako "bar".
+    """
+    proband, reference = _hodnoty(hodnoty_proband), _hodnoty(hodnoty_avg)
+    kresba = Drawing(sirka, vyska)
+    if graph_type == "line":
+        graf = _carovy(proband, reference, popisky, sirka, vyska)
+    elif graph_type == "scatter":
+        graf = _carovy(proband, reference, popisky, sirka, vyska, spojit=False)
+    elif graph_type == "trend":
+        graf = _trendovy(proband, reference, popisky, sirka, vyska)
+    else:
+        graf = _sloupcovy(proband, reference, popisky, sirka, vyska)
+    kresba.add(graf)
+    _zahlavi(kresba, nazev, label_current, label_reference, sirka, vyska)
+    return kresba
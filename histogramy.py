@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from casovani import pocitej, usek
+from mezipamet import Mezipamet
+
+# Histogramy pro dashboard počítané na serveru: do grafu se posílají jen hranice a počty
+# binů, ne všechny řádky dat. Výsledky se ukládají podle klíče dat a parametru, takže
+# přepnutí zpět na již zobrazený parametr histogram znovu nepočítá.
+
+MIN_BINU = 5
+MAX_BINU = 60
+HISTOGRAM_CACHE_MAX_POLOZEK = 512
+_histogram_cache = Mezipamet(HISTOGRAM_CACHE_MAX_POLOZEK, velikost=lambda _: 1)
+
+def _hranice_binu(hodnoty, pocet_binu=None):
+    if pocet_binu is None:
+        # Adaptivní počet binů (větší z odhadů Sturges a Freedman–Diaconis), omezený shora i zdola
+        pocet_binu = len(np.histogram_bin_edges(hodnoty, bins="auto")) - 1
+        pocet_binu = min(max(pocet_binu, MIN_BINU), MAX_BINU)
+    return np.histogram_bin_edges(hodnoty, bins=pocet_binu)
+
+def histogram(hodnoty, pocet_binu=None):
+    """
+    Vrátí histogram hodnot jako DataFrame se sloupci od, do a pocet (jeden řádek na bin).
+
+    Chybějící a nečíselné hodnoty se vynechají; bez platných hodnot je výsledek prázdný.
+    """
+    hodnoty = pd.to_numeric(pd.Series(hodnoty), errors="coerce").to_numpy(dtype=float)
+    hodnoty = hodnoty[np.isfinite(hodnoty)]
+    if len(hodnoty) == 0:
+        return pd.DataFrame({"od": [], "do": [], "pocet": []})
+    pocty, hranice = np.histogram(hodnoty, bins=_hranice_binu(hodnoty, pocet_binu))
+    return pd.DataFrame({"od": hranice[:-1], "do": hranice[1:], "pocet": pocty})
+
+def histogram_dat(klic, sloupec, hodnoty, pocet_binu=None):
+    """
+    Histogram parametru sloupec z dat identifikovaných klíčem klic, s mezipamětí.
+
+    hodnoty je pole hodnot nebo funkce, která je vrátí; volá se jen při prvním výpočtu
+    pro daný klíč a parametr.
+    """
+    with usek("histogram", parametr=sloupec) as pocty:
+        klic_histogramu = (klic, sloupec, pocet_binu)
+        vysledek = _histogram_cache.get(klic_histogramu)
+        pocty["z_mezipameti"] = vysledek is not None
+        if vysledek is None:
+            vysledek = histogram(hodnoty() if callable(hodnoty) else hodnoty, pocet_binu)
+            _histogram_cache.put(klic_histogramu, vysledek)
+        pocitej(binu=len(vysledek))
+        return vysledek
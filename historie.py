@@ -0,0 +1,400 @@
+import os
+import sqlite3
+import logging
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from analyza import pridej_pomery_ir_er
+from casovani import casovat, pocitej
+from histogramy import histogram_dat
+from mezipamet import Mezipamet
+from nacitani import NUMERICKE_SLOUPCE
+from percentily import KLLSketch
+from indexy import index_podle, sdilej_indexy, serazeno_podle, vyber_rozsah
+
+logger = logging.getLogger(__name__)
+
+# Konstanty
+HISTORICAL_FOLDER = "historical"
+HIST_DB = os.path.join(HISTORICAL_FOLDER, "historical_data.sqlite")
+HIST_XLSX = os.path.join(HISTORICAL_FOLDER, "historical_data.xlsx")
+HIST_TABLE = "historie"
+INDEXOVANE_SLOUPCE = ["Identifikace", "DatumMereni", "Vek"]
+HIST_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Průběžné agregáty populace (počet, průměr, M2 podle Welforda, min, max) a kvantilové
+# sketche po metrikách a věkových skupinách; skupina VSECHNY_VEKY pokrývá celou populaci.
+AGG_TABLE = "agregaty"
+SKETCH_TABLE = "sketche"
+VEKOVA_SKUPINA_LET = 1
+VSECHNY_VEKY = -1
+# Agregují se jen měřené parametry a poměry IR/ER, ne demografické a identifikační údaje
+DEMOGRAFICKE_SLOUPCE = ["Vek", "Vyska", "Hmotnost"]
+AGREGOVANE_METRIKY = [c for c in NUMERICKE_SLOUPCE if c not in DEMOGRAFICKE_SLOUPCE] + ["IR/ER (210°/s)", "IR/ER (300°/s)"]
+
+# Mezipaměť výsledků dotazů; klíč obsahuje verzi souboru databáze, takže zápis ji zneplatní.
+_hist_cache = Mezipamet(HIST_CACHE_MAX_BYTES, velikost=lambda df: int(df.memory_usage(deep=True).sum()))
+_hist_rozdeleni_cache = Mezipamet(64, velikost=lambda _: 1)
+# Sloupce historie jako pole float seřazená podle věku (pro histogramy dashboardu)
+_hist_sloupce_cache = Mezipamet(HIST_CACHE_MAX_BYTES // 4, velikost=lambda pole: pole[0].nbytes + pole[1].nbytes)
+_hist_verze = 0
+
+def _verze_databaze(db_path):
+    stat = os.stat(db_path)
+    return (os.path.abspath(db_path), stat.st_mtime_ns, stat.st_size, _hist_verze)
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_typ(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_numeric_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+def _doplnit_identifikaci(df):
+    if "Identifikace" not in df.columns and all(c in df.columns for c in ["Jmeno", "Prijmeni", "Narozen"]):
+        df["Identifikace"] = df["Jmeno"].astype(str) + " " + df["Prijmeni"].astype(str) + ", " + df["Narozen"].astype(str)
+    return df
+
+def _sloupce_tabulky(conn):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(HIST_TABLE)})")]
+
+def _zapis_radky(conn, df):
+    existing = _sloupce_tabulky(conn)
+    if existing:
+        for col in df.columns:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {_quote(HIST_TABLE)} ADD COLUMN {_quote(col)} {_sql_typ(df[col])}")
+    df.to_sql(HIST_TABLE, conn, if_exists="append", index=False)
+    for col in INDEXOVANE_SLOUPCE:
+        if col in df.columns or col in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + col)} ON {_quote(HIST_TABLE)} ({_quote(col)})")
+    if existing and not _agregaty_existuji(conn):
+        # Databáze z doby před agregáty: ty se jednou přepočítají z celé historie včetně nových řádků
+        _prepocitej_agregaty(conn)
+    else:
+        _aktualizuj_agregaty(conn, df)
+
+def _agregaty_existuji(conn):
+    nalezeno = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+                            (AGG_TABLE, SKETCH_TABLE)).fetchone()[0]
+    return nalezeno == 2
+
+def _dlouha_data(df):
+    """Převede nové řádky na dlouhý tvar (metrika, vek_skupina, hodnota) včetně skupiny všech věků."""
+    df = pridej_pomery_ir_er(df.copy())
+    metriky = [c for c in AGREGOVANE_METRIKY if c in df.columns and pd.api.types.is_numeric_dtype(df[c])
+               and not pd.api.types.is_bool_dtype(df[c])]
+    if not metriky:
+        return pd.DataFrame(columns=["vek_skupina", "metrika", "hodnota"])
+    vse = df[metriky].astype(float)
+    vse["vek_skupina"] = VSECHNY_VEKY
+    casti = [vse]
+    if "Vek" in df.columns:
+        podle_veku = df[metriky].astype(float)
+        podle_veku["vek_skupina"] = (np.floor(pd.to_numeric(df["Vek"], errors="coerce") / VEKOVA_SKUPINA_LET)
+                                     * VEKOVA_SKUPINA_LET)
+        casti.append(podle_veku.dropna(subset=["vek_skupina"]))
+    dlouhy = pd.concat(casti, ignore_index=True).melt(id_vars="vek_skupina", var_name="metrika", value_name="hodnota")
+    dlouhy = dlouhy.dropna(subset=["hodnota"])
+    dlouhy = dlouhy[np.isfinite(dlouhy["hodnota"])]
+    dlouhy["vek_skupina"] = dlouhy["vek_skupina"].astype(int)
+    return dlouhy
+
+def _agregaty_davky(dlouhy):
+    """Spočítá agregáty nových řádků po metrikách a věkových skupinách."""
+    skupiny = dlouhy.groupby(["metrika", "vek_skupina"])["hodnota"]
+    agg = skupiny.agg(n="count", prumer="mean", minimum="min", maximum="max")
+    agg["m2"] = skupiny.var(ddof=0) * agg["n"]
+    return agg[["n", "prumer", "m2", "minimum", "maximum"]]
+
+def _spoj_agregaty(a, b):
+    """Spojí dvě sady agregátů se stejnými klíči (paralelní varianta Welfordova algoritmu)."""
+    n = a["n"] + b["n"]
+    delta = b["prumer"] - a["prumer"]
+    return pd.DataFrame({
+        "n": n,
+        "prumer": a["prumer"] + delta * b["n"] / n,
+        "m2": a["m2"] + b["m2"] + delta ** 2 * a["n"] * b["n"] / n,
+        "minimum": np.fmin(a["minimum"], b["minimum"]),
+        "maximum": np.fmax(a["maximum"], b["maximum"]),
+    })
+
+def _vytvor_tabulku_agregatu(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(AGG_TABLE)} (metrika TEXT NOT NULL, vek_skupina INTEGER NOT NULL, "
+                 "n INTEGER NOT NULL, prumer REAL, m2 REAL, minimum REAL, maximum REAL, "
+                 "PRIMARY KEY (metrika, vek_skupina))")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(SKETCH_TABLE)} (metrika TEXT NOT NULL, vek_skupina INTEGER NOT NULL, "
+                 "data BLOB NOT NULL, PRIMARY KEY (metrika, vek_skupina))")
+
+def _aktualizuj_agregaty(conn, df):
+    """Přičte nové řádky k uloženým agregátům a sketchům; čte a zapisuje jen dotčené klíče."""
+    _vytvor_tabulku_agregatu(conn)
+    dlouhy = _dlouha_data(df)
+    if dlouhy.empty:
+        return
+    nove = _agregaty_davky(dlouhy)
+    metriky = list(nove.index.unique(level="metrika"))
+    podminka = f"WHERE metrika IN ({', '.join('?' * len(metriky))})"
+    ulozene = pd.read_sql_query(f"SELECT * FROM {_quote(AGG_TABLE)} {podminka}", conn,
+                                params=metriky).set_index(["metrika", "vek_skupina"])
+    spolecne = nove.index.intersection(ulozene.index)
+    if len(spolecne):
+        nove.loc[spolecne] = _spoj_agregaty(ulozene.loc[spolecne], nove.loc[spolecne])
+    conn.executemany(f"INSERT OR REPLACE INTO {_quote(AGG_TABLE)} (metrika, vek_skupina, n, prumer, m2, minimum, maximum) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [(m, int(v), int(r.n), float(r.prumer), float(r.m2), float(r.minimum), float(r.maximum))
+                      for (m, v), r in nove.iterrows()])
+
+    sketche = {(m, v): data for m, v, data in
+               conn.execute(f"SELECT metrika, vek_skupina, data FROM {_quote(SKETCH_TABLE)} {podminka}", metriky)}
+    zapis = []
+    for (metrika, vek_skupina), hodnoty in dlouhy.groupby(["metrika", "vek_skupina"])["hodnota"]:
+        data = sketche.get((metrika, vek_skupina))
+        sketch = KLLSketch.from_bytes(data) if data is not None else KLLSketch()
+        zapis.append((metrika, int(vek_skupina), sqlite3.Binary(sketch.pridej(hodnoty.to_numpy()).to_bytes())))
+    conn.executemany(f"INSERT OR REPLACE INTO {_quote(SKETCH_TABLE)} (metrika, vek_skupina, data) VALUES (?, ?, ?)", zapis)
+
+def _prepocitej_agregaty(conn):
+    logger.info("Přepočítávám agregáty historické databáze")
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(AGG_TABLE)}")
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(SKETCH_TABLE)}")
+    _aktualizuj_agregaty(conn, pd.read_sql_query(f"SELECT * FROM {_quote(HIST_TABLE)}", conn))
+
+def importuj_z_excelu(xlsx_path=HIST_XLSX, db_path=HIST_DB):
+    """Naimportuje historická data z Excelu (původní formát databáze) do úložiště SQLite."""
+    logger.info(f"Importuji historická data z {xlsx_path} do {db_path}")
+    df = _doplnit_identifikaci(pd.read_excel(xlsx_path, engine="openpyxl"))
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        _zapis_radky(conn, df)
+    return len(df)
+
+def exportuj_do_excelu(xlsx_path=HIST_XLSX, db_path=HIST_DB):
+    """Vyexportuje celou historickou databázi do Excelu; přijímá cestu nebo souborový objekt."""
+    nacti_historii(db_path=db_path).to_excel(xlsx_path, index=False, engine="openpyxl")
+    return xlsx_path
+
+def historie_existuje(db_path=HIST_DB):
+    if not os.path.exists(db_path) and db_path == HIST_DB and os.path.exists(HIST_XLSX):
+        importuj_z_excelu(HIST_XLSX, db_path)
+    return os.path.exists(db_path)
+
+@casovat("historie_pridani")
+def pridej_do_historie(new_df, db_path=HIST_DB):
+    """Připíše do historické databáze pouze nové řádky; chybějící sloupce se do tabulky doplní."""
+    if new_df.empty:
+        return 0
+    historie_existuje(db_path)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    global _hist_verze
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        _zapis_radky(conn, _doplnit_identifikaci(new_df.copy()))
+    _hist_verze += 1
+    pocitej(radky=len(new_df))
+    logger.info(f"Do historické databáze přidáno {len(new_df)} řádků")
+    return len(new_df)
+
+@casovat("historie_nacteni")
+def nacti_historii(columns=None, vek_rozsah=None, datum_od=None, datum_do=None, identifikace=None, db_path=HIST_DB):
+    """
+    Načte historická data s projekcí sloupců a filtry.
+
+    vek_rozsah je dvojice (od, do) včetně krajních hodnot, datum_od/datum_do filtrují
+    sloupec DatumMereni a identifikace může být jeden řetězec nebo seznam. Věkový filtr
+    se nedotazuje databáze: z výsledku bez něj (uloženého v mezipaměti a seřazeného podle
+    věku) se interval vybere půlením, takže posun posuvníku nečte historii znovu.
+    """
+    if not historie_existuje(db_path):
+        return pd.DataFrame(columns=columns or [])
+    if isinstance(identifikace, str):
+        identifikace = [identifikace]
+    sloupce = columns
+    if columns is not None and vek_rozsah is not None and "Vek" not in columns:
+        sloupce = list(columns) + ["Vek"]
+    klic = (_verze_databaze(db_path),
+            tuple(sloupce) if sloupce is not None else None,
+            datum_od, datum_do,
+            tuple(identifikace) if identifikace is not None else None)
+    df = _hist_cache.get(klic)
+    pocitej(z_mezipameti=df is not None)
+    if df is None:
+        df = _dotaz_historie(db_path, sloupce, datum_od, datum_do, identifikace)
+        if "Identifikace" in df.columns:
+            index_podle(df)
+            if "DatumMereni" in df.columns:
+                index_podle(df, ("Identifikace", "DatumMereni"))
+        if "Vek" in df.columns:
+            serazeno_podle(df, "Vek")
+        _hist_cache.put(klic, df)
+    if vek_rozsah is not None and "Vek" in df.columns:
+        vysledek = vyber_rozsah(df, float(vek_rozsah[0]), float(vek_rozsah[1])).copy()
+        if columns is not None:
+            vysledek = vysledek[[c for c in columns if c in vysledek.columns]]
+        pocitej(radky=len(vysledek))
+        return vysledek
+    pocitej(radky=len(df))
+    return sdilej_indexy(df, df.copy())
+
+def _dotaz_historie(db_path, columns, datum_od, datum_do, identifikace):
+    with closing(sqlite3.connect(db_path)) as conn:
+        existing = _sloupce_tabulky(conn)
+        if not existing:
+            return pd.DataFrame(columns=columns or [])
+        if columns is not None:
+            select = ", ".join(_quote(c) for c in columns if c in existing) or "*"
+        else:
+            select = "*"
+        podminky, parametry = [], []
+        if datum_od is not None:
+            podminky.append(f"{_quote('DatumMereni')} >= ?")
+            parametry.append(str(datum_od))
+        if datum_do is not None:
+            podminky.append(f"{_quote('DatumMereni')} <= ?")
+            parametry.append(str(datum_do))
+        if identifikace is not None:
+            podminky.append(f"{_quote('Identifikace')} IN ({', '.join('?' * len(identifikace))})")
+            parametry.extend(identifikace)
+        query = f"SELECT {select} FROM {_quote(HIST_TABLE)}"
+        if podminky:
+            query += " WHERE " + " AND ".join(podminky)
+        return pd.read_sql_query(query, conn, params=parametry)
+
+def rozsah_veku_historie(db_path=HIST_DB):
+    if not historie_existuje(db_path):
+        return None
+    with closing(sqlite3.connect(db_path)) as conn:
+        if "Vek" not in _sloupce_tabulky(conn):
+            return None
+        return conn.execute(f"SELECT MIN({_quote('Vek')}), MAX({_quote('Vek')}) FROM {_quote(HIST_TABLE)}").fetchone()
+
+def _vyber_vekovych_skupin(vek_rozsah):
+    """Podmínka WHERE na věkové skupiny; metriky se omezí na AGREGOVANE_METRIKY (i ve starších databázích)."""
+    metriky = f"metrika IN ({', '.join('?' * len(AGREGOVANE_METRIKY))})"
+    if vek_rozsah is None:
+        return f"vek_skupina = ? AND {metriky}", [VSECHNY_VEKY] + AGREGOVANE_METRIKY
+    od = np.floor(float(vek_rozsah[0]) / VEKOVA_SKUPINA_LET) * VEKOVA_SKUPINA_LET
+    return (f"vek_skupina <> ? AND vek_skupina BETWEEN ? AND ? AND {metriky}",
+            [VSECHNY_VEKY, od, float(vek_rozsah[1])] + AGREGOVANE_METRIKY)
+
+def _pripoj_k_agregatum(conn):
+    """Ověří, že agregáty existují (případně je přepočítá); vrací False pro prázdnou databázi."""
+    if _agregaty_existuji(conn):
+        return True
+    if not _sloupce_tabulky(conn):
+        return False
+    _prepocitej_agregaty(conn)
+    return True
+
+@casovat("historie_rozdeleni")
+def nacti_rozdeleni(vek_rozsah=None, db_path=HIST_DB):
+    """
+    Vrátí {metrika: KLLSketch} populace sloučený z uložených sketchů vybraných věkových skupin.
+
+    Sketche slouží k percentilovému pořadí a kvantilům bez čtení celé historie.
+    """
+    if not historie_existuje(db_path):
+        return None
+    klic = ("rozdeleni", _verze_databaze(db_path), tuple(vek_rozsah) if vek_rozsah is not None else None)
+    rozdeleni = _hist_rozdeleni_cache.get(klic)
+    pocitej(z_mezipameti=rozdeleni is not None)
+    if rozdeleni is not None:
+        return rozdeleni
+    podminka, parametry = _vyber_vekovych_skupin(vek_rozsah)
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        if not _pripoj_k_agregatum(conn):
+            return None
+        radky = conn.execute(f"SELECT metrika, data FROM {_quote(SKETCH_TABLE)} WHERE {podminka}", parametry).fetchall()
+    rozdeleni = {}
+    for metrika, data in radky:
+        sketch = KLLSketch.from_bytes(data)
+        if metrika in rozdeleni:
+            rozdeleni[metrika].spoj(sketch)
+        else:
+            rozdeleni[metrika] = sketch
+    pocitej(sketchu=len(radky), metrik=len(rozdeleni))
+    _hist_rozdeleni_cache.put(klic, rozdeleni)
+    return rozdeleni
+
+def _sloupec_podle_veku(sloupec, db_path):
+    """Vrátí (věky seřazené vzestupně, hodnoty sloupce ve stejném pořadí) jako pole float."""
+    klic = (_verze_databaze(db_path), sloupec)
+    pole = _hist_sloupce_cache.get(klic)
+    if pole is None:
+        df = nacti_historii(columns=[sloupec, "Vek"], db_path=db_path)
+        hodnoty = pd.to_numeric(df[sloupec], errors="coerce").to_numpy(dtype=float) if sloupec in df.columns \
+            else np.full(len(df), np.nan)
+        if "Vek" in df.columns:
+            veky, poradi = serazeno_podle(df, "Vek")
+            pole = (veky, hodnoty[poradi])
+        else:
+            pole = (np.full(len(df), np.nan), hodnoty)
+        _hist_sloupce_cache.put(klic, pole)
+    return pole
+
+def histogram_historie(sloupec, vek_rozsah=None, pocet_binu=None, db_path=HIST_DB):
+    """
+    Histogram parametru v historické populaci (DataFrame od, do, pocet, viz histogramy.histogram).
+
+    Hodnoty se berou z pole seřazeného podle věku, takže věkový interval je jen jeho výřez.
+    """
+    if not historie_existuje(db_path):
+        return None
+    def hodnoty():
+        veky, hodnoty_sloupce = _sloupec_podle_veku(sloupec, db_path)
+        if vek_rozsah is None:
+            return hodnoty_sloupce
+        zacatek = np.searchsorted(veky, float(vek_rozsah[0]), side="left")
+        konec = np.searchsorted(veky, float(vek_rozsah[1]), side="right")
+        return hodnoty_sloupce[zacatek:konec]
+    klic = ("historie", _verze_databaze(db_path), tuple(vek_rozsah) if vek_rozsah is not None else None)
+    return histogram_dat(klic, sloupec, hodnoty, pocet_binu)
+
+@casovat("historie_agregaty")
+def nacti_agregaty(vek_rozsah=None, db_path=HIST_DB):
+    """
+    Vrátí statistiky populace z uložených agregátů bez čtení celé historie.
+
+    Výsledek má tvar jako spocitej_statistiky_skupiny (prumer, median, min, max, ci_spodni,
+    ci_horni) a navíc n a smerodatna_odchylka. Medián a interval 2,5–97,5 % se odhadují ze
+    sketchů (nacti_rozdeleni). vek_rozsah vybírá věkové skupiny včetně krajních hodnot.
+    """
+    if not historie_existuje(db_path):
+        return None
+    klic = ("agregaty", _verze_databaze(db_path), tuple(vek_rozsah) if vek_rozsah is not None else None)
+    stats = _hist_cache.get(klic)
+    pocitej(z_mezipameti=stats is not None)
+    if stats is not None:
+        return stats.copy()
+    podminka, parametry = _vyber_vekovych_skupin(vek_rozsah)
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        if not _pripoj_k_agregatum(conn):
+            return None
+        agg = pd.read_sql_query(f"SELECT * FROM {_quote(AGG_TABLE)} WHERE {podminka}", conn, params=parametry)
+    agg = agg[agg["n"] > 0]
+    # Sloučení věkových skupin: n, průměr a M2 se skládají stejně jako při přidávání dat
+    n = agg.groupby("metrika")["n"].sum()
+    prumer = (agg["prumer"] * agg["n"]).groupby(agg["metrika"]).sum() / n
+    odchylky = agg["m2"] + agg["n"] * (agg["prumer"] - agg["metrika"].map(prumer)) ** 2
+    sd = np.sqrt(odchylky.groupby(agg["metrika"]).sum() / n)
+    rozdeleni = nacti_rozdeleni(vek_rozsah, db_path) or {}
+    kvantily = {q: pd.Series({m: rozdeleni[m].kvantil(q) if m in rozdeleni else np.nan for m in n.index}, dtype=float)
+                for q in (0.025, 0.5, 0.975)}
+    stats = pd.DataFrame({
+        "prumer": prumer,
+        "median": kvantily[0.5],
+        "min": agg.groupby("metrika")["minimum"].min(),
+        "max": agg.groupby("metrika")["maximum"].max(),
+        "ci_spodni": kvantily[0.025],
+        "ci_horni": kvantily[0.975],
+        "n": n,
+        "smerodatna_odchylka": sd,
+    })
+    stats.index.name = None
+    pocitej(skupin=len(agg), metrik=len(stats))
+    _hist_cache.put(klic, stats)
+    return stats.copy()
@@ -0,0 +1,94 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Indexy pozic řádků navázané na konkrétní DataFrame (podle id); záznam platí,
+# dokud má DataFrame stejný objekt indexu, jinak se index postaví znovu.
+_indexy = {}
+_lock = threading.Lock()
+
+def _zaznam(df):
+    with _lock:
+        zaznam = _indexy.get(id(df))
+        if zaznam is not None and zaznam["df"]() is df and zaznam["row_index"] is df.index:
+            return zaznam
+        zaznam = {"df": weakref.ref(df, lambda _, klic=id(df): _indexy.pop(klic, None)),
+                  "row_index": df.index, "indexy": {}, "serazeni": {}, "odvozene": {}}
+        _indexy[id(df)] = zaznam
+        return zaznam
+
+def index_podle(df, sloupce=("Identifikace",)):
+    """
+    Vrátí slovník {hodnota klíče: seznam pozic řádků} pro zadané sloupce.
+
+    Pro jeden sloupec je klíčem hodnota, pro více sloupců n-tice hodnot. Index
+    se pro daný DataFrame staví jen jednou.
+    """
+    sloupce = tuple(sloupce)
+    zaznam = _zaznam(df)
+    index = zaznam["indexy"].get(sloupce)
+    if index is None:
+        hodnoty = df[sloupce[0]].tolist() if len(sloupce) == 1 else zip(*(df[c].tolist() for c in sloupce))
+        index = {}
+        for pozice, klic in enumerate(hodnoty):
+            index.setdefault(klic, []).append(pozice)
+        zaznam["indexy"][sloupce] = index
+    return index
+
+def sdilej_indexy(zdroj, cil):
+    """Přenese již postavené indexy z DataFrame na jeho kopii se stejným pořadím řádků."""
+    if len(zdroj) != len(cil):
+        return cil
+    zaznam_zdroje, zaznam_cile = _zaznam(zdroj), _zaznam(cil)
+    for druh in ("indexy", "serazeni", "odvozene"):
+        zaznam_cile[druh].update(zaznam_zdroje[druh])
+    return cil
+
+def radky_probanda(df, identifikace):
+    pozice = index_podle(df).get(identifikace, [])
+    return df.iloc[pozice]
+
+def najdi_radek(df, identifikace, datum_mereni=None):
+    """Vrátí první řádek probanda (případně konkrétního měření); chybí-li, vyvolá IndexError."""
+    if datum_mereni is None:
+        pozice = index_podle(df).get(identifikace)
+    else:
+        pozice = index_podle(df, ("Identifikace", "DatumMereni")).get((identifikace, datum_mereni))
+    if pozice is None or len(pozice) == 0:
+        raise IndexError(f"Proband '{identifikace}' nebyl v datech nalezen.")
+    return df.iloc[pozice[0]]
+
+def serazeno_podle(df, sloupec="Vek"):
+    """
+    Vrátí dvojici (seřazené hodnoty, pozice řádků v tomto pořadí) pro numerický sloupec.
+
+    Chybějící hodnoty jsou na konci. Řazení se pro daný DataFrame provádí jen jednou.
+    """
+    zaznam = _zaznam(df)
+    serazeni = zaznam["serazeni"].get(sloupec)
+    if serazeni is None:
+        hodnoty = pd.to_numeric(df[sloupec], errors="coerce").to_numpy(dtype=float)
+        poradi = np.argsort(hodnoty, kind="stable")
+        serazeni = (hodnoty[poradi], poradi)
+        zaznam["serazeni"][sloupec] = serazeni
+    return serazeni
+
+def pozice_v_rozsahu(df, od, do, sloupec="Vek"):
+    """Pozice řádků s hodnotou sloupce v intervalu od–do (včetně) v původním pořadí; hledá se půlením."""
+    hodnoty, poradi = serazeno_podle(df, sloupec)
+    zacatek = np.searchsorted(hodnoty, od, side="left")
+    konec = np.searchsorted(hodnoty, do, side="right")
+    return np.sort(poradi[zacatek:konec])
+
+def vyber_rozsah(df, od, do, sloupec="Vek"):
+    """Vrátí řádky s hodnotou sloupce v intervalu od–do (včetně) bez procházení celé tabulky."""
+    return df.iloc[pozice_v_rozsahu(df, od, do, sloupec)]
+
+def odvozeny_vysledek(df, klic, vypocet):
+    """Vrátí výsledek vypocet(df) uložený u DataFrame pod klíčem; spočítá se jen jednou."""
+    zaznam = _zaznam(df)
+    if klic not in zaznam["odvozene"]:
+        zaznam["odvozene"][klic] = vypocet(df)
+    return zaznam["odvozene"][klic]
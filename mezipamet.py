@@ -0,0 +1,80 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Hash obsahu podle (cesta, mtime, velikost), aby se nezměněné soubory nečetly znovu.
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+def hash_souboru(file_path, chunk_size=1 << 20):
+    """Vrátí SHA-256 obsahu souboru; při nezměněném mtime a velikosti se použije dříve spočítaný hash."""
+    stat = os.stat(file_path)
+    klic = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    with _hash_lock:
+        if klic in _hash_memo:
+            return _hash_memo[klic]
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _hash_lock:
+        _hash_memo[klic] = digest
+        if len(_hash_memo) > 1024:
+            _hash_memo.pop(next(iter(_hash_memo)))
+    return digest
+
+class Mezipamet:
+    """LRU mezipaměť s limitem na celkovou velikost uložených hodnot v bajtech."""
+
+    def __init__(self, max_bytes, velikost=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self._velikost = velikost
+        self._data = OrderedDict()
+        self._obsazeno = 0
+        self._lock = threading.Lock()
+
+    def get(self, klic, default=None):
+        with self._lock:
+            if klic not in self._data:
+                return default
+            self._data.move_to_end(klic)
+            return self._data[klic][0]
+
+    def put(self, klic, hodnota):
+        velikost = self._velikost(hodnota)
+        with self._lock:
+            if klic in self._data:
+                self._obsazeno -= self._data.pop(klic)[1]
+            if velikost > self.max_bytes:
+                return
+            self._data[klic] = (hodnota, velikost)
+            self._obsazeno += velikost
+            while self._obsazeno > self.max_bytes:
+                _, (_, uvolneno) = self._data.popitem(last=False)
+                self._obsazeno -= uvolneno
+
+    def pop(self, klic, default=None):
+        with self._lock:
+            if klic not in self._data:
+                return default
+            hodnota, velikost = self._data.pop(klic)
+            self._obsazeno -= velikost
+            return hodnota
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._obsazeno = 0
+
+    @property
+    def obsazeno(self):
+        return self._obsazeno
+
+    def __contains__(self, klic):
+        return klic in self._data
+
+    def __len__(self):
+        return len(self._data)
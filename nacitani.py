@@ -0,0 +1,165 @@
+import csv
+import datetime
+import importlib.util
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Deklarované schéma vstupních dat
+POVINNE_SLOUPCE = ["Jmeno", "Prijmeni", "Narozen"]
+ZDROJ_SLOUPEC = "Zdroj"
+KATEGORICKE_SLOUPCE = ["Jmeno", "Prijmeni"]
+NUMERICKE_SLOUPCE = [
+    "Vek", "Vyska", "Hmotnost", "Telesny tuk",
+    "Dominantni paze", "Dominantni paze - beztukova", "Dominantni noha", "Dominantni noha - beztukova",
+    "Trupova hmotnost", "Trup - betukovy", "Beztukova hmota", "Sila uchopu", "Rychlost podani",
+    "Vnitrni rotace koncentricka (210°/s)", "Vnejsi rotace koncentricka (210°/s)",
+    "Vnitrni rotace excentricka (210°/s)", "Vnejsi rotace excentricka (210°/s)",
+    "Vnitrni rotace koncentricka (300°/s)", "Vnejsi rotace koncentricka (300°/s)",
+    "Vnitrni rotace excentricka (300°/s)", "Vnejsi rotace excentricka (300°/s)",
+]
+
+def excel_engine():
+    """Rychlejší engine calamine, je-li nainstalován balíček python-calamine, jinak openpyxl."""
+    return "calamine" if importlib.util.find_spec("python_calamine") is not None else "openpyxl"
+
+def _normalizuj_nazvy(df):
+    df.columns = df.columns.astype(str).str.strip().str.replace("\\s+", " ", regex=True)
+    return df
+
+def _je_trvani(val):
+    return isinstance(val, (datetime.timedelta, datetime.time))
+
+def _na_sekundy(val):
+    if isinstance(val, datetime.time):
+        return val.hour * 3600 + val.minute * 60 + val.second + val.microsecond / 1e6
+    if isinstance(val, datetime.timedelta):
+        return val.total_seconds()
+    return val
+
+def aplikuj_schema(df):
+    """
+    Převede načtená data na deklarované typy.
+
+    Měřené sloupce uložené jako text se převedou na čísla (i s desetinnou čárkou),
+    trvání (Timedelta, čas) na sekundy jako float, stejně jako je zobrazuje format_val,
+    a jména na kategorie. Sloupce, které už mají číselný typ, se nemění.
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_timedelta64_dtype(series):
+            df[col] = series.dt.total_seconds()
+        elif series.dtype == object and len(series.dropna()) and series.dropna().map(_je_trvani).all():
+            df[col] = series.map(_na_sekundy).astype(float)
+        elif col in NUMERICKE_SLOUPCE and (series.dtype == object or pd.api.types.is_string_dtype(series)):
+            df[col] = pd.to_numeric(series.astype(str).str.replace(",", ".", regex=False).str.strip()
+                                    .where(series.notna()), errors="coerce")
+    for col in KATEGORICKE_SLOUPCE:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+def _nacti_csv(file_path):
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        ukazka = f.read(64 * 1024)
+    try:
+        sep = csv.Sniffer().sniff(ukazka, delimiters=",;\t").delimiter
+    except csv.Error:
+        sep = ","
+    return pd.read_csv(file_path, sep=sep, encoding="utf-8-sig")
+
+def _nacti_excel(file_path, sheet_name=None):
+    with pd.ExcelFile(file_path, engine=excel_engine()) as xl:
+        if sheet_name is None:
+            sheet_name = "data" if "data" in xl.sheet_names else xl.sheet_names[0]
+        return xl.parse(sheet_name)
+
+def nacti_tabulku(file_path, sheet_name=None):
+    """Načte surovou tabulku z xlsx (jedním otevřením sešitu), csv nebo parquet."""
+    pripona = os.path.splitext(str(file_path))[1].lower()
+    if pripona == ".csv":
+        return _nacti_csv(file_path)
+    if pripona in (".parquet", ".pq"):
+        return pd.read_parquet(file_path)
+    return _nacti_excel(file_path, sheet_name)
+
+def _pridej_identifikaci(df):
+    for col in POVINNE_SLOUPCE:
+        if col not in df.columns:
+            raise KeyError(f"Chybí sloupec '{col}' v datech.")
+    df["Identifikace"] = df["Jmeno"].astype(str) + " " + df["Prijmeni"].astype(str) + ", " + df["Narozen"].astype(str)
+    return df
+
+def nacti_data(file_path, sheet_name=None):
+    """Načte vstupní soubor, ověří povinné sloupce, sestaví Identifikace a aplikuje schéma."""
+    logger.info(f"Načítám data ze souboru: {file_path}")
+    df = _normalizuj_nazvy(nacti_tabulku(file_path, sheet_name))
+    return aplikuj_schema(_pridej_identifikaci(df))
+
+def seznam_casti(file_paths, vsechny_listy=False):
+    """
+    Vrátí seznam dvojic (soubor, list) k načtení.
+
+    Bez vsechny_listy se ze sešitu bere list "data", případně první list, jako u nacti_data;
+    u csv a parquet je list None.
+    """
+    casti = []
+    for file_path in file_paths:
+        pripona = os.path.splitext(str(file_path))[1].lower()
+        if pripona in (".csv", ".parquet", ".pq"):
+            casti.append((file_path, None))
+            continue
+        with pd.ExcelFile(file_path, engine=excel_engine()) as xl:
+            if vsechny_listy:
+                casti.extend((file_path, sheet) for sheet in xl.sheet_names)
+            else:
+                casti.append((file_path, "data" if "data" in xl.sheet_names else xl.sheet_names[0]))
+    return casti
+
+def _nacti_cast(cast):
+    file_path, sheet_name = cast
+    df = _normalizuj_nazvy(nacti_tabulku(file_path, sheet_name))
+    zdroj = os.path.basename(str(file_path))
+    if sheet_name is not None:
+        zdroj += f" / {sheet_name}"
+    df[ZDROJ_SLOUPEC] = zdroj
+    return df
+
+def _nacti_casti(casti, max_workers=None):
+    if max_workers is None:
+        max_workers = min(len(casti), os.cpu_count() or 1)
+    if len(casti) < 2 or max_workers < 2:
+        return [_nacti_cast(cast) for cast in casti]
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_nacti_cast, casti))
+    except BrokenProcessPool:
+        logger.warning("Paralelní načítání selhalo, načítám soubory postupně.")
+        return [_nacti_cast(cast) for cast in casti]
+
+def nacti_vice_souboru(file_paths, vsechny_listy=False, max_workers=None):
+    """
+    Načte více souborů (případně všechny listy sešitů) paralelně a spojí je do jedné tabulky.
+
+    Schémata se sjednotí podle normalizovaných názvů sloupců (chybějící sloupce zůstanou
+    prázdné) a sloupec Zdroj určuje soubor a list, ze kterého řádek pochází. Listy bez
+    povinných sloupců se při vsechny_listy přeskočí.
+    """
+    casti = seznam_casti(file_paths, vsechny_listy)
+    logger.info(f"Načítám {len(casti)} částí dat z {len(file_paths)} souborů")
+    tabulky = []
+    for (file_path, sheet_name), df in zip(casti, _nacti_casti(casti, max_workers)):
+        chybi = [col for col in POVINNE_SLOUPCE if col not in df.columns]
+        if chybi and vsechny_listy and sheet_name is not None:
+            logger.warning(f"List '{sheet_name}' v {file_path} neobsahuje sloupce {', '.join(chybi)}, přeskakuji.")
+            continue
+        tabulky.append(df)
+    if not tabulky:
+        raise KeyError(f"Žádný list neobsahuje povinné sloupce {', '.join(POVINNE_SLOUPCE)}.")
+    df = pd.concat(tabulky, ignore_index=True, sort=False)
+    return aplikuj_schema(_pridej_identifikaci(df))
@@ -0,0 +1,176 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# Percentilové pořadí probanda v referenční populaci. Pro data v paměti se používají
+# seřazené hodnoty (přesně, searchsorted), pro velkou nebo rozdělenou historii slučitelný
+# KLL sketch s omezenou velikostí.
+
+KLL_K = 200
+KLL_C = 2 / 3
+
+def _vahove_poradi(hodnoty, kumulativni_vahy, celkem, x):
+    """Podíl (v %) hodnot menších než x plus polovina hodnot rovných x."""
+    vlevo = np.searchsorted(hodnoty, x, side="left")
+    vpravo = np.searchsorted(hodnoty, x, side="right")
+    pod = np.where(vlevo > 0, kumulativni_vahy[np.maximum(vlevo - 1, 0)], 0)
+    do = np.where(vpravo > 0, kumulativni_vahy[np.maximum(vpravo - 1, 0)], 0)
+    return 100.0 * (pod + do) / (2 * celkem)
+
+class SerazenyVzorek:
+    """Přesné rozdělení jednoho parametru nad seřazeným polem hodnot."""
+
+    def __init__(self, hodnoty):
+        hodnoty = np.asarray(hodnoty, dtype=float)
+        self.hodnoty = np.sort(hodnoty[np.isfinite(hodnoty)])
+
+    @property
+    def n(self):
+        return len(self.hodnoty)
+
+    def poradi(self, x):
+        if not self.n:
+            return np.nan
+        kumulativni = np.arange(1, self.n + 1, dtype=float)
+        return float(_vahove_poradi(self.hodnoty, kumulativni, self.n, float(x)))
+
+    def kvantil(self, q):
+        return float(np.percentile(self.hodnoty, 100 * q)) if self.n else np.nan
+
+    def otisk(self):
+        return hashlib.sha256(self.hodnoty.tobytes()).hexdigest()
+
+class KLLSketch:
+    """
+    Slučitelný kvantilový sketch (KLL) s pevnou paměťovou náročností.
+
+    Úroveň h drží hodnoty s vahou 2**h; plná úroveň se seřadí a každá druhá hodnota
+    postoupí o úroveň výš. Posun při kompakci se střídá deterministicky, takže stejná
+    data dávají stejný sketch.
+    """
+
+    def __init__(self, k=KLL_K):
+        self.k = k
+        self.n = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.urovne = [np.empty(0)]
+        self._kompakci = 0
+        self._serazeno = None
+
+    def _kapacita(self, h):
+        return max(int(np.ceil(self.k * KLL_C ** (len(self.urovne) - 1 - h))), 2)
+
+    def pridej(self, hodnoty):
+        hodnoty = np.asarray(hodnoty, dtype=float).ravel()
+        hodnoty = hodnoty[np.isfinite(hodnoty)]
+        if not len(hodnoty):
+            return self
+        self.n += len(hodnoty)
+        self.minimum = min(self.minimum, float(hodnoty.min()))
+        self.maximum = max(self.maximum, float(hodnoty.max()))
+        self.urovne[0] = np.concatenate([self.urovne[0], hodnoty])
+        self._zhustit()
+        return self
+
+    def spoj(self, jiny):
+        """Přičte jiný sketch (např. jiné věkové skupiny) k tomuto."""
+        if not jiny.n:
+            return self
+        while len(self.urovne) < len(jiny.urovne):
+            self.urovne.append(np.empty(0))
+        for h, uroven in enumerate(jiny.urovne):
+            self.urovne[h] = np.concatenate([self.urovne[h], uroven])
+        self.n += jiny.n
+        self.minimum = min(self.minimum, jiny.minimum)
+        self.maximum = max(self.maximum, jiny.maximum)
+        self._zhustit()
+        return self
+
+    def _zhustit(self):
+        self._serazeno = None
+        h = 0
+        while h < len(self.urovne):
+            uroven = self.urovne[h]
+            if len(uroven) >= self._kapacita(h):
+                if h + 1 == len(self.urovne):
+                    self.urovne.append(np.empty(0))
+                uroven = np.sort(uroven)
+                # Lichý prvek navíc zůstává na své úrovni
+                zbytek, uroven = (uroven[-1:], uroven[:-1]) if len(uroven) % 2 else (uroven[:0], uroven)
+                posun = self._kompakci % 2
+                self._kompakci += 1
+                self.urovne[h + 1] = np.concatenate([self.urovne[h + 1], uroven[posun::2]])
+                self.urovne[h] = zbytek
+            h += 1
+
+    def _vazene(self):
+        if self._serazeno is None:
+            hodnoty = np.concatenate(self.urovne)
+            vahy = np.concatenate([np.full(len(u), 2.0 ** h) for h, u in enumerate(self.urovne)])
+            poradi = np.argsort(hodnoty, kind="stable")
+            self._serazeno = (hodnoty[poradi], np.cumsum(vahy[poradi]))
+        return self._serazeno
+
+    def poradi(self, x):
+        if not self.n:
+            return np.nan
+        hodnoty, kumulativni = self._vazene()
+        return float(_vahove_poradi(hodnoty, kumulativni, kumulativni[-1], float(x)))
+
+    def kvantil(self, q):
+        if not self.n:
+            return np.nan
+        if q <= 0:
+            return self.minimum
+        if q >= 1:
+            return self.maximum
+        hodnoty, kumulativni = self._vazene()
+        return float(hodnoty[min(np.searchsorted(kumulativni, q * kumulativni[-1]), len(hodnoty) - 1)])
+
+    def to_bytes(self):
+        hlavicka = {"k": self.k, "n": self.n, "minimum": self.minimum, "maximum": self.maximum,
+                    "kompakci": self._kompakci, "delky": [len(u) for u in self.urovne]}
+        return json.dumps(hlavicka).encode("utf-8") + b"\n" + np.concatenate(self.urovne).astype("<f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        hlavicka, _, telo = bytes(data).partition(b"\n")
+        hlavicka = json.loads(hlavicka)
+        sketch = cls(hlavicka["k"])
+        sketch.n = hlavicka["n"]
+        sketch.minimum = hlavicka["minimum"]
+        sketch.maximum = hlavicka["maximum"]
+        sketch._kompakci = hlavicka["kompakci"]
+        hodnoty = np.frombuffer(telo, dtype="<f8")
+        hranice = np.cumsum([0] + hlavicka["delky"])
+        sketch.urovne = [hodnoty[a:b].copy() for a, b in zip(hranice[:-1], hranice[1:])]
+        return sketch
+
+    def otisk(self):
+        return hashlib.sha256(self.to_bytes()).hexdigest()
+
+def rozdeleni_z_dat(df, sloupce=None):
+    """Vrátí {sloupec: SerazenyVzorek} pro numerické sloupce DataFrame; každý sloupec se seřadí jednou."""
+    if sloupce is None:
+        sloupce = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    return {col: SerazenyVzorek(df[col].to_numpy(dtype=float)) for col in sloupce if col in df.columns}
+
+def percentilova_poradi(hodnoty, rozdeleni):
+    """Vrátí {parametr: percentilové pořadí 0–100} pro všechny parametry, které mají rozdělení."""
+    vysledek = {}
+    for col, x in hodnoty.items():
+        if col in rozdeleni:
+            try:
+                x = float(x)
+            except (TypeError, ValueError):
+                continue
+            if np.isfinite(x) and rozdeleni[col].n:
+                vysledek[col] = rozdeleni[col].poradi(x)
+    return vysledek
+
+def otisk_rozdeleni(rozdeleni):
+    """Otisk obsahu rozdělení pro klíče mezipaměti."""
+    return tuple(sorted((col, r.otisk()) for col, r in rozdeleni.items()))
@@ -0,0 +1,191 @@
+import functools
+import logging
+import os
+from datetime import date
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Flowable, PageBreak, SimpleDocTemplate
+
+import analyza
+from casovani import casovat, pocitej
+from grafy_pdf import FONT, FONT_BOLD
+from indexy import index_podle
+
+# Sestava týmu: reporty všech vybraných probandů v jednom PDF s obsahem. Obsah reportů
+# se ReportLabu předává proudově po jednotlivých probandech, takže v paměti jsou vždy jen
+# flowables (a grafy) právě sázeného probanda. Čísla stran v obsahu se doplní až před
+# uložením PDF přes formuláře (XObject), na které stránky obsahu odkazují předem.
+
+logger = logging.getLogger(__name__)
+
+SESTAVA_PDF = "sestava_tymu.pdf"
+POLOZEK_OBSAHU_NA_STRANU = 35
+RADEK_OBSAHU = 18
+ZAHLAVI_OBSAHU = 48
+
+class _DokumentSestavy(SimpleDocTemplate):
+    """
+    SimpleDocTemplate, který sází flowables z generátoru bloků: další blok se do seznamu
+    doplní až ve chvíli, kdy ReportLab dosázel předchozí.
+    """
+
+    def __init__(self, filename, bloky, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._bloky = iter(bloky)
+        self._flowables = []
+
+    def _dopln(self, flowables):
+        while not flowables:
+            blok = next(self._bloky, None)
+            if blok is None:
+                return
+            flowables.extend(blok)
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        # Doplňuje se jen hlavní seznam, ne interní fronty ReportLabu
+        if flowables is self._flowables:
+            self._dopln(flowables)
+
+    def sazej(self, **kwargs):
+        self._dopln(self._flowables)
+        self.build(self._flowables, **kwargs)
+
+class _PlatnoSestavy(Canvas):
+    """Plátno, které před uložením zavolá pred_ulozenim(canv), až jsou známa čísla všech stran."""
+
+    def __init__(self, *args, pred_ulozenim=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pred_ulozenim = pred_ulozenim
+
+    def save(self):
+        if self._pred_ulozenim is not None:
+            self._pred_ulozenim(self)
+        super().save()
+
+class _StranaObsahu(Flowable):
+    """Jedna strana obsahu: nadpis a odkazy se kreslí hned, texty a čísla stran z formuláře."""
+
+    def __init__(self, cislo, polozky):
+        super().__init__()
+        self.cislo = cislo
+        self.polozky = polozky
+
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = availWidth, availHeight
+        return availWidth, availHeight
+
+    def y_polozky(self, j):
+        return self.height - ZAHLAVI_OBSAHU - j * RADEK_OBSAHU
+
+    def draw(self):
+        canv = self.canv
+        canv.setFont(FONT_BOLD, 16)
+        canv.drawString(0, self.height - 20, "Obsah" if self.cislo == 0 else "Obsah (pokračování)")
+        for j, (klic, _) in enumerate(self.polozky):
+            y = self.y_polozky(j)
+            canv.linkRect("", klic, (0, y - 4, self.width, y + RADEK_OBSAHU - 4), relative=1, thickness=0)
+        canv.doForm(f"obsah_{self.cislo}")
+
+class _ZacatekSekce(Flowable):
+    """Neviditelná značka začátku reportu probanda: záložka, položka osnovy a číslo strany."""
+
+    def __init__(self, klic, nazev, strany):
+        super().__init__()
+        self.klic = klic
+        self.nazev = nazev
+        self.strany = strany
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.klic)
+        self.canv.addOutlineEntry(self.nazev, self.klic, level=0)
+        self.strany[self.klic] = self.canv.getPageNumber()
+
+def _dopln_obsah(canv, strany_obsahu, strany):
+    """Definuje formuláře obsahu s názvy probandů a čísly stran (volá se po sazbě všech reportů)."""
+    for strana in strany_obsahu:
+        canv.beginForm(f"obsah_{strana.cislo}")
+        canv.setFont(FONT, 12)
+        for j, (klic, nazev) in enumerate(strana.polozky):
+            y = strana.y_polozky(j)
+            cislo = str(strany.get(klic, ""))
+            canv.drawString(0, y, nazev)
+            canv.drawRightString(strana.width, y, cislo)
+            zacatek = stringWidth(nazev, FONT, 12) + 6
+            konec = strana.width - stringWidth(cislo, FONT, 12) - 6
+            tecky = int((konec - zacatek) / stringWidth(".", FONT, 12))
+            if tecky > 0:
+                canv.drawRightString(konec, y, "." * tecky)
+        canv.endForm()
+
+def _cislo_strany(canv, doc):
+    canv.saveState()
+    canv.setFont(FONT, 9)
+    canv.drawCentredString(doc.pagesize[0] / 2, 20, str(doc.page))
+    canv.restoreState()
+
+@casovat("sestava_tymu")
+def generuj_sestavu_tymu(proband_ids, file_path, pdf_path=None, data_df=None, on_progress=None,
+                         vektorove_grafy=None, **report_kwargs):
+    """
+    Vygeneruje jedno PDF s reporty všech zadaných probandů (proband vs aktuální skupina) a obsahem.
+
+    Statistiky skupiny se spočítají jednou; reporty se sázejí postupně a flowables i grafy
+    každého probanda se uvolní, jakmile jsou vykresleny. Probandi, kteří v datech nejsou,
+    se vynechají. on_progress(hotovo, celkem, proband_id) se volá po vysázení každého
+    probanda. pdf_path může být cesta nebo souborový objekt; vrací pdf_path.
+    """
+    df = data_df.copy() if data_df is not None else analyza.load_data(file_path)
+    analyza.pridej_pomery_ir_er(analyza.normalizuj_sloupce(df))
+    # Chybějící hodnoty se nedoplňují: statistiky ani rozdělení je nemají započítat jako nuly
+    group_stats = analyza.spocitej_statistiky_skupiny(df)
+    rozdeleni = analyza.rozdeleni_z_dat(df)
+    znami = index_podle(df)
+    proband_ids = list(dict.fromkeys(proband_ids))
+    vynechani = [pid for pid in proband_ids if pid not in znami]
+    if vynechani:
+        logger.warning(f"Probandi nenalezení v datech se do sestavy nezařadí: {', '.join(map(str, vynechani))}")
+    proband_ids = [pid for pid in proband_ids if pid in znami]
+    report_kwargs.setdefault("group_label", "Aktuální skupina")
+    if pdf_path is None:
+        pdf_path = os.path.join(analyza.OUTPUT_FOLDER, SESTAVA_PDF)
+    logger.info(f"Generuji sestavu týmu pro {len(proband_ids)} probandů")
+
+    polozky = [(f"proband_{i}", str(pid)) for i, pid in enumerate(proband_ids)]
+    strany_obsahu = [_StranaObsahu(c, polozky[od:od + POLOZEK_OBSAHU_NA_STRANU])
+                     for c, od in enumerate(range(0, max(len(polozky), 1), POLOZEK_OBSAHU_NA_STRANU))]
+    strany = {}
+
+    def bloky():
+        uvod = []
+        for strana in strany_obsahu:
+            if uvod:
+                uvod.append(PageBreak())
+            uvod.append(strana)
+        yield uvod
+        for hotovo, ((klic, nazev), pid) in enumerate(zip(polozky, proband_ids), start=1):
+            model = analyza.sestav_model_reportu(pid, file_path, data_df=df, group_stats=group_stats,
+                                                 rozdeleni=rozdeleni, **report_kwargs)
+            yield [PageBreak(), _ZacatekSekce(klic, nazev, strany)] + analyza.prvky_pdf(model, vektorove_grafy)
+            if on_progress is not None:
+                on_progress(hotovo, len(proband_ids), pid)
+
+    analyza.registruj_fonty()
+    def pred_ulozenim(canv):
+        _dopln_obsah(canv, strany_obsahu, strany)
+        canv.showOutline()
+
+    doc = _DokumentSestavy(pdf_path, bloky(), pagesize=A4, title="Sestava reportů týmu",
+                           subject=f"Vygenerováno {date.today():%d.%m.%Y}")
+    doc.sazej(onFirstPage=_cislo_strany, onLaterPages=_cislo_strany,
+              canvasmaker=functools.partial(_PlatnoSestavy, pred_ulozenim=pred_ulozenim))
+    pocitej(probandu=len(proband_ids), stran=doc.page, stran_obsahu=len(strany_obsahu))
+    if hasattr(pdf_path, "seek"):
+        pdf_path.seek(0)
+    logger.info(f"Sestava týmu vygenerována: {len(proband_ids)} probandů, {doc.page} stran")
+    return pdf_path
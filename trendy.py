@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# Podélná analýza: trend každého parametru ze všech měření probanda. Měření všech
+# probandů se zpracují najednou – řádky se seřadí podle probanda a data a součty pro
+# lineární regresi se spočítají po souvislých blocích (np.add.reduceat).
+
+DNI_V_MESICI = 365.25 / 12
+
+def _bloky(klice):
+    """Začátky souvislých bloků stejných klíčů v seřazeném poli."""
+    if not len(klice):
+        return np.empty(0, dtype=int)
+    return np.flatnonzero(np.r_[True, klice[1:] != klice[:-1]])
+
+def _pozice_extremu(hodnoty, platne, starty, delky, maximum):
+    """Pozice řádku s maximem (nebo minimem) v každém bloku a sloupci; -1 tam, kde chybí hodnoty."""
+    vypln = -np.inf if maximum else np.inf
+    upravene = np.where(platne, hodnoty, vypln)
+    extremy = (np.maximum if maximum else np.minimum).reduceat(upravene, starty, axis=0)
+    shoda = platne & (upravene == np.repeat(extremy, delky, axis=0))
+    radky = np.arange(len(hodnoty))[:, None]
+    pozice = np.minimum.reduceat(np.where(shoda, radky, len(hodnoty)), starty, axis=0)
+    return np.where(pozice < len(hodnoty), pozice, -1)
+
+def spocitej_trendy(df, sloupce, smer=None, datum_sloupec="DatumMereni", id_sloupec="Identifikace"):
+    """
+    Spočítá trend parametrů pro všechny probandy v df najednou.
+
+    Vrací DataFrame s indexem (Identifikace, parametr) a sloupci n, sklon_za_den,
+    zmena_za_mesic, relativni_zmena_pct (měsíční změna vůči průměru), prvni, posledni,
+    celkova_zmena, nejlepsi, datum_nejlepsi, nejhorsi a datum_nejhorsi. smer je slovník
+    {parametr: "higher"/"lower"/"optimal"} určující, které měření je nejlepší; výchozí je
+    "higher". U "optimal" nejlepší ani nejhorší měření neurčuje (NaN a NaT).
+    """
+    smer = smer or {}
+    sloupce = [c for c in sloupce if c in df.columns]
+    casy = pd.to_datetime(df[datum_sloupec], errors="coerce")
+    platne_radky = casy.notna().to_numpy()
+    data = df.loc[platne_radky, [id_sloupec] + sloupce].assign(_cas=casy[platne_radky])
+    data = data.sort_values([id_sloupec, "_cas"], kind="stable")
+
+    klice = data[id_sloupec].astype(str).to_numpy()
+    starty = _bloky(klice)
+    if not len(starty) or not sloupce:
+        return pd.DataFrame(columns=["n", "sklon_za_den", "zmena_za_mesic", "relativni_zmena_pct", "prvni", "posledni",
+                                     "celkova_zmena", "nejlepsi", "datum_nejlepsi", "nejhorsi", "datum_nejhorsi"])
+    delky = np.diff(np.r_[starty, len(klice)])
+    cas = data["_cas"].to_numpy()
+    dny = (cas - np.repeat(cas[starty], delky)) / np.timedelta64(1, "D")
+
+    hodnoty = data[sloupce].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    platne = np.isfinite(hodnoty)
+    x = np.where(platne, dny[:, None], 0.0)
+    y = np.where(platne, hodnoty, 0.0)
+    n = np.add.reduceat(platne, starty, axis=0).astype(float)
+    sx = np.add.reduceat(x, starty, axis=0)
+    sy = np.add.reduceat(y, starty, axis=0)
+    sxx = np.add.reduceat(x * x, starty, axis=0)
+    sxy = np.add.reduceat(x * y, starty, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jmenovatel = n * sxx - sx ** 2
+        sklon = np.where(np.abs(jmenovatel) > 1e-12, (n * sxy - sx * sy) / jmenovatel, np.nan)
+        prumer = sy / n
+        zmena_za_mesic = sklon * DNI_V_MESICI
+        relativni = np.where(prumer != 0, zmena_za_mesic / np.abs(prumer) * 100, np.nan)
+
+    radky = np.arange(len(hodnoty))[:, None]
+    prvni_pozice = np.minimum.reduceat(np.where(platne, radky, len(hodnoty)), starty, axis=0)
+    posledni_pozice = np.maximum.reduceat(np.where(platne, radky, -1), starty, axis=0)
+    pozice_max = _pozice_extremu(hodnoty, platne, starty, delky, maximum=True)
+    pozice_min = _pozice_extremu(hodnoty, platne, starty, delky, maximum=False)
+    nizsi_je_lepsi = np.array([smer.get(c, "higher") == "lower" for c in sloupce])
+    optimum = np.array([smer.get(c, "higher") == "optimal" for c in sloupce])
+    pozice_nejlepsi = np.where(optimum, -1, np.where(nizsi_je_lepsi, pozice_min, pozice_max))
+    pozice_nejhorsi = np.where(optimum, -1, np.where(nizsi_je_lepsi, pozice_max, pozice_min))
+
+    sloupcove = np.broadcast_to(np.arange(len(sloupce)), n.shape)
+    def vyber(pozice):
+        return np.where(pozice >= 0, hodnoty[np.clip(pozice, 0, len(hodnoty) - 1), sloupcove], np.nan)
+    def datum(pozice):
+        return np.where(pozice >= 0, cas[np.clip(pozice, 0, len(cas) - 1)], np.datetime64("NaT"))
+
+    prvni, posledni = vyber(prvni_pozice), vyber(posledni_pozice)
+    index = pd.MultiIndex.from_product([klice[starty], sloupce], names=[id_sloupec, "parametr"])
+    vysledek = pd.DataFrame({
+        "n": n.ravel().astype(int),
+        "sklon_za_den": sklon.ravel(),
+        "zmena_za_mesic": zmena_za_mesic.ravel(),
+        "relativni_zmena_pct": relativni.ravel(),
+        "prvni": prvni.ravel(),
+        "posledni": posledni.ravel(),
+        "celkova_zmena": (posledni - prvni).ravel(),
+        "nejlepsi": vyber(pozice_nejlepsi).ravel(),
+        "datum_nejlepsi": datum(pozice_nejlepsi).ravel(),
+        "nejhorsi": vyber(pozice_nejhorsi).ravel(),
+        "datum_nejhorsi": datum(pozice_nejhorsi).ravel(),
+    }, index=index)
+    return vysledek[vysledek["n"] > 0]
+
+def casova_rada(df, sloupec, datum_sloupec="DatumMereni"):
+    """Vrátí dvojici (časy, hodnoty) jednoho parametru seřazenou podle data; bez chybějících hodnot."""
+    casy = pd.to_datetime(df[datum_sloupec], errors="coerce")
+    hodnoty = pd.to_numeric(df[sloupec], errors="coerce")
+    platne = (casy.notna() & hodnoty.notna()).to_numpy()
+    casy, hodnoty = casy[platne].to_numpy(), hodnoty[platne].to_numpy(dtype=float)
+    poradi = np.argsort(casy, kind="stable")
+    return casy[poradi], hodnoty[poradi]
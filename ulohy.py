@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mezipamet import Mezipamet
+
+# Fronta úloh na pozadí pro generování reportů mimo vlákno skriptu Streamlitu. Úlohy všech
+# relací sdílejí jeden omezený pool vláken; stav a průběh úloh se drží v paměti procesu
+# a hotové výsledky (bajty nebo cesta k souboru) v omezené mezipaměti, odkud si je
+# uživatel vyzvedne později. Zrušení běžící úlohy je kooperativní: úloha ho zjistí při
+# nejbližším hlášení průběhu (mezi etapami) a skončí výjimkou UlohaZrusena.
+
+logger = logging.getLogger(__name__)
+
+MAX_SOUBEZNYCH_ULOH = 2
+VYSLEDKY_MAX_BYTES = 256 * 1024 * 1024
+# Dokončené úlohy starší než tento limit se odstraní při nejbližší práci s frontou
+ULOHY_MAX_STARI_S = 2 * 3600
+
+CEKA, BEZI, HOTOVO, CHYBA = "čeká", "běží", "hotovo", "chyba"
+
+_pool = None
+_pool_lock = threading.Lock()
+_ulohy = {}
+_futures = {}
+_zruseni = {}
+_ulohy_lock = threading.Lock()
+_aktualni = threading.local()
+
+class UlohaZrusena(Exception):
+    """Běžící úloha byla zrušena; vyvolá ji zkontroluj_zruseni (a nastav_prubeh) uvnitř úlohy."""
+
+def _velikost_vysledku(vysledek):
+    # Výsledek v souboru se do limitu počítá velikostí souboru, ne délkou cesty
+    if isinstance(vysledek, str):
+        try:
+            return os.path.getsize(vysledek)
+        except OSError:
+            return 0
+    return len(vysledek)
+
+_vysledky = Mezipamet(VYSLEDKY_MAX_BYTES, velikost=_velikost_vysledku)
+
+def _ziskej_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_SOUBEZNYCH_ULOH, thread_name_prefix="uloha")
+        return _pool
+
+def _aktualizuj(uloha_id, **zmeny):
+    with _ulohy_lock:
+        if uloha_id in _ulohy:
+            _ulohy[uloha_id].update(zmeny)
+
+def _smaz_soubor(vysledek):
+    if isinstance(vysledek, str):
+        try:
+            os.remove(vysledek)
+        except FileNotFoundError:
+            pass
+
+def _spust(uloha_id, docasny_soubor, zruseni, funkce, args, kwargs):
+    _aktualizuj(uloha_id, stav=BEZI, zahajeno=time.time())
+    _aktualni.uloha_id = uloha_id
+    _aktualni.zruseni = zruseni
+    try:
+        zkontroluj_zruseni()
+        vysledek = funkce(*args, **kwargs)
+        # BytesIO (do_pameti=True) se uloží jako bajty, řetězec je cesta k vytvořenému souboru
+        if hasattr(vysledek, "getvalue"):
+            vysledek = vysledek.getvalue()
+        with _ulohy_lock:
+            odebrana = uloha_id not in _ulohy
+        if odebrana:
+            # Úloha byla odebrána za běhu, výsledek už nikdo nevyzvedne
+            if docasny_soubor:
+                _smaz_soubor(vysledek)
+            return
+        if docasny_soubor and isinstance(vysledek, str):
+            # Soubor se smaže s úlohou, i když jeho cestu mezitím vyřadí mezipaměť
+            _aktualizuj(uloha_id, soubor=vysledek)
+        _vysledky.put(uloha_id, vysledek)
+        _aktualizuj(uloha_id, stav=HOTOVO, podil=1.0, dokonceno=time.time())
+    except UlohaZrusena:
+        logger.info(f"Úloha {uloha_id} zrušena")
+    except Exception as e:
+        logger.error(f"Úloha {uloha_id} selhala: {e}")
+        _aktualizuj(uloha_id, stav=CHYBA, chyba=f"{type(e).__name__}: {e}", dokonceno=time.time())
+    finally:
+        _aktualni.uloha_id = None
+        _aktualni.zruseni = None
+        with _ulohy_lock:
+            _zruseni.pop(uloha_id, None)
+
+def _odstran(uloha_id):
+    """Odstraní záznam úlohy i výsledek, běžící úlohu zruší; dočasný soubor výsledku se smaže."""
+    with _ulohy_lock:
+        zaznam = _ulohy.pop(uloha_id, None)
+        future = _futures.pop(uloha_id, None)
+        zruseni = _zruseni.pop(uloha_id, None)
+    if zruseni is not None:
+        zruseni.set()
+    if future is not None:
+        future.cancel()
+    vysledek = _vysledky.pop(uloha_id)
+    if zaznam is not None and zaznam["docasny_soubor"]:
+        _smaz_soubor(zaznam["soubor"] or vysledek)
+
+def _uklid():
+    hranice = time.time() - ULOHY_MAX_STARI_S
+    with _ulohy_lock:
+        stare = [u["id"] for u in _ulohy.values() if u["dokonceno"] is not None and u["dokonceno"] < hranice]
+    for uloha_id in stare:
+        _odstran(uloha_id)
+
+def zadej_ulohu(funkce, *args, nazev, vlastnik, nazev_souboru=None, mime="application/octet-stream",
+                docasny_soubor=False, **kwargs):
+    """
+    Zařadí volání funkce(*args, **kwargs) do fronty a vrátí ID úlohy.
+
+    Funkce má vracet BytesIO nebo bajty, případně cestu k souboru (řetězec); s docasny_soubor
+    se soubor smaže spolu s úlohou. vlastnik odlišuje úlohy jednotlivých relací.
+    """
+    _uklid()
+    uloha_id = uuid.uuid4().hex[:12]
+    with _ulohy_lock:
+        _ulohy[uloha_id] = {"id": uloha_id, "nazev": nazev, "vlastnik": vlastnik, "stav": CEKA, "podil": 0.0,
+                            "zprava": None, "chyba": None, "nazev_souboru": nazev_souboru, "mime": mime,
+                            "docasny_soubor": docasny_soubor, "soubor": None, "zadano": time.time(),
+                            "zahajeno": None, "dokonceno": None}
+        _zruseni[uloha_id] = threading.Event()
+        _futures[uloha_id] = _ziskej_pool().submit(_spust, uloha_id, docasny_soubor, _zruseni[uloha_id],
+                                                   funkce, args, kwargs)
+    logger.info(f"Úloha {uloha_id} zařazena do fronty: {nazev}")
+    return uloha_id
+
+def zkontroluj_zruseni():
+    """Vyvolá UlohaZrusena, pokud byla právě běžící úloha zrušena; mimo úlohu nedělá nic."""
+    zruseni = getattr(_aktualni, "zruseni", None)
+    if zruseni is not None and zruseni.is_set():
+        raise UlohaZrusena(getattr(_aktualni, "uloha_id", None))
+
+def nastav_prubeh(podil, zprava=None):
+    """
+    Nastaví průběh (0–1) a zprávu právě běžící úlohy; mimo úlohu nedělá nic.
+
+    Hlášení průběhu je zároveň místem, kde se zjistí zrušení úlohy (UlohaZrusena).
+    """
+    zkontroluj_zruseni()
+    uloha_id = getattr(_aktualni, "uloha_id", None)
+    if uloha_id is not None:
+        _aktualizuj(uloha_id, podil=float(podil), zprava=zprava)
+
+def ulohy_vlastnika(vlastnik):
+    """Vrátí kopie záznamů úloh daného vlastníka, nejnovější první."""
+    _uklid()
+    with _ulohy_lock:
+        ulohy = [dict(u) for u in _ulohy.values() if u["vlastnik"] == vlastnik]
+    return sorted(ulohy, key=lambda u: u["zadano"], reverse=True)
+
+def vysledek_ulohy(uloha_id):
+    """Vrátí výsledek hotové úlohy (bajty nebo cestu k souboru), nebo None, pokud už není k dispozici."""
+    _uklid()
+    vysledek = _vysledky.get(uloha_id)
+    if isinstance(vysledek, str) and not os.path.exists(vysledek):
+        return None
+    return vysledek or None
+
+def odeber_ulohu(uloha_id):
+    """Zruší čekající nebo běžící úlohu, případně odebere dokončenou úlohu s jejím výsledkem."""
+    _odstran(uloha_id)
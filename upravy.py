@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+
+from casovani import casovat, pocitej
+from indexy import index_podle
+
+logger = logging.getLogger(__name__)
+
+# Úpravy dat z editoru se neukládají přepsáním celého sešitu, ale jako záznamy o změně
+# jednotlivých buněk v deníku (SQLite, jen připisování). Buňka je určena zdrojem dat
+# (hashem obsahu nahraných souborů), klíčem řádku (Identifikace a pořadí výskytu téže
+# identifikace) a sloupcem; při načtení dat se na ně aplikuje poslední hodnota každé buňky.
+# Nahrané soubory se nikdy nepřepisují, takže klíč zdroje zůstává stálý; upravená data lze
+# vyexportovat do samostatného sešitu. Zhutnění na pozadí odstraní přepsané záznamy.
+
+ZMENY_DB = os.path.join("upload", "zmeny_dat.sqlite")
+ZMENY_TABLE = "zmeny"
+
+_zhutnovani = None
+_zhutnovani_lock = threading.Lock()
+_db_lock = threading.Lock()
+
+def _pripoj(db_path):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {ZMENY_TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                 "zdroj TEXT NOT NULL, identifikace TEXT NOT NULL, poradi INTEGER NOT NULL, "
+                 "sloupec TEXT NOT NULL, hodnota TEXT, cas TEXT DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_zmeny_bunka ON {ZMENY_TABLE} (zdroj, identifikace, poradi, sloupec)")
+    return conn
+
+def verze_zmen(zdroj, db_path=ZMENY_DB):
+    """Vrátí ID poslední změny zdroje (0, pokud žádná není); mění se s každým zápisem."""
+    if not os.path.exists(db_path):
+        return 0
+    with closing(_pripoj(db_path)) as conn:
+        return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {ZMENY_TABLE} WHERE zdroj = ?", (zdroj,)).fetchone()[0]
+
+def nacti_zmeny(zdroj, db_path=ZMENY_DB):
+    """Vrátí poslední hodnotu každé změněné buňky zdroje jako seznam (identifikace, poradi, sloupec, hodnota)."""
+    if not os.path.exists(db_path):
+        return []
+    with closing(_pripoj(db_path)) as conn:
+        radky = conn.execute(
+            f"SELECT identifikace, poradi, sloupec, hodnota FROM {ZMENY_TABLE} WHERE id IN "
+            f"(SELECT MAX(id) FROM {ZMENY_TABLE} WHERE zdroj = ? GROUP BY identifikace, poradi, sloupec) ORDER BY id",
+            (zdroj,)).fetchall()
+    return [(identifikace, poradi, sloupec, json.loads(hodnota)) for identifikace, poradi, sloupec, hodnota in radky]
+
+def hodnota_pro_sloupec(series, hodnota):
+    """Převede hodnotu z editoru na typ sloupce (číselné sloupce čísla, textové text)."""
+    if hodnota is None or (isinstance(hodnota, str) and not hodnota.strip()):
+        return None
+    if pd.api.types.is_bool_dtype(series):
+        return str(hodnota).strip().lower() in ("1", "true", "ano") if isinstance(hodnota, str) else bool(hodnota)
+    if pd.api.types.is_numeric_dtype(series):
+        cislo = pd.to_numeric(str(hodnota).strip().replace(",", "."), errors="coerce")
+        if pd.isna(cislo):
+            return None
+        return int(cislo) if pd.api.types.is_integer_dtype(series) and float(cislo).is_integer() else float(cislo)
+    if pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return str(hodnota)
+    return hodnota
+
+def _nastav_bunku(df, pozice, sloupec, hodnota):
+    if hodnota is None:
+        if pd.api.types.is_integer_dtype(df[sloupec]) or pd.api.types.is_bool_dtype(df[sloupec]):
+            df[sloupec] = df[sloupec].astype(float)
+        df.iloc[pozice, df.columns.get_loc(sloupec)] = None
+        return
+    if isinstance(df[sloupec].dtype, pd.CategoricalDtype) and hodnota not in df[sloupec].cat.categories:
+        df[sloupec] = df[sloupec].cat.add_categories([hodnota])
+    elif pd.api.types.is_integer_dtype(df[sloupec]) and isinstance(hodnota, float):
+        df[sloupec] = df[sloupec].astype(float)
+    df.iloc[pozice, df.columns.get_loc(sloupec)] = hodnota
+
+def aplikuj_zmeny(df, zdroj, db_path=ZMENY_DB):
+    """Aplikuje na místě uložené změny zdroje na data načtená ze souborů; vrací df."""
+    zmeny = nacti_zmeny(zdroj, db_path)
+    if not zmeny or "Identifikace" not in df.columns:
+        return df
+    radky = index_podle(df)
+    sloupce = {str(c).strip(): c for c in df.columns}
+    pouzito = 0
+    for identifikace, poradi, sloupec, hodnota in zmeny:
+        pozice = radky.get(identifikace, [])
+        if poradi >= len(pozice) or sloupec not in sloupce:
+            logger.debug(f"Změna {identifikace}/{poradi}/{sloupec} neodpovídá datům, přeskakuji")
+            continue
+        sloupec = sloupce[sloupec]
+        _nastav_bunku(df, pozice[poradi], sloupec, hodnota_pro_sloupec(df[sloupec], hodnota))
+        pouzito += 1
+    pocitej(zmen=pouzito)
+    logger.info(f"Aplikováno {pouzito} uložených změn buněk")
+    return df
+
+def exportuj_upravena_data(df, xlsx_path):
+    """Zapíše data s aplikovanými úpravami do sešitu (cesta nebo souborový objekt), nikdy ne do zdroje."""
+    df.to_excel(xlsx_path, index=False, engine="openpyxl")
+    return xlsx_path
+
+def klic_radku(df, pozice):
+    """Vrátí klíč řádku na dané pozici: (Identifikace, pořadí výskytu této identifikace v df)."""
+    identifikace = df["Identifikace"].iat[pozice]
+    return identifikace, index_podle(df)[identifikace].index(pozice)
+
+@casovat("zmeny_zapis")
+def zapis_zmeny(zdroj, zmeny, db_path=ZMENY_DB):
+    """
+    Připíše změny buněk do deníku jednou transakcí a vrátí novou verzi zdroje.
+
+    zmeny je seznam (identifikace, poradi, sloupec, hodnota).
+    """
+    zmeny = list(zmeny)
+    with _db_lock, closing(_pripoj(db_path)) as conn, conn:
+        conn.executemany(
+            f"INSERT INTO {ZMENY_TABLE} (zdroj, identifikace, poradi, sloupec, hodnota) VALUES (?, ?, ?, ?, ?)",
+            [(zdroj, str(identifikace), int(poradi), str(sloupec), json.dumps(hodnota, ensure_ascii=False, default=str))
+             for identifikace, poradi, sloupec, hodnota in zmeny])
+        verze = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {ZMENY_TABLE} WHERE zdroj = ?", (zdroj,)).fetchone()[0]
+    pocitej(zmen=len(zmeny))
+    logger.info(f"Do deníku změn zapsáno {len(zmeny)} změn buněk")
+    return verze
+
+@casovat("zmeny_zhutneni")
+def zhutni_zmeny(zdroj, db_path=ZMENY_DB):
+    """Odstraní z deníku přepsané změny zdroje (zůstane poslední hodnota každé buňky); vrací jejich počet."""
+    odstraneno = 0
+    if os.path.exists(db_path):
+        with _db_lock, closing(_pripoj(db_path)) as conn, conn:
+            odstraneno = conn.execute(
+                f"DELETE FROM {ZMENY_TABLE} WHERE zdroj = ? AND id NOT IN "
+                f"(SELECT MAX(id) FROM {ZMENY_TABLE} WHERE zdroj = ? GROUP BY identifikace, poradi, sloupec)",
+                (zdroj, zdroj)).rowcount
+    pocitej(odstraneno=odstraneno)
+    logger.info(f"Deník změn zhutněn, odstraněno {odstraneno} přepsaných záznamů")
+    return odstraneno
+
+def _ziskej_zhutnovani():
+    global _zhutnovani
+    with _zhutnovani_lock:
+        if _zhutnovani is None:
+            _zhutnovani = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zhutneni")
+        return _zhutnovani
+
+def zhutni_na_pozadi(zdroj, db_path=ZMENY_DB):
+    """Naplánuje zhutni_zmeny v jednom vlákně na pozadí (zhutnění se neprolínají); vrací Future."""
+    future = _ziskej_zhutnovani().submit(zhutni_zmeny, zdroj, db_path)
+    future.add_done_callback(lambda f: f.exception() and logger.error(f"Zhutnění deníku změn selhalo: {f.exception()}"))
+    return future